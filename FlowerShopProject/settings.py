@@ -131,4 +131,46 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 TG_BOT_TOKEN = env.str('TG_BOT_TOKEN')
-PAY_TG_TOKEN = env.str('PAY_TG_TOKEN')
\ No newline at end of file
+PAY_TG_TOKEN = env.str('PAY_TG_TOKEN')
+
+PHOTO_MAX_SIZE = env.int('PHOTO_MAX_SIZE', default=1280)
+PHOTO_THUMBNAIL_SIZE = env.int('PHOTO_THUMBNAIL_SIZE', default=320)
+PHOTO_WORKERS = env.int('PHOTO_WORKERS', default=2)
+
+BOUQUET_ALBUM_VIEW = env.bool('BOUQUET_ALBUM_VIEW', default=False)
+
+SITE_URL = env.str('SITE_URL', default='')
+INLINE_CACHE_TIME = env.int('INLINE_CACHE_TIME', default=300)
+SEARCH_REFRESH_INTERVAL = env.int('SEARCH_REFRESH_INTERVAL', default=60)
+FACET_PRICE_BUCKETS = env.int('FACET_PRICE_BUCKETS', default=4)
+STAFF_REFRESH_INTERVAL = env.int('STAFF_REFRESH_INTERVAL', default=30)
+
+FSM_TTL_DAYS = env.int('FSM_TTL_DAYS', default=30)
+ORDER_ARCHIVE_DAYS = env.int('ORDER_ARCHIVE_DAYS', default=180)
+
+GAZETTEER_PATH = env.str('GAZETTEER_PATH', default=str(BASE_DIR / 'data' / 'gazetteer.csv'))
+GEOCODE_CACHE_SIZE = env.int('GEOCODE_CACHE_SIZE', default=4096)
+
+OUTBOX_POLL_INTERVAL = env.int('OUTBOX_POLL_INTERVAL', default=5)
+OUTBOX_MAX_ATTEMPTS = env.int('OUTBOX_MAX_ATTEMPTS', default=10)
+OUTBOX_BACKOFF_MAX = env.int('OUTBOX_BACKOFF_MAX', default=600)
+
+RESERVATION_TTL = env.int('RESERVATION_TTL', default=900)
+
+FLOOD_RATE = env.float('FLOOD_RATE', default=2.0)
+FLOOD_BURST = env.int('FLOOD_BURST', default=5)
+CALLBACK_DEDUP_WINDOW = env.float('CALLBACK_DEDUP_WINDOW', default=1.0)
+
+UPDATE_CONCURRENCY = env.int('UPDATE_CONCURRENCY', default=100)
+
+SESSION_SNAPSHOT_PATH = env.str('SESSION_SNAPSHOT_PATH', default=str(BASE_DIR / 'sessions.snapshot'))
+SESSION_SNAPSHOT_INTERVAL = env.int('SESSION_SNAPSHOT_INTERVAL', default=60)
+
+TELEGRAM_API_URL = env.str('TELEGRAM_API_URL', default='')
+TELEGRAM_POOL_SIZE = env.int('TELEGRAM_POOL_SIZE', default=100)
+TELEGRAM_KEEPALIVE = env.float('TELEGRAM_KEEPALIVE', default=60.0)
+TELEGRAM_DNS_TTL = env.int('TELEGRAM_DNS_TTL', default=3600)
+TELEGRAM_TIMEOUT = env.float('TELEGRAM_TIMEOUT', default=10.0)
+TELEGRAM_UPLOAD_TIMEOUT = env.float('TELEGRAM_UPLOAD_TIMEOUT', default=60.0)
+TELEGRAM_RETRIES = env.int('TELEGRAM_RETRIES', default=3)
+TELEGRAM_BACKOFF_MAX = env.float('TELEGRAM_BACKOFF_MAX', default=5.0)
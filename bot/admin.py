@@ -1,8 +1,9 @@
 from django.contrib import admin
-from django.db.models import Avg, BooleanField, OuterRef, Subquery
-from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 
 from .models import (
+    ArchivedOrder,
     Category,
     Courier,
     CourierAssignment,
@@ -12,9 +13,14 @@ from .models import (
     FloristCallback,
     Item,
     Order,
+    OrderEvent,
+    OutboxMessage,
     Owner,
+    Shop,
     User
 )
+from .utils.export import FORMATS, export_lines, plain_orders
+from .utils.order_events import record_event
 
 
 class CourierAssignmentInline(admin.TabularInline):
@@ -39,6 +45,19 @@ class FloristCallbackInline(admin.TabularInline):
     verbose_name_plural = "Обратные звонки флористов"
 
 
+class OrderEventInline(admin.TabularInline):
+    model = OrderEvent
+    extra = 0
+    fields = ('kind', 'courier', 'at')
+    readonly_fields = fields
+    can_delete = False
+    verbose_name = 'Событие заказа'
+    verbose_name_plural = 'Журнал заказа'
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 class CourierDeliveryInline(admin.TabularInline):
     model = CourierDelivery
     extra = 0
@@ -48,6 +67,13 @@ class CourierDeliveryInline(admin.TabularInline):
     verbose_name_plural = 'Доставки курьеров'
 
 
+@admin.register(Shop)
+class ShopAdmin(admin.ModelAdmin):
+    list_display = ('name', 'is_active', 'created_at')
+    search_fields = ('name',)
+    list_filter = ('is_active',)
+
+
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
     list_display = ('tg_id',)
@@ -56,15 +82,17 @@ class UserAdmin(admin.ModelAdmin):
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('name',)
+    list_display = ('name', 'shop')
     search_fields = ('name',)
+    list_filter = ('shop',)
 
 
 @admin.register(Item)
 class ItemAdmin(admin.ModelAdmin):
-    list_display = ('name', 'price', 'category')
-    search_fields = ('name', 'category__name')
-    list_filter = ('category',)
+    list_display = ('name', 'price', 'category', 'stock')
+    list_editable = ('stock',)
+    search_fields = ('name', 'external_id', 'category__name')
+    list_filter = ('shop', 'category')
 
 
 @admin.register(Order)
@@ -76,51 +104,112 @@ class OrderAdmin(admin.ModelAdmin):
         'delivery_date',
         'delivery_time',
         'get_courier',
-        'is_delivered'
+        'is_delivered',
+        'preparation_time',
+        'delivery_duration'
     )
     search_fields = ('name', 'address')
     list_filter = ('status', 'delivery_date')
-    readonly_fields = ('created_at', 'completed_at')
-    inlines = [FloristCallbackInline]
-
-    def get_queryset(self, request):
-        courier_delivery_subquery = CourierDelivery.objects.filter(
-            order=OuterRef('pk')).order_by(
-                '-delivered_at').values('delivered'
-                                        )[:1]
-
-        qs = super().get_queryset(request)
-        qs = qs.annotate(
-            courier_time=Avg('courierassignment__delivery_time'),
-            florist_time=Avg('floristassignment__processing_time'),
-            is_delivered=Coalesce(Subquery(
-                courier_delivery_subquery, output_field=BooleanField()), False)
-        )
-        return qs
-
-    def avg_courier_time(self, obj):
-        return obj.courier_time
-    avg_courier_time.short_description = 'Среднее время доставки'
-
-    def avg_florist_time(self, obj):
-        return obj.florist_time
-    avg_florist_time.short_description = 'Среднее время обработки'
+    readonly_fields = (
+        'status',
+        'created_at',
+        'paid_at',
+        'assigned_at',
+        'picked_at',
+        'completed_at',
+        'preparation_time',
+        'delivery_duration',
+        'processing_time'
+    )
+    inlines = [FloristCallbackInline, OrderEventInline]
+    actions = ['cancel', 'export_csv', 'export_jsonl']
 
     def get_courier(self, obj):
         return obj.courier.name if obj.courier else 'Не назначен'
     get_courier.short_description = 'Курьер'
 
     def is_delivered(self, obj):
-        return obj.is_delivered
+        return obj.status == 'delivered'
     is_delivered.boolean = True
     is_delivered.short_description = 'Доставлено'
 
+    def cancel(self, request, queryset):
+        cancelled = sum(
+            record_event(order, 'cancelled') is not None
+            for order in queryset.exclude(status__in=('delivered', 'canceled'))
+        )
+        self.message_user(request, f'Отменено заказов: {cancelled}')
+    cancel.short_description = 'Отменить заказы'
+
+    def stream_export(self, queryset, export_format):
+        _, content_type = FORMATS[export_format]
+        filename = f"orders_{timezone.now():%Y%m%d_%H%M%S}.{export_format}"
+        response = StreamingHttpResponse(
+            export_lines(plain_orders(queryset), export_format),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    def export_csv(self, request, queryset):
+        return self.stream_export(queryset, 'csv')
+    export_csv.short_description = 'Выгрузить в CSV'
+
+    def export_jsonl(self, request, queryset):
+        return self.stream_export(queryset, 'jsonl')
+    export_jsonl.short_description = 'Выгрузить в JSONL'
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'name',
+        'status',
+        'delivery_date',
+        'courier_name',
+        'archived_at'
+    )
+    search_fields = ('name', 'address')
+    list_filter = ('status', 'delivery_date')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'chat_id',
+        'created_at',
+        'attempts',
+        'next_attempt_at',
+        'sent_at'
+    )
+    list_filter = ('sent_at',)
+    readonly_fields = ('attempts', 'sent_at', 'last_error', 'created_at')
+    actions = ['retry']
+
+    def has_add_permission(self, request):
+        return False
+
+    def retry(self, request, queryset):
+        updated = queryset.filter(sent_at__isnull=True).update(
+            next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f'Поставлено на повторную отправку: {updated}')
+    retry.short_description = 'Отправить повторно'
+
 
 @admin.register(Courier)
 class CourierAdmin(admin.ModelAdmin):
     list_display = ('name', 'status', 'get_total_orders')
     search_fields = ('name',)
-    list_filter = ('status',)
+    list_filter = ('shop', 'status')
     inlines = [CourierAssignmentInline]
 
     def get_total_orders(self, obj):
@@ -132,7 +221,7 @@ class CourierAdmin(admin.ModelAdmin):
 class FloristAdmin(admin.ModelAdmin):
     list_display = ('name', 'status', 'get_total_orders')
     search_fields = ('name',)
-    list_filter = ('status',)
+    list_filter = ('shop', 'status')
     inlines = [FloristAssignmentInline]
 
     def get_total_orders(self, obj):
@@ -1,14 +1,13 @@
-import json
+import asyncio
 import logging
 import re
 from datetime import date, time
-from decimal import Decimal
 
 from aiogram.exceptions import (
     TelegramBadRequest,
     TelegramUnauthorizedError,
 )
-from aiogram import Bot, F, Router
+from aiogram import Bot, F, Router, html
 from aiogram.filters import CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
@@ -17,6 +16,11 @@ from aiogram.types import (
     ErrorEvent,
     FSInputFile,
     InlineKeyboardMarkup,
+    InlineQuery,
+    InlineQueryResultArticle,
+    InlineQueryResultCachedPhoto,
+    InputMediaPhoto,
+    InputTextMessageContent,
     LabeledPrice,
     Message,
     PreCheckoutQuery
@@ -26,17 +30,29 @@ from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import IntegrityError
-from django.utils import timezone
 
 import bot.keyboards.keyboards as kb
 import bot.utils.requests as rq
 
-from bot.models import CourierDelivery, Florist, FloristCallback, FSMData, Item
+from bot.models import FloristCallback, FSMData, Item
+from bot.utils.media import (
+    cached_file_id,
+    photo_input,
+    photo_name,
+    remember_file_ids
+)
+from bot.utils.cards import ItemCard, get_card
+from bot.utils.address import canonical_address, geocoder, is_valid, parse_address
+from bot.utils.composition import composition_index, parse_flowers
+from bot.utils.facets import facet_index
+from bot.utils.inventory import PAYLOAD_PREFIX, inventory, payload_token
+from bot.utils.outbox import wake as wake_outbox
+from bot.utils.search import ItemDoc, catalog_index
+from bot.utils.staff import florists
+from bot.utils.tenancy import payment_token, shop_id
 from bot.utils.requests import get_all_items, get_category_item
 from bot.keyboards.keyboards import (
     confirm_phone_keyboard,
-    create_courier_keyboard,
-    create_florist_keyboard,
     create_pagination_buttons,
     filter_bouquets,
     for_another_reason,
@@ -53,6 +69,8 @@ logger = logging.getLogger(__name__)
 router = Router()
 
 ITEMS_PER_PAGE = 3
+INLINE_RESULTS_LIMIT = 50
+SIMILAR_ITEMS = 3
 
 
 class ResponseFormatError(Exception):
@@ -161,7 +179,7 @@ async def cmd_start(message: Message, state: FSMContext):
     """
     await rq.set_user(message.from_user.id)
     fsm_data = await sync_to_async(
-        FSMData.objects.filter(user_id=message.from_user.id).first)()
+        FSMData.objects.filter(user_id=message.from_user.id, shop_id=shop_id()).first)()
 
     if fsm_data and fsm_data.state:
         await message.answer(
@@ -192,21 +210,16 @@ async def continue_dialog(callback: CallbackQuery, state: FSMContext) -> None:
         callback (CallbackQuery): Callback-запрос от пользователя.
         state (FSMContext): Контекст состояния.
     """
-    fsm_data = await sync_to_async(
-        FSMData.objects.filter(user_id=callback.from_user.id).first)()
+    saved = await rq.get_fsm_state(callback.from_user.id)
 
-    if not fsm_data:
+    if not saved:
         await callback.message.answer("❌ Нет данных для продолжения.")
         await state.clear()
         return
 
-    await state.set_state(fsm_data.state)
-
-    try:
-        data = json.loads(fsm_data.data)
-        await state.set_data(data)
-    except (TypeError, json.JSONDecodeError):
-        data = {}
+    saved_state, data = saved
+    await state.set_state(saved_state)
+    await state.set_data(data)
 
     current_state = await state.get_state()
 
@@ -219,7 +232,7 @@ async def continue_dialog(callback: CallbackQuery, state: FSMContext) -> None:
     elif current_state == OrderState.choosing_price.state:
         await callback.message.answer(
             "На какую сумму рассчитываете?",
-            reply_markup=await kb.price())
+            reply_markup=await kb.price(data.get("occasion")))
 
     elif current_state == OrderState.waiting_for_name.state:
         await callback.message.answer("Введите имя получателя:")
@@ -239,7 +252,7 @@ async def continue_dialog(callback: CallbackQuery, state: FSMContext) -> None:
     elif current_state == OrderState.waiting_item_price.state:
         await callback.message.answer(
             "На какую сумму рассчитываете?",
-            reply_markup=await kb.price())
+            reply_markup=await kb.price(data.get("occasion")))
     elif current_state == OrderState.waiting_consultation.state:
         await callback.message.answer(
             "Заказать консультацию",
@@ -264,45 +277,8 @@ async def save_fsm_data(user_id: int, state: FSMContext) -> None:
         state (FSMContext): Контекст состояния.
     """
     try:
-        current_state = await state.get_state()
-        data = await state.get_data()
-        serialized_data = {}
-
-        for key, value in data.items():
-            if isinstance(value, (date, time)):
-                serialized_data[key] = value.isoformat()
-            elif isinstance(value, Decimal):
-                serialized_data[key] = float(value)
-            elif isinstance(value, list):
-                serialized_data[key] = [
-                    {
-                        "id": getattr(item, 'id', None),
-                        "name": getattr(item, 'name', None),
-                        "price": float
-                        (getattr(item, 'price', 0.0)) if isinstance(
-                            getattr(item, 'price', None), (int, float)
-                        ) else 0.0
-                    }
-                    for item in value
-                ]
-            elif isinstance(value, dict):
-                serialized_data[key] = {
-                    "id": value.get('id', None),
-                    "name": value.get('name', None),
-                    "price": float(value.get(
-                        'price', 0.0)) if isinstance(
-                            value.get('price'), (int, float)
-                        ) else 0.0
-                }
-            else:
-                serialized_data[key] = value
-
-        await sync_to_async(FSMData.objects.update_or_create)(
-            user_id=user_id,
-            defaults={
-                'state': current_state,
-                'data': json.dumps(serialized_data, ensure_ascii=False)
-            }
+        await rq.save_fsm_state(
+            user_id, await state.get_state(), await state.get_data()
         )
     except Exception as e:
         logger.error(f"Ошибка сохранения состояния: {str(e)}")
@@ -317,34 +293,12 @@ async def load_fsm_data(user_id: int, state: FSMContext) -> None:
         state (FSMContext): Контекст состояния.
     """
     try:
-        fsm_data = await sync_to_async(
-            FSMData.objects.filter(user_id=user_id).first
-        )()
-        logger.info(f"Загружаемые данные из FSM: {fsm_data}")
-        if fsm_data:
-            await state.set_state(fsm_data.state)
-
-            try:
-                data = json.loads(fsm_data.data)
-
-                for key, value in data.items():
-                    if isinstance(value, list) and key == 'filtered_items':
-                        data[key] = [
-                            await sync_to_async(Item.objects.get)(id=item_dict["id"])
-                            for item_dict in value
-                        ]
-                    elif isinstance(value, dict) and "id" in value:
-                        data[key] = await sync_to_async(Item.objects.get)(id=value["id"])
-                    elif isinstance(value, (int, float)):
-                        data[key] = Decimal(str(value))
-                await state.set_data(data)
-
-            except (TypeError, json.JSONDecodeError) as e:
-                logger.error("Ошибка декодирования JSON: %s", str(e))
-                await state.set_data({})
-    except ObjectDoesNotExist as e:
-        logger.error("Объект не найден: %s", str(e))
-        await state.set_data({})
+        saved = await rq.get_fsm_state(user_id)
+        logger.info(f"Загружаемые данные из FSM: {user_id}")
+        if saved:
+            saved_state, data = saved
+            await state.set_state(saved_state)
+            await state.set_data(data)
     except Exception as e:
         logger.error("Ошибка при загрузке данных: %s", str(e), exc_info=True)
         raise
@@ -465,7 +419,7 @@ async def handle_no_reason(callback: CallbackQuery, state: FSMContext) -> None:
 
     await state.set_state(OrderState.viewing_all_items)
     await state.update_data(filtered_items=all_items)
-    await state.update_data(current_page=1)
+    await state.update_data(current_page=1, with_flowers="", without_flowers="")
     await display_bouquets(callback, state)
     await save_fsm_data(callback.from_user.id, state)
 
@@ -492,10 +446,16 @@ async def handle_regular_reason(callback: CallbackQuery, state: FSMContext) -> N
         callback (CallbackQuery): Callback-запрос от пользователя.
         state (FSMContext): Контекст состояния.
     """
+    occasion = callback.data.split("_")[1]
+    keyboard = await kb.price(occasion)
+    if not facet_index.category_counts(shop_id()).get(int(occasion)):
+        await callback.message.answer("К сожалению, подходящих букетов не найдено.")
+        return
+
     await state.set_state(OrderState.choosing_price)
     await callback.message.answer(
         "На какую сумму рассчитываете?",
-        reply_markup=await kb.price()
+        reply_markup=keyboard
     )
 
     await save_fsm_data(callback.from_user.id, state)
@@ -521,11 +481,45 @@ async def choose_price(callback: CallbackQuery, state: FSMContext) -> None:
 
     await state.set_state(OrderState.viewing_all_items)
     await state.update_data(filtered_items=filtered_items)
-    await state.update_data(current_page=1)
+    await state.update_data(current_page=1, with_flowers="", without_flowers="")
     await display_bouquets(callback, state)
     await save_fsm_data(callback.from_user.id, state)
 
 
+async def show_card(
+    message: Message,
+    card: ItemCard,
+    keyboard: InlineKeyboardMarkup
+) -> Message:
+    """Показывает карточку букета одним сообщением.
+
+    Если букет выбран из другой карточки, она заменяется на месте.
+
+    Args:
+        message (Message): Сообщение, в котором нажата кнопка.
+        card (ItemCard): Карточка букета.
+        keyboard (InlineKeyboardMarkup): Кнопки карточки.
+
+    Returns:
+        Message: Отправленная или измененная карточка.
+    """
+    if not card.photo:
+        return await message.answer(card.caption, reply_markup=keyboard)
+
+    photo = photo_input(card.photo, card.photo_file_id)
+    if message.photo:
+        try:
+            return await message.edit_media(
+                InputMediaPhoto(media=photo, caption=card.caption),
+                reply_markup=keyboard
+            )
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e):
+                return message
+            logger.warning("Карточка %s не изменена: %s", card.id, e)
+    return await message.answer_photo(photo=photo, caption=card.caption, reply_markup=keyboard)
+
+
 @router.callback_query(F.data.startswith("item_"))
 async def category(callback: CallbackQuery, state: FSMContext) -> None:
     """Обрабатывает выбор товара.
@@ -535,40 +529,33 @@ async def category(callback: CallbackQuery, state: FSMContext) -> None:
         state (FSMContext): Контекст состояния.
     """
     try:
-        item_id = callback.data.split("_")[1]
-        item_data = await rq.get_item(item_id)
+        card = await get_card(int(callback.data.split("_")[1]))
+        if card.shop_id != shop_id():
+            await callback.answer("Букет не найден")
+            return
 
         await state.update_data(
-            item_price=item_data['price'],
-            item_photo=item_data['photo'],
-            item_name=item_data['name'],
-            occasion=item_data['category_id']
+            item_price=card.price,
+            item_photo=card.photo,
+            item_name=card.name,
+            item_id=card.id,
+            occasion=card.category_id
         )
 
         await save_fsm_data(callback.from_user.id, state)
         await state.set_state(OrderState.waiting_item_price)
 
-        photo_path = f"media/{item_data['photo']}" if item_data['photo'] else None
-        if photo_path:
-            photo = FSInputFile(photo_path)
-        else:
-            await callback.message.answer("Фото букета недоступно.")
-
-        await callback.message.answer_photo(photo=photo)
-        await callback.answer(f"Вы выбрали товар {item_data['name']}")
-        await callback.message.answer(
-            f"*Букет:* {item_data['name']}\n"
-            f"*Описание:* {item_data['description']}\n"
-            f"*Цветочный состав:* {item_data['structure']}\n"
-            f"*Цена:* {item_data['price']}р.",
-            parse_mode="Markdown"
+        similar = [
+            catalog_index.docs[similar_id]
+            for similar_id in card.similar_ids[:SIMILAR_ITEMS]
+            if similar_id in catalog_index.docs
+        ]
+        sent, _ = await asyncio.gather(
+            show_card(callback.message, card, kb.item_card(similar)),
+            callback.bot(callback.answer(f"Вы выбрали товар {card.name}"))
         )
-        await callback.message.answer(
-            "*Хотите что-то еще более уникальное?*\n"
-            "*Подберите другой букет из нашей коллекции или закажите консультацию флориста*",
-            parse_mode="Markdown",
-            reply_markup=kb.menu
-            )
+        if card.photo and sent.photo:
+            await remember_file_ids([(card.id, card.photo, sent.photo[-1].file_id)])
     except Exception as e:
         logger.error(f"Ошибка загрузки товара: {str(e)}")
         await callback.answer("❌ Ошибка при загрузке данных, попробуйте позже.")
@@ -588,6 +575,20 @@ async def display_bouquets(callback: CallbackQuery, state: FSMContext) -> None:
         await callback.message.answer("Нет доступных букетов.")
         return
 
+    with_flowers = parse_flowers(data.get("with_flowers"))
+    without_flowers = parse_flowers(data.get("without_flowers"))
+    if with_flowers or without_flowers:
+        allowed = composition_index.matching(
+            (item.id for item in all_items), with_flowers, without_flowers
+        )
+        all_items = [item for item in all_items if item.id in allowed]
+        if not all_items:
+            await callback.message.edit_text(
+                "Нет букетов с выбранным составом. Измените фильтр.",
+                reply_markup=kb.composition_button()
+            )
+            return
+
     start_index = (current_page - 1) * ITEMS_PER_PAGE
     end_index = start_index + ITEMS_PER_PAGE
     items_on_page = all_items[start_index:end_index]
@@ -605,13 +606,62 @@ async def display_bouquets(callback: CallbackQuery, state: FSMContext) -> None:
     )
 
     page_info = f"Страница {current_page} из {total_pages}"
+    reply_markup = InlineKeyboardMarkup(
+        inline_keyboard=(
+            keyboard.inline_keyboard +
+            navigation_buttons.inline_keyboard +
+            kb.composition_button().inline_keyboard)
+        )
+
+    if settings.BOUQUET_ALBUM_VIEW:
+        await send_bouquet_album(callback.message, items_on_page)
+        await callback.message.answer(
+            f"Доступные букеты:\n{page_info}",
+            reply_markup=reply_markup
+        )
+        return
+
     await callback.message.edit_text(
         f"Доступные букеты:\n{page_info}", 
-        reply_markup=InlineKeyboardMarkup(
-            inline_keyboard=(
-                keyboard.inline_keyboard + navigation_buttons.inline_keyboard)
+        reply_markup=reply_markup
+        )
+
+
+async def send_bouquet_album(message: Message, items_on_page: list) -> None:
+    """Отправляет страницу букетов одним альбомом с подписями.
+
+    Args:
+        message (Message): Сообщение, в чат которого отправляется альбом.
+        items_on_page (list): Букеты текущей страницы.
+    """
+    photos = [
+        (item, photo_name(item)) for item in items_on_page if photo_name(item)
+    ]
+    if not photos:
+        return
+
+    media = [
+        InputMediaPhoto(
+            media=photo_input(name, item.photo_file_id),
+            caption=(
+                f"<b>{html.quote(item.name)}</b> — {item.price}р.\n"
+                f"{html.quote(item.structure)}"
             )
         )
+        for item, name in photos
+    ]
+    if len(media) == 1:
+        sent = [await message.answer_photo(
+            photo=media[0].media,
+            caption=media[0].caption
+        )]
+    else:
+        sent = await message.answer_media_group(media=media)
+
+    await remember_file_ids(
+        (item.id, name, sent_message.photo[-1].file_id)
+        for (item, name), sent_message in zip(photos, sent)
+    )
 
 
 @router.callback_query(F.data.startswith("page_"), OrderState.viewing_all_items)
@@ -628,6 +678,148 @@ async def navigate_pages(callback: CallbackQuery, state: FSMContext) -> None:
     await save_fsm_data(callback.from_user.id, state)
 
 
+async def show_composition_filter(callback: CallbackQuery, state: FSMContext) -> None:
+    """Показывает фильтр букетов по цветочному составу.
+
+    Args:
+        callback (CallbackQuery): Callback-запрос от пользователя.
+        state (FSMContext): Контекст состояния.
+    """
+    data = await state.get_data()
+    all_items = data.get("filtered_items") or []
+    flower_counts = composition_index.flower_counts(item.id for item in all_items)
+    if not flower_counts:
+        await callback.answer("Состав букетов не указан.")
+        return
+
+    try:
+        await callback.message.edit_text(
+            "Выберите цветы, которые должны быть в букете, "
+            "или исключите нежелательные:",
+            reply_markup=kb.composition_filter(
+                flower_counts,
+                parse_flowers(data.get("with_flowers")),
+                parse_flowers(data.get("without_flowers"))
+            )
+        )
+    except TelegramBadRequest as e:
+        logger.info("Фильтр по составу не изменился: %s", e)
+    await callback.answer()
+
+
+@router.callback_query(F.data == "compose", OrderState.viewing_all_items)
+async def composition_filter(callback: CallbackQuery, state: FSMContext) -> None:
+    """Открывает фильтр по цветочному составу.
+
+    Args:
+        callback (CallbackQuery): Callback-запрос от пользователя.
+        state (FSMContext): Контекст состояния.
+    """
+    await show_composition_filter(callback, state)
+
+
+@router.callback_query(F.data.startswith("compose_"), OrderState.viewing_all_items)
+async def change_composition_filter(callback: CallbackQuery, state: FSMContext) -> None:
+    """Включает или исключает цветок в фильтре по составу.
+
+    Args:
+        callback (CallbackQuery): Callback-запрос от пользователя.
+        state (FSMContext): Контекст состояния.
+    """
+    parts = callback.data.split("_")
+    action = parts[1]
+    data = await state.get_data()
+    with_flowers = parse_flowers(data.get("with_flowers"))
+    without_flowers = parse_flowers(data.get("without_flowers"))
+
+    if action == "done":
+        await state.update_data(current_page=1)
+        await display_bouquets(callback, state)
+        await save_fsm_data(callback.from_user.id, state)
+        return
+
+    if action == "reset":
+        with_flowers, without_flowers = [], []
+    else:
+        flower = parts[2]
+        selected, other = (
+            (with_flowers, without_flowers) if action == "with"
+            else (without_flowers, with_flowers)
+        )
+        if flower in selected:
+            selected.remove(flower)
+        else:
+            selected.append(flower)
+            if flower in other:
+                other.remove(flower)
+
+    await state.update_data(
+        with_flowers=",".join(with_flowers),
+        without_flowers=",".join(without_flowers)
+    )
+    await save_fsm_data(callback.from_user.id, state)
+    await show_composition_filter(callback, state)
+
+
+def inline_result(doc: ItemDoc) -> InlineQueryResultCachedPhoto | InlineQueryResultArticle:
+    """Собирает результат inline-запроса для букета.
+
+    Args:
+        doc (ItemDoc): Данные букета из поискового индекса.
+
+    Returns:
+        InlineQueryResultCachedPhoto | InlineQueryResultArticle: Фото букета,
+            если оно уже загружено в Telegram, иначе текстовая карточка.
+    """
+    card = (
+        f"<b>Букет:</b> {html.quote(doc.name)}\n"
+        f"<b>Описание:</b> {html.quote(doc.description)}\n"
+        f"<b>Цветочный состав:</b> {html.quote(doc.structure)}\n"
+        f"<b>Цена:</b> {doc.price}р."
+    )
+    title = f"{doc.name} — {doc.price}р."
+    file_id = cached_file_id(doc.photo, doc.photo_file_id) if doc.photo else ""
+    if file_id:
+        return InlineQueryResultCachedPhoto(
+            id=str(doc.id),
+            photo_file_id=file_id,
+            title=title,
+            description=doc.structure,
+            caption=card
+        )
+
+    thumbnail_url = None
+    if settings.SITE_URL and doc.thumbnail:
+        thumbnail_url = f"{settings.SITE_URL}{settings.MEDIA_URL}{doc.thumbnail}"
+    return InlineQueryResultArticle(
+        id=str(doc.id),
+        title=title,
+        description=doc.structure,
+        input_message_content=InputTextMessageContent(message_text=card),
+        thumbnail_url=thumbnail_url
+    )
+
+
+@router.inline_query()
+async def inline_search(inline_query: InlineQuery) -> None:
+    """Ищет букеты по названию, описанию и составу в inline-режиме.
+
+    Args:
+        inline_query (InlineQuery): Inline-запрос от пользователя.
+    """
+    if not catalog_index.is_loaded:
+        # Без --preload первый запрос может прийти раньше фонового обновления индекса
+        await catalog_index.refresh()
+    docs = catalog_index.search(
+        inline_query.query, limit=INLINE_RESULTS_LIMIT, shop_id=shop_id()
+    )
+    await inline_query.answer(
+        [inline_result(doc) for doc in docs],
+        cache_time=settings.INLINE_CACHE_TIME,
+        is_personal=False
+    )
+
+
 @router.message(F.text == "Заказать букет")
 async def order(message: Message, state: FSMContext) -> None:
     """Начинает процесс заказа букета.
@@ -636,7 +828,30 @@ async def order(message: Message, state: FSMContext) -> None:
         message (Message): Сообщение от пользователя.
         state (FSMContext): Контекст состояния.
     """
-    await save_fsm_data(message.from_user.id, state)
+    await start_order(message, message.from_user.id, state)
+
+
+@router.callback_query(F.data == "card_order")
+async def order_from_card(callback: CallbackQuery, state: FSMContext) -> None:
+    """Начинает заказ букета из карточки.
+
+    Args:
+        callback (CallbackQuery): Callback-запрос от пользователя.
+        state (FSMContext): Контекст состояния.
+    """
+    await callback.answer()
+    await start_order(callback.message, callback.from_user.id, state)
+
+
+async def start_order(message: Message, user_id: int, state: FSMContext) -> None:
+    """Запрашивает имя получателя.
+
+    Args:
+        message (Message): Сообщение в чате с пользователем.
+        user_id (int): Telegram ID пользователя.
+        state (FSMContext): Контекст состояния.
+    """
+    await save_fsm_data(user_id, state)
     await message.answer("Введите имя получателя:")
     await state.set_state(OrderState.waiting_for_name)
 
@@ -672,13 +887,7 @@ async def process_address(message: Message, state: FSMContext) -> None:
         state (FSMContext): Контекст состояния.
     """
 
-    adress_pattern = re.compile(
-        r"^(г\.\s*[А-Яа-яЁё\- ]+,\s*"
-        r"(ул\.|улица|просп\.|проспект|пр-т)\s*[А-Яа-яЁё\- ]+,\s*"
-        r"(д\.|дом)\s*\d+[А-Яа-я]*(,\s*(кв\.|квартира)\s*\d+)?$)"
-    )
-
-    address = message.text.strip()
+    address = parse_address(message.text.strip())
     example_address = (
         "Примеры корректных адресов:\n"
         "• г. Москва, ул. Ленина, д. 15\n"
@@ -687,13 +896,13 @@ async def process_address(message: Message, state: FSMContext) -> None:
 
     errors = []
 
-    if not address.startswith("г. "):
+    if not address.city:
         errors.append("Адрес должен начинаться с указания города (г. Москва)")
 
-    if "ул." not in address and "улица" not in address:
+    if not address.street:
         errors.append("Укажите улицу (ул. Ленина или улица Ленина)")
 
-    if "д." not in address and "дом" not in address:
+    if not address.house:
         errors.append("Укажите номер дома (д. 10 или дом 15)")
 
     if errors:
@@ -701,13 +910,19 @@ async def process_address(message: Message, state: FSMContext) -> None:
         await message.answer(f"{error_message}\n\n{example_address}")
         return
 
-    if not adress_pattern.match(address):
+    canonical = canonical_address(address)
+    if not is_valid(canonical):
         await message.answer(
             f"❌ Некорректный формат адреса.\n\n{example_address}"
         )
         return
 
-    await state.update_data(address=address)
+    point = await geocoder.locate(address)
+    await state.update_data(
+        address=canonical,
+        latitude=point.latitude if point else None,
+        longitude=point.longitude if point else None
+    )
     await message.answer("✅ Адрес принят! Введите дату доставки (ГГГГ-ММ-ДД):")
     await state.set_state(OrderState.waiting_for_date)
 
@@ -790,32 +1005,42 @@ async def send_invoice(message: Message, bot: Bot, state: FSMContext) -> None:
         await save_fsm_data(message.from_user.id, state)
         data = await state.get_data()
 
-        item = data.get("occasion")
+        item = data.get("item_id")
         if not item:
             await message.answer("❌ Ошибка: товар не найден.")
             return
 
+        token = await inventory.reserve(item, message.from_user.id)
+        if not token:
+            await message.answer(
+                "😔 Этот букет закончился. Пожалуйста, выберите другой."
+            )
+            return
+
         prices = [
             LabeledPrice(label="Букет", amount=int(data["item_price"] * 100)),
             LabeledPrice(label="Доставка", amount=50000)
         ]
 
-        await bot.send_invoice(
-            chat_id=message.chat.id,
-            title="Оплата заказа",
-            description=f"Букет: {data["item_name"]}",
-            payload=f"order_{data["item_name"]}",
-            provider_token=settings.PAY_TG_TOKEN,
-            currency="rub",
-            prices=prices,
-            photo_url="https://cs11.pikabu.ru/post_img/2019/02/19/9/155058987464147624.jpg",
-            photo_size=100,
-            photo_width=800,
-            photo_height=450,
-            protect_content=True,
-            start_parameter="flower_shop",
-            request_timeout=30,
-        )
+        try:
+            await bot.send_invoice(
+                chat_id=message.chat.id,
+                title="Оплата заказа",
+                description=f"Букет: {data["item_name"]}",
+                payload=f"{PAYLOAD_PREFIX}{token}",
+                provider_token=payment_token(),
+                currency="rub",
+                prices=prices,
+                photo_url="https://cs11.pikabu.ru/post_img/2019/02/19/9/155058987464147624.jpg",
+                photo_size=100,
+                photo_width=800,
+                photo_height=450,
+                protect_content=True,
+                start_parameter="flower_shop",
+            )
+        except Exception:
+            await inventory.cancel(token)
+            raise
     except TelegramBadRequest as e:
         logger.error("Ошибка Telegram API: %s", e)
         await message.answer("❌ Ошибка платежной системы. Попробуйте позже.")
@@ -832,7 +1057,17 @@ async def process_pre_checkout_query(pre_checkout_query: PreCheckoutQuery, bot:
         pre_checkout_query (PreCheckoutQuery): Запрос на предварительную оплату.
         bot (Bot): Экземпляр бота.
     """
-    await bot.answer_pre_checkout_query(pre_checkout_query.id, ok=True)
+    if inventory.is_held(payload_token(pre_checkout_query.invoice_payload)):
+        await bot.answer_pre_checkout_query(pre_checkout_query.id, ok=True)
+    else:
+        await bot.answer_pre_checkout_query(
+            pre_checkout_query.id,
+            ok=False,
+            error_message=(
+                "Бронь букета истекла или букет закончился. "
+                "Пожалуйста, оформите заказ заново."
+            )
+        )
 
 
 @router.message(F.successful_payment)
@@ -845,11 +1080,17 @@ async def process_successful_payment(message: Message, state: FSMContext) -> Non
     """
     try:
 
+        charge_id = message.successful_payment.telegram_payment_charge_id
+        token = payload_token(message.successful_payment.invoice_payload)
         user_data = await state.get_data()
 
-        required_fields = ["occasion", "name", "address", "delivery_date", "delivery_time"]
+        required_fields = ["item_id", "name", "address", "delivery_date", "delivery_time"]
         for field in required_fields:
             if field not in user_data:
+                paid_order = await rq.get_paid_order(charge_id)
+                if paid_order:
+                    await message.answer(f"✅ Заказ #{paid_order.id} уже оформлен.")
+                    return
                 raise KeyError(f"Отсутствует обязательное поле: {field}")
 
         delivery_date = (
@@ -864,17 +1105,25 @@ async def process_successful_payment(message: Message, state: FSMContext) -> Non
             else str(user_data["delivery_time"])
         )
 
-        new_order = await rq.create_order(
+        new_order, courier_delivery, created = await rq.commit_order(
             user_id=message.from_user.id,
-            item_id=user_data["occasion"],
+            item_id=user_data["item_id"],
             name=user_data["name"],
             address=user_data["address"],
             delivery_date=delivery_date,
-            delivery_time=delivery_time
+            delivery_time=delivery_time,
+            payment_charge_id=charge_id,
+            latitude=user_data.get("latitude"),
+            longitude=user_data.get("longitude"),
+            reservation_token=token
         )
+        inventory.forget(token)
+        await state.clear()
 
-        if not new_order or not hasattr(new_order, "id"):
-            raise ValueError("Ошибка создания заказа")
+        if not created:
+            await message.answer(f"✅ Заказ #{new_order.id} уже оформлен.")
+            return
+        wake_outbox()
 
         client_message = (
             f"Оплачено: {message.successful_payment.total_amount // 100} "
@@ -888,54 +1137,13 @@ async def process_successful_payment(message: Message, state: FSMContext) -> Non
         )
         await message.answer(client_message)
 
-        try:
-            courier = await rq.get_courier()
-            if not courier:
-                await message.answer("❌ Нет доступных курьеров.")
-                return
-
-            try:
-                courier_delivery = await sync_to_async(CourierDelivery.objects.create)(
-                    courier=courier, 
-                    order=new_order
-                )
-            except IntegrityError as e:
-                logger.error("Ошибка создания доставки: %s", e)
-                await message.answer("❌ Ошибка при создании заказа.")
-                return
-
-            courier_keyboard = create_courier_keyboard(courier_delivery.id)
-            courier_message = (
-                f">>>>{courier.name}\n"
-                "🚨 Новый заказ!\n"
-                f"🔢 Номер заказа: #{new_order.id}\n"
-                f"📦 Адрес: {new_order.address}\n"
-                f"📅 Дата: {delivery_date}\n"
-                f"⏰ Время: {delivery_time}\n"
-                f"👤 Клиент: {new_order.name}\n"
-            )
-            try:
-                await message.bot.send_message(
-                    chat_id=courier.tg_id,
-                    text=courier_message,
-                    reply_markup=courier_keyboard
-                )
-            except TelegramBadRequest as e:
-                logger.error("Ошибка отправки сообщения курьеру: %s", e)
-
-        except Exception as e:
-            logger.error("Ошибка назначения курьера: %s", e)
-            await message.answer("❌ Ошибка при обработке заказа.")
-
-        await sync_to_async(FSMData.objects.filter(
-            user_id=message.from_user.id
-        ).delete)()
-        await state.clear()
+        if not courier_delivery:
+            await message.answer("❌ Нет доступных курьеров.")
 
     except KeyError as e:
         logger.error("Отсутствует ключ в данных: %s", e)
         await message.answer("❌ Ошибка данных заказа.")
-    except ValueError as e:
+    except (ValueError, IntegrityError, ObjectDoesNotExist) as e:
         logger.error("Ошибка создания заказа: %s", e)
         await message.answer("❌ Ошибка при создании заказа.")
     except Exception as e:
@@ -943,6 +1151,20 @@ async def process_successful_payment(message: Message, state: FSMContext) -> Non
         await message.answer("❌ Ошибка. Обратитесь в поддержку.")
 
 
+@router.callback_query(F.data.startswith("picked_"))
+async def process_picked(callback: CallbackQuery) -> None:
+    """Обрабатывает отметку курьера о том, что букет забран.
+
+    Args:
+        callback (CallbackQuery): Callback-запрос от пользователя.
+    """
+    courier_delivery_id = int(callback.data.split("_")[1])
+    if await rq.mark_picked(courier_delivery_id):
+        await callback.message.answer("📦 Отмечено: букет у курьера.")
+    else:
+        await callback.answer("Уже отмечено.")
+
+
 @router.callback_query(F.data.startswith("delivered_"))
 async def process_delivered(callback: CallbackQuery) -> None:
     """Обрабатывает пометку о доставке.
@@ -951,11 +1173,10 @@ async def process_delivered(callback: CallbackQuery) -> None:
         callback (CallbackQuery): Callback-запрос от пользователя.
     """
     courier_delivery_id = int(callback.data.split("_")[1])
-    courier_delivery = await sync_to_async(CourierDelivery.objects.get)(id=courier_delivery_id)
-    courier_delivery.delivered = True
-    courier_delivery.delivered_at = timezone.now()
-    await sync_to_async(courier_delivery.save)()
-    await callback.message.answer("✅ Отмечено как доставленный!")
+    if await rq.mark_delivered(courier_delivery_id):
+        await callback.message.answer("✅ Отмечено как доставленный!")
+    else:
+        await callback.answer("Заказ уже отмечен доставленным.")
 
 
 @router.message(F.text == "Заказать консультацию")
@@ -966,8 +1187,31 @@ async def consultation_1(message: Message, state: FSMContext) -> None:
         message (Message): Сообщение от пользователя.
         state (FSMContext): Контекст состояния.
     """
+    await start_consultation(message, message.from_user.id, state)
+
+
+@router.callback_query(F.data == "card_consultation")
+async def consultation_from_card(callback: CallbackQuery, state: FSMContext) -> None:
+    """Начинает заказ консультации из карточки букета.
+
+    Args:
+        callback (CallbackQuery): Callback-запрос от пользователя.
+        state (FSMContext): Контекст состояния.
+    """
+    await callback.answer()
+    await start_consultation(callback.message, callback.from_user.id, state)
+
+
+async def start_consultation(message: Message, user_id: int, state: FSMContext) -> None:
+    """Запрашивает номер телефона для консультации.
+
+    Args:
+        message (Message): Сообщение в чате с пользователем.
+        user_id (int): Telegram ID пользователя.
+        state (FSMContext): Контекст состояния.
+    """
     await state.set_state(OrderState.waiting_consultation)
-    await save_fsm_data(message.from_user.id, state)
+    await save_fsm_data(user_id, state)
     await message.answer(
         "📞 Укажите номер телефона (пример: +79161234567 или 89161234567),"
         "и наш флорист перезвонит вам в течение 20 минут"
@@ -1020,30 +1264,9 @@ async def confirm_phone(callback: CallbackQuery, state: FSMContext) -> None:
             f'👤 Наш флорист перезвонит вам в течение 20 минут'
         )
         try:
-            florist = await sync_to_async(Florist.objects.filter(status='active').first)()
-            if florist:
-
-                florist_callback = await sync_to_async(
-                    FloristCallback.objects.create)(
-                        phone_number=phone,
-                        needs_callback=True,
-                        order=None,
-                        florist=florist
-                )
-
-                florist_keyboard = create_florist_keyboard(florist_callback.id)
-
-                flourist_message = (
-                    "Звонок клиенту:\n"
-                    "🚨 Требуется консультация клиенту\n"
-                    f"🔢 Номер тел: #{phone}"
-                )
-
-                await callback.bot.send_message(
-                    chat_id=florist.tg_id,
-                    text=flourist_message,
-                    reply_markup=florist_keyboard
-                )
+            florist_callback = await rq.create_florist_callback(phone)
+            if florist_callback:
+                wake_outbox()
             else:
                 await callback.message.answer("К сожалению, в данный момент нет доступных флористов.")
         except IntegrityError:
@@ -1065,8 +1288,10 @@ async def process_call_made(callback: CallbackQuery) -> None:
         florist_callback = await sync_to_async(FloristCallback.objects.get)(
             id=florist_callback_id
         )
-        florist_callback.callback_made = True
-        await sync_to_async(florist_callback.save)()
+        if not florist_callback.callback_made:
+            florist_callback.callback_made = True
+            await sync_to_async(florist_callback.save)()
+            florists.release(florist_callback.florist_id)
         await callback.message.answer("✅ Отмечено как перезвонивший!")
     except ObjectDoesNotExist:
         await callback.answer("❌ Запрос на звонок не найден!")
@@ -1097,7 +1322,30 @@ async def collection(message: Message, state: FSMContext) -> None:
         message (Message): Сообщение от пользователя.
         state (FSMContext): Контекст состояния.
     """
-    await save_fsm_data(message.from_user.id, state)
+    await show_collection(message, message.from_user.id, state)
+
+
+@router.callback_query(F.data == "card_collection")
+async def collection_from_card(callback: CallbackQuery, state: FSMContext) -> None:
+    """Показывает всю коллекцию из карточки букета.
+
+    Args:
+        callback (CallbackQuery): Callback-запрос от пользователя.
+        state (FSMContext): Контекст состояния.
+    """
+    await callback.answer()
+    await show_collection(callback.message, callback.from_user.id, state)
+
+
+async def show_collection(message: Message, user_id: int, state: FSMContext) -> None:
+    """Показывает букеты выбранного события с пагинацией.
+
+    Args:
+        message (Message): Сообщение в чате с пользователем.
+        user_id (int): Telegram ID пользователя.
+        state (FSMContext): Контекст состояния.
+    """
+    await save_fsm_data(user_id, state)
     data = await state.get_data()
     occasion = data.get("occasion")
 
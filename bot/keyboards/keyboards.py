@@ -1,3 +1,6 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
 from aiogram.types import (
     InlineKeyboardButton,
     KeyboardButton,
@@ -5,8 +8,13 @@ from aiogram.types import (
     InlineKeyboardMarkup
 )
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from django.conf import settings
 
+from bot.utils.composition import FLOWERS
+from bot.utils.facets import ANY_PRICE, facet_index, parse_price, price_label, price_value
 from bot.utils.requests import get_categories, get_category_item
+from bot.utils.search import catalog_index
+from bot.utils.tenancy import shop_id
 
 form_button = ReplyKeyboardMarkup(
     keyboard=[[KeyboardButton(text="Принять")],
@@ -59,12 +67,18 @@ def create_florist_keyboard(florist_callback_id: int) -> InlineKeyboardMarkup:
 
 
 def create_courier_keyboard(courier_delivery_id: int) -> InlineKeyboardMarkup:
+    picked_button = InlineKeyboardButton(
+        text="📦 Забрал букет",
+        callback_data=f"picked_{courier_delivery_id}"
+    )
     callback_data_delivered = f"delivered_{courier_delivery_id}"
     delivered_button = InlineKeyboardButton(
         text="✅ Доставлено",
         callback_data=callback_data_delivered
     )
-    courier_keyboard = InlineKeyboardMarkup(inline_keyboard=[[delivered_button]])
+    courier_keyboard = InlineKeyboardMarkup(
+        inline_keyboard=[[picked_button], [delivered_button]]
+    )
     return courier_keyboard
 
 
@@ -87,6 +101,38 @@ def create_pagination_buttons(
     return InlineKeyboardMarkup(inline_keyboard=[keyboard])
 
 
+def composition_button() -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(
+        text="🌸 Фильтр по составу",
+        callback_data="compose")]]
+    )
+
+
+def composition_filter(
+    flower_counts: list,
+    with_flowers: list,
+    without_flowers: list
+) -> InlineKeyboardMarkup:
+    keyboard = []
+    for key, count in flower_counts:
+        label = FLOWERS[key][0]
+        keyboard.append([
+            InlineKeyboardButton(
+                text=f"{'✅ ' if key in with_flowers else ''}{label} ({count})",
+                callback_data=f"compose_with_{key}"
+            ),
+            InlineKeyboardButton(
+                text=f"{'🚫 ' if key in without_flowers else ''}Без: {label}",
+                callback_data=f"compose_without_{key}"
+            )
+        ])
+    keyboard.append([
+        InlineKeyboardButton(text="Сбросить", callback_data="compose_reset"),
+        InlineKeyboardButton(text="Показать букеты", callback_data="compose_done")
+    ])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
 def choice_continue_or_restart() -> InlineKeyboardMarkup:
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="Продолжить", callback_data="continue")],
@@ -109,13 +155,65 @@ async def items(items: list) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+def item_card(similar_docs: list) -> InlineKeyboardMarkup:
+    """
+    Возвращает кнопки карточки букета.
+
+    Похожие букеты открываются в той же карточке, а кнопки действий
+    повторяют меню, которое раньше приходило отдельным сообщением.
+
+    Args:
+        similar_docs (list): Похожие букеты из поискового индекса.
+
+    Returns:
+        InlineKeyboardMarkup: Кнопки похожих букетов и действий.
+    """
+    keyboard = [
+        [InlineKeyboardButton(
+            text=f"{doc.name} - {doc.price}р.",
+            callback_data=f"item_{doc.id}"
+        )]
+        for doc in similar_docs
+    ]
+    keyboard += [
+        [InlineKeyboardButton(text="Заказать букет", callback_data="card_order")],
+        [InlineKeyboardButton(text="Заказать консультацию", callback_data="card_consultation")],
+        [InlineKeyboardButton(text="Посмотреть всю коллекцию", callback_data="card_collection")],
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
+# Категории (ID и название) и время их загрузки по магазинам
+_categories: Dict[Optional[int], Tuple[List[Tuple[int, str]], float]] = {}
+
+
 async def categories() -> InlineKeyboardMarkup:
-    all_categories = await get_categories()
+    """
+    Возвращает клавиатуру категорий текущего магазина с количеством букетов.
+
+    Категории перечитываются из базы не чаще, чем поисковый индекс
+    обновляется из базы, а количество букетов берется из facet_index,
+    поэтому открытие каталога обычно не обращается к базе.
+
+    Returns:
+        InlineKeyboardMarkup: Кнопки категорий и возврата на главную.
+    """
+    shop = shop_id()
+    now = time.monotonic()
+    cached = _categories.get(shop)
+    if not cached or now - cached[1] >= settings.SEARCH_REFRESH_INTERVAL:
+        cached = ([(category.id, category.name) for category in await get_categories()], now)
+        _categories[shop] = cached
+    if not catalog_index.is_loaded:
+        await catalog_index.refresh()
+
+    counts = facet_index.category_counts(shop)
     keyboard = InlineKeyboardBuilder()
-    for category in all_categories:
+    for category_id, name in cached[0]:
+        count = counts.get(category_id)
         keyboard.add(InlineKeyboardButton(
-            text=category.name,
-            callback_data=f"category_{category.id}")
+            text=f"{name} ({count})" if count else name,
+            callback_data=f"category_{category_id}")
         )
     keyboard.add(InlineKeyboardButton(
         text="На главную",
@@ -124,14 +222,34 @@ async def categories() -> InlineKeyboardMarkup:
     return keyboard.adjust(1).as_markup()
 
 
-async def price() -> InlineKeyboardMarkup:
-    prices = ["~500", "~1000", "~2000", "Больше", "Не важно"]
+async def price(occasion: Optional[str]) -> InlineKeyboardMarkup:
+    """
+    Возвращает ценовые корзины категории с количеством букетов.
+
+    Границы корзин делят каталог магазина на части с примерно равным
+    числом букетов; корзины без букетов категории не показываются.
+
+    Args:
+        occasion (Optional[str]): ID выбранной категории.
+
+    Returns:
+        InlineKeyboardMarkup: Кнопки цен и возврата на главную.
+    """
+    if not catalog_index.is_loaded:
+        await catalog_index.refresh()
+
+    category_id = int(occasion) if occasion is not None else None
+    buckets = facet_index.price_counts(shop_id(), category_id)
     keyboard = InlineKeyboardBuilder()
-    for price in prices:
+    for price_range, count in buckets:
         keyboard.add(InlineKeyboardButton(
-            text=price,
-            callback_data=f"price_{price}")
+            text=f"{price_label(price_range)} ({count})",
+            callback_data=f"price_{price_value(price_range)}")
         )
+    keyboard.add(InlineKeyboardButton(
+        text=f"{ANY_PRICE} ({sum(count for _, count in buckets)})",
+        callback_data=f"price_{ANY_PRICE}")
+    )
     keyboard.add(InlineKeyboardButton(
         text="На главную",
         callback_data="to_main")
@@ -162,19 +280,5 @@ async def for_another_reason() -> ReplyKeyboardMarkup:
 
 
 async def filter_bouquets(occasion: str, price: str) -> list:
-    all_items = await get_category_item(occasion)
-    filtered_items = []
-
-    for item in all_items:
-        if price == "~500" and item.price <= 500:
-            filtered_items.append(item)
-        elif price == "~1000" and item.price <= 1000:
-            filtered_items.append(item)
-        elif price == "~2000" and item.price <= 2000:
-            filtered_items.append(item)
-        elif price == "Больше" and item.price > 2000:
-            filtered_items.append(item)
-        elif price == "Не важно":
-            filtered_items.append(item)
-
-    return filtered_items
\ No newline at end of file
+    low, high = parse_price(price)
+    return await get_category_item(occasion, low, high)
\ No newline at end of file
@@ -0,0 +1,274 @@
+import asyncio
+import json
+import logging
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from bot.models import Category, Item, User
+from bot.utils.synthetic import SYNTHETIC_TG_ID, seed
+
+
+PRICES = ["~500", "~1000", "~2000", "Больше", "Не важно"]
+
+
+def current_commit() -> str:
+    """Возвращает короткий хэш текущего коммита или unknown вне репозитория."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def summarize(timings: list) -> dict:
+    """Сводит замеры в миллисекундах к среднему и перцентилям."""
+    timings = sorted(timings)
+    return {
+        'runs': len(timings),
+        'mean_ms': round(statistics.fmean(timings) * 1000, 3),
+        'p50_ms': round(timings[len(timings) // 2] * 1000, 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 3),
+    }
+
+
+async def measure(operation, runs: int) -> dict:
+    """Выполняет асинхронную операцию runs раз и замеряет каждый вызов."""
+    timings = []
+    for number in range(runs):
+        started = time.perf_counter()
+        await operation(number)
+        timings.append(time.perf_counter() - started)
+    return summarize(timings)
+
+
+async def run_suite(runs: int, rng: random.Random) -> dict:
+    """
+    Замеряет операции каталога и оформления заказа на заполненной базе.
+
+    Args:
+        runs (int): Количество вызовов каждой операции.
+        rng (random.Random): Генератор аргументов операций.
+
+    Returns:
+        dict: Сводка замеров по операциям.
+    """
+    # Обработчики тянут за собой aiogram.types, импорт нужен только здесь
+    import bot.keyboards.keyboards as kb
+    import bot.utils.requests as rq
+    from bot.handlers.handlers import ITEMS_PER_PAGE, load_fsm_data, save_fsm_data
+    from bot.utils import cards
+    from bot.utils.staff import load_staff
+
+    await load_staff()
+    categories = await sync_to_async(list)(Category.objects.values_list('id', flat=True))
+    item_ids = await sync_to_async(list)(Item.objects.values_list('id', flat=True))
+    user_tg_ids = await sync_to_async(list)(
+        User.objects.filter(tg_id__gte=SYNTHETIC_TG_ID).values_list('tg_id', flat=True)
+    )
+    storage = MemoryStorage()
+    results = {}
+
+    filtered = {}
+
+    async def filter_bouquets(number):
+        occasion, price = str(rng.choice(categories)), rng.choice(PRICES)
+        filtered[number] = await kb.filter_bouquets(occasion, price)
+    results['filter_bouquets'] = await measure(filter_bouquets, runs)
+
+    async def items(number):
+        await kb.items(filtered[number][:ITEMS_PER_PAGE])
+    results['kb.items'] = await measure(items, runs)
+
+    def context(number):
+        user_id = user_tg_ids[number % len(user_tg_ids)]
+        key = StorageKey(bot_id=0, chat_id=user_id, user_id=user_id)
+        return user_id, FSMContext(storage=storage, key=key)
+
+    async def save_state(number):
+        user_id, state = context(number)
+        await state.set_data({
+            'occasion': '1',
+            'price': 'Не важно',
+            'filtered_items': filtered[number],
+            'current_page': 1,
+        })
+        await save_fsm_data(user_id, state)
+    results['save_fsm_data'] = await measure(save_state, runs)
+
+    async def load_state(number):
+        user_id, state = context(number)
+        await load_fsm_data(user_id, state)
+    results['load_fsm_data'] = await measure(load_state, runs)
+
+    async def get_card(number):
+        cards.forget_card(Item, Item(id=item_ids[number % len(item_ids)]))
+        await cards.get_card(item_ids[number % len(item_ids)])
+    results['get_card'] = await measure(get_card, runs)
+
+    run_id = rng.getrandbits(32)
+
+    async def commit_order(number):
+        await rq.commit_order(
+            user_tg_ids[number % len(user_tg_ids)],
+            rng.choice(item_ids),
+            'Анна',
+            'ул. Ленина, д. 15',
+            date.today(),
+            '14:00',
+            f'bench-{run_id}-{number}'
+        )
+    results['commit_order'] = await measure(commit_order, runs)
+
+    # Соединение потока sync_to_async указывает на базу, которая будет удалена
+    await sync_to_async(connections.close_all)()
+    return results
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер операций каталога и заказа на синтетических данных разного размера. '
+        'Каждый размер заполняется во временной базе, рабочая база не меняется'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='100,10000,100000',
+            help='Размеры каталога через запятую'
+        )
+        parser.add_argument('--orders', type=int, default=1000000, help='Количество заказов')
+        parser.add_argument('--users', type=int, default=50000, help='Количество пользователей')
+        parser.add_argument('--runs', type=int, default=50, help='Вызовов каждой операции')
+        parser.add_argument('--seed', type=int, default=1, help='Зерно генератора')
+        parser.add_argument(
+            '--output',
+            type=Path,
+            help='Файл результатов, по умолчанию benchmarks/<коммит>.json'
+        )
+        parser.add_argument('--compare', type=Path, help='Результаты прошлого прогона')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Допустимое замедление p50 при сравнении, доля'
+        )
+        parser.add_argument(
+            '--strict',
+            action='store_true',
+            help='Завершиться с ошибкой, если есть замедления'
+        )
+
+    def handle(self, *args, **options):
+        # Обработчики пишут в лог каждое сохранение состояния
+        logging.disable(logging.INFO)
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        commit = current_commit()
+        report = {
+            'commit': commit,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'orders': options['orders'],
+            'users': options['users'],
+            'runs': options['runs'],
+            'results': [],
+        }
+        for size in sizes:
+            report['results'].append(self.run_size(size, options))
+
+        output = options['output'] or Path('benchmarks') / f'{commit}.json'
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f'Результаты сохранены в {output}'))
+
+        if options['compare']:
+            regressions = self.compare(
+                json.loads(options['compare'].read_text(encoding='utf-8')),
+                report,
+                options['threshold']
+            )
+            if regressions and options['strict']:
+                raise CommandError(f'Замедлений: {regressions}')
+
+    def run_size(self, size: int, options: dict) -> dict:
+        """Заполняет временную базу каталогом заданного размера и замеряет операции."""
+        if connection.vendor == 'sqlite':
+            # Временная база на диске, а не в памяти, как у рабочей базы
+            connection.settings_dict['TEST']['NAME'] = str(
+                Path(tempfile.gettempdir()) / f'benchcatalog_{size}.sqlite3'
+            )
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            started = time.perf_counter()
+            created = seed(
+                items=size,
+                orders=options['orders'],
+                users=options['users'],
+                couriers=20,
+                florists=5,
+                random_seed=options['seed']
+            )
+            seeded = time.perf_counter() - started
+            self.stdout.write(
+                f'Каталог {size}: заполнено за {seeded:.1f} с '
+                f'({created["orders"]} заказов)'
+            )
+            benchmarks = asyncio.run(
+                run_suite(options['runs'], random.Random(options['seed']))
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        for name, stats in benchmarks.items():
+            self.stdout.write(
+                f'  {name:<16} p50 {stats["p50_ms"]:9.2f} мс, '
+                f'p95 {stats["p95_ms"]:9.2f} мс, среднее {stats["mean_ms"]:9.2f} мс'
+            )
+        return {
+            'catalog_size': size,
+            'seed_seconds': round(seeded, 2),
+            'rows': created,
+            'benchmarks': benchmarks,
+        }
+
+    def compare(self, baseline: dict, report: dict, threshold: float) -> int:
+        """Печатает изменение p50 относительно прошлого прогона и считает замедления."""
+        previous = {
+            (result['catalog_size'], name): stats['p50_ms']
+            for result in baseline['results']
+            for name, stats in result['benchmarks'].items()
+        }
+        self.stdout.write(f'Сравнение с {baseline["commit"]}:')
+        regressions = 0
+        for result in report['results']:
+            for name, stats in result['benchmarks'].items():
+                before = previous.get((result['catalog_size'], name))
+                if not before:
+                    continue
+                change = stats['p50_ms'] / before - 1
+                line = f'  {result["catalog_size"]:>7} {name:<16} {change:+.0%}'
+                if change > threshold:
+                    regressions += 1
+                    self.stdout.write(self.style.ERROR(line))
+                else:
+                    self.stdout.write(line)
+        return regressions
@@ -0,0 +1,102 @@
+import json
+import timeit
+from datetime import date, time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from bot.models import Item
+from bot.utils.fsm_codec import decode_legacy_json, decode_state, encode_state
+
+
+def legacy_encode(data: dict) -> str:
+    """Повторяет прежнюю JSON-сериализацию save_fsm_data для сравнения."""
+    serialized = {}
+    for key, value in data.items():
+        if isinstance(value, (date, time)):
+            serialized[key] = value.isoformat()
+        elif isinstance(value, Decimal):
+            serialized[key] = float(value)
+        elif isinstance(value, list):
+            serialized[key] = [
+                {"id": item.id, "name": item.name, "price": 0.0} for item in value
+            ]
+        else:
+            serialized[key] = value
+    return json.dumps(serialized, ensure_ascii=False)
+
+
+def sample_states(catalog_size: int) -> dict:
+    """Возвращает типичные состояния пользователя."""
+    items = [
+        Item(id=item_id, name=f"Букет {item_id}", price=Decimal("1500.00"))
+        for item_id in range(1, catalog_size + 1)
+    ]
+    checkout = {
+        "occasion": "2",
+        "price": "~2000",
+        "current_page": 1,
+        "item_price": Decimal("1500.00"),
+        "item_photo": "bouquets/optimized/rose.jpg",
+        "item_name": "Нежность",
+        "name": "Анна",
+        "address": "г. Москва, ул. Ленина, д. 15",
+        "delivery_date": date(2025, 3, 8),
+        "delivery_time": time(14, 0),
+        "with_flowers": "rose,peony",
+        "without_flowers": "lily",
+    }
+    return {
+        "checkout": checkout,
+        f"browsing_{catalog_size}": {
+            "occasion": "5",
+            "filtered_items": items,
+            "current_page": 3,
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение двоичного кодека состояния FSM с прежним JSON. '
+        'Время чтения JSON не включает прежние запросы букетов по одному'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--catalog-size',
+            type=int,
+            default=100,
+            help='Количество букетов в списке просмотра'
+        )
+        parser.add_argument(
+            '--number',
+            type=int,
+            default=2000,
+            help='Количество повторов каждой операции'
+        )
+
+    def handle(self, *args, **options):
+        number = options['number']
+        for name, data in sample_states(options['catalog_size']).items():
+            encoded = encode_state(data)
+            legacy = legacy_encode(data).encode('utf-8')
+            results = {
+                'json': (
+                    len(legacy),
+                    timeit.timeit(lambda: legacy_encode(data), number=number),
+                    timeit.timeit(lambda: decode_legacy_json(legacy), number=number),
+                ),
+                'binary': (
+                    len(encoded),
+                    timeit.timeit(lambda: encode_state(data), number=number),
+                    timeit.timeit(lambda: decode_state(encoded), number=number),
+                ),
+            }
+            self.stdout.write(f'{name}:')
+            for codec, (size, encode_time, decode_time) in results.items():
+                self.stdout.write(
+                    f'  {codec:<6} {size:>7} байт, '
+                    f'запись {encode_time / number * 1e6:8.1f} мкс, '
+                    f'чтение {decode_time / number * 1e6:8.1f} мкс'
+                )
@@ -0,0 +1,140 @@
+import asyncio
+import random
+import time
+from datetime import datetime
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Chat, Message, Update, User
+from django.core.management.base import BaseCommand
+
+from bot.utils.scheduling import OrderedIsolation
+
+
+def make_update(update_id: int, user_id: int, seq: int) -> Update:
+    """Создает обновление с текстовым сообщением пользователя."""
+    user = User(id=user_id, is_bot=False, first_name="Bench")
+    return Update(
+        update_id=update_id,
+        message=Message(
+            message_id=update_id,
+            date=datetime.now(),
+            chat=Chat(id=user_id, type="private"),
+            from_user=user,
+            text=str(seq)
+        )
+    )
+
+
+def make_dispatcher(isolation, latency: float, stats: dict) -> Dispatcher:
+    """
+    Создает диспетчер с обработчиком, повторяющим update_data в анкете.
+
+    Обработчик читает номер предыдущего сообщения из состояния, имитирует
+    обращение к базе и записывает свой номер. Если сообщения пользователя
+    обрабатываются одновременно, номер теряется или идет не по порядку.
+    """
+    router = Router()
+
+    @router.message()
+    async def handler(message: Message, state: FSMContext) -> None:
+        seq = int(message.text)
+        data = await state.get_data()
+        if data.get("seq", -1) != seq - 1:
+            stats["violations"] += 1
+        await asyncio.sleep(random.uniform(0.5, 1.5) * latency)
+        await state.update_data(seq=seq)
+        stats["latencies"].append(time.perf_counter() - stats["sent"][message.message_id])
+
+    kwargs = {"events_isolation": isolation} if isolation else {}
+    dispatcher = Dispatcher(**kwargs)
+    dispatcher.include_router(router)
+    return dispatcher
+
+
+async def run_mode(isolation, options: dict) -> dict:
+    """Прогоняет поток обновлений через диспетчер и собирает статистику."""
+    random.seed(options["seed"])
+    stats = {"violations": 0, "latencies": [], "sent": {}}
+    dispatcher = make_dispatcher(isolation, options["latency_ms"] / 1000, stats)
+    bot = Bot(token="42:BENCH")
+
+    users = options["users"]
+    per_user = options["updates_per_user"]
+    # Каждый пользователь присылает сообщения пачками, как при двойных нажатиях
+    schedule = sorted(
+        (random.uniform(0, options["duration"]), user_id)
+        for user_id in range(1, users + 1)
+        for _ in range(per_user)
+    )
+    sequences = dict.fromkeys(range(1, users + 1), 0)
+
+    tasks = []
+    started = time.perf_counter()
+    for update_id, (at, user_id) in enumerate(schedule, start=1):
+        delay = started + at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        update = make_update(update_id, user_id, sequences[user_id])
+        sequences[user_id] += 1
+        stats["sent"][update_id] = time.perf_counter()
+        tasks.append(asyncio.create_task(dispatcher.feed_update(bot, update)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    await bot.session.close()
+
+    latencies = sorted(stats["latencies"])
+    return {
+        "updates": len(schedule),
+        "elapsed": elapsed,
+        "throughput": len(schedule) / elapsed,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "violations": stats["violations"],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Сравнение обработки обновлений по очереди пользователя с параллельной'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500, help='Количество пользователей')
+        parser.add_argument(
+            '--updates-per-user',
+            type=int,
+            default=6,
+            help='Количество сообщений от каждого пользователя'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=2.0,
+            help='За сколько секунд приходят все обновления'
+        )
+        parser.add_argument(
+            '--latency-ms',
+            type=float,
+            default=20.0,
+            help='Среднее время работы обработчика в миллисекундах'
+        )
+        parser.add_argument(
+            '--max-in-flight',
+            type=int,
+            default=100,
+            help='Ограничение одновременно обрабатываемых обновлений'
+        )
+        parser.add_argument('--seed', type=int, default=1, help='Зерно генератора')
+
+    def handle(self, *args, **options):
+        modes = {
+            'unordered': lambda: None,
+            'ordered': lambda: OrderedIsolation(options['max_in_flight']),
+        }
+        for name, isolation in modes.items():
+            result = asyncio.run(run_mode(isolation(), options))
+            self.stdout.write(
+                f'{name:<10} {result["updates"]} обновлений за {result["elapsed"]:.2f} с: '
+                f'{result["throughput"]:.0f} в секунду, '
+                f'задержка p50 {result["p50"]:.1f} мс, p99 {result["p99"]:.1f} мс, '
+                f'нарушений порядка {result["violations"]}'
+            )
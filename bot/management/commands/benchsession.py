@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import random
+import time
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import AiogramError
+from django.core.management.base import BaseCommand
+
+from bot.utils import metrics
+from bot.utils.fake_telegram import FakeTelegram
+from bot.utils.telegram import create_session
+
+
+async def run_mode(session, server: FakeTelegram, options: dict) -> dict:
+    """Отправляет поток сообщений через сессию и собирает статистику."""
+    bot = Bot(token="42:BENCH", session=session)
+    server.stats.clear()
+    server.connections.clear()
+    before = metrics.snapshot()
+    slots = asyncio.Semaphore(options["concurrency"])
+    latencies = []
+    failures = 0
+
+    async def send(number: int) -> None:
+        nonlocal failures
+        async with slots:
+            started = time.perf_counter()
+            try:
+                if number % 2:
+                    await bot.send_message(chat_id=number, text=f"Сообщение {number}")
+                else:
+                    await bot.answer_callback_query(callback_query_id=str(number))
+            except (AiogramError, asyncio.TimeoutError):
+                failures += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send(number) for number in range(options["requests"])))
+    elapsed = time.perf_counter() - started
+    await bot.session.close()
+
+    after = metrics.snapshot()
+    latencies.sort()
+    return {
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "failures": failures,
+        "retries": after.get("api.retries", 0) - before.get("api.retries", 0),
+        "connections": len(server.connections),
+        "server": dict(server.stats),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Сравнение настроенной HTTP-сессии бота со стандартной на локальном сервере Bot API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Количество запросов')
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=200,
+            help='Одновременных запросов'
+        )
+        parser.add_argument(
+            '--latency-ms',
+            type=float,
+            default=30.0,
+            help='Средняя задержка ответа сервера в миллисекундах'
+        )
+        parser.add_argument(
+            '--error-rate',
+            type=float,
+            default=0.02,
+            help='Доля ответов 502'
+        )
+        parser.add_argument(
+            '--drop-rate',
+            type=float,
+            default=0.0,
+            help='Доля оборванных соединений'
+        )
+        parser.add_argument('--port', type=int, default=8089, help='Порт локального сервера')
+        parser.add_argument(
+            '--serve',
+            action='store_true',
+            help='Только запустить сервер, например для runbot с TELEGRAM_API_URL'
+        )
+        parser.add_argument('--seed', type=int, default=1, help='Зерно генератора')
+
+    def handle(self, *args, **options):
+        # Каждый повтор пишет предупреждение, в замере они только мешают
+        logging.getLogger('bot.utils.telegram').setLevel(logging.ERROR)
+        asyncio.run(self.main(options))
+
+    async def main(self, options: dict) -> None:
+        server = FakeTelegram(
+            options['latency_ms'] / 1000, options['error_rate'], options['drop_rate']
+        )
+        runner = await server.start('127.0.0.1', options['port'])
+        base_url = f'http://127.0.0.1:{options["port"]}'
+        try:
+            if options['serve']:
+                self.stdout.write(f'Сервер Bot API запущен: {base_url}')
+                await asyncio.Event().wait()
+
+            modes = {
+                'default': lambda: AiohttpSession(api=TelegramAPIServer.from_base(base_url)),
+                'tuned': lambda: create_session(base_url),
+            }
+            for name, session in modes.items():
+                random.seed(options['seed'])
+                result = await run_mode(session(), server, options)
+                self.stdout.write(
+                    f'{name:<8} {options["requests"]} запросов за {result["elapsed"]:.2f} с: '
+                    f'{result["throughput"]:.0f} в секунду, '
+                    f'p50 {result["p50"]:.1f} мс, p99 {result["p99"]:.1f} мс, '
+                    f'ошибок у вызывающего {result["failures"]}, '
+                    f'повторов {result["retries"]}, соединений {result["connections"]}, '
+                    f'ответов 502 {result["server"].get("errors", 0)}, '
+                    f'обрывов {result["server"].get("dropped", 0)}'
+                )
+        finally:
+            await runner.cleanup()
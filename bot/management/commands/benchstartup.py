@@ -0,0 +1,123 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bot.utils.startup import StartupTimer, first_calls_middleware, preload
+
+
+def run_child(with_preload: bool, query: str) -> dict:
+    """
+    Запускает бота без сети и отвечает на один inline-запрос.
+
+    Повторяет шаги runbot до первого ответа: импорт обработчиков, сборку
+    диспетчера и, при необходимости, прогрев кэшей. Запросы к Telegram
+    перехватывает сессия-заглушка.
+
+    Args:
+        with_preload (bool): Прогревать ли кэши до первого обновления.
+        query (str): Текст inline-запроса.
+
+    Returns:
+        dict: Длительность этапов в миллисекундах и число найденных букетов.
+    """
+    import asyncio
+
+    timer = StartupTimer()
+    timer.mark("django")
+
+    from aiogram import Bot, Dispatcher
+    from aiogram.client.session.base import BaseSession
+    from aiogram.methods import AnswerInlineQuery
+    from aiogram.types import InlineQuery, Update, User
+
+    from bot.handlers.handlers import router
+    timer.mark("router")
+
+    answers = []
+
+    class StubSession(BaseSession):
+        """Сессия, которая запоминает ответы бота вместо отправки"""
+
+        async def make_request(self, bot, method, timeout=None):
+            if isinstance(method, AnswerInlineQuery):
+                answers.append(len(method.results))
+            return True
+
+        async def stream_content(self, *args, **kwargs):
+            yield b""
+
+        async def close(self) -> None:
+            pass
+
+    async def main():
+        session = StubSession()
+        session.middleware(first_calls_middleware(timer))
+        bot = Bot(token="42:BENCH", session=session)
+        dp = Dispatcher()
+        dp.include_router(router)
+        if with_preload:
+            await preload(timer)
+
+        user = User(id=1, is_bot=False, first_name="Bench")
+        update = Update(
+            update_id=1,
+            inline_query=InlineQuery(id="1", from_user=user, query=query, offset="")
+        )
+        await dp.feed_update(bot, update)
+
+    asyncio.run(main())
+    phases = {name: value * 1000 for name, value in timer.phases.items()}
+    phases["total"] = timer.total * 1000
+    return {"phases": phases, "results": answers[0] if answers else None}
+
+
+class Command(BaseCommand):
+    help = 'Замер времени от запуска бота до первого ответа'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Запусков в каждом режиме')
+        parser.add_argument('--query', default='роза', help='Текст inline-запроса')
+        parser.add_argument(
+            '--preload',
+            action='store_true',
+            help='В дочернем процессе прогреть кэши до первого обновления'
+        )
+        parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['child']:
+            result = run_child(options['preload'], options['query'])
+            self.stdout.write(json.dumps(result))
+            return
+
+        for mode, flags in (('cold', []), ('preload', ['--preload'])):
+            runs = []
+            for _ in range(options['runs']):
+                started = time.perf_counter()
+                child = subprocess.run(
+                    [
+                        sys.executable, sys.argv[0], 'benchstartup', '--child',
+                        '--query', options['query'], *flags
+                    ],
+                    capture_output=True,
+                    text=True
+                )
+                if child.returncode:
+                    raise CommandError(child.stderr)
+                result = json.loads(child.stdout.splitlines()[-1])
+                result["phases"]["process"] = (time.perf_counter() - started) * 1000
+                runs.append(result)
+
+            phases = {
+                name: statistics.median(run["phases"].get(name, 0) for run in runs)
+                for name in runs[0]["phases"]
+            }
+            self.stdout.write(
+                f'{mode:<8} найдено {runs[0]["results"]}, медиана из {len(runs)}: '
+                + ', '.join(f'{name} {value:.0f} мс' for name, value in phases.items())
+            )
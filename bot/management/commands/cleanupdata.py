@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from bot.models import (
+    ArchivedOrder,
+    CourierAssignment,
+    CourierDelivery,
+    FloristAssignment,
+    FloristCallback,
+    FSMData,
+    Order,
+    OrderEvent
+)
+from bot.utils.retention import archive_orders, expire_fsm_sessions, optimize_tables
+
+
+class Command(BaseCommand):
+    help = 'Удаление устаревших состояний FSM и архивация завершенных заказов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fsm-ttl-days',
+            type=int,
+            default=settings.FSM_TTL_DAYS,
+            help='Через сколько дней без активности удалять состояние FSM'
+        )
+        parser.add_argument(
+            '--archive-after-days',
+            type=int,
+            default=settings.ORDER_ARCHIVE_DAYS,
+            help='Через сколько дней после доставки переносить заказ в архив'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество записей в одной транзакции'
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.1,
+            help='Пауза между порциями в секундах'
+        )
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='Выполнить VACUUM после очистки (в SQLite блокирует базу)'
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+
+        expired = expire_fsm_sessions(
+            now - timedelta(days=options['fsm_ttl_days']),
+            options['batch_size'],
+            options['pause']
+        )
+        self.stdout.write(f'Удалено состояний FSM: {expired}')
+
+        archived = archive_orders(
+            (now - timedelta(days=options['archive_after_days'])).date(),
+            options['batch_size'],
+            options['pause']
+        )
+        self.stdout.write(f'Перенесено заказов в архив: {archived}')
+
+        optimize_tables(
+            [
+                model._meta.db_table for model in (
+                    FSMData, Order, ArchivedOrder, CourierAssignment,
+                    CourierDelivery, FloristAssignment, FloristCallback,
+                    OrderEvent
+                )
+            ],
+            vacuum=options['vacuum']
+        )
+        self.stdout.write(self.style.SUCCESS('Очистка завершена'))
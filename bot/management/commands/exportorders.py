@@ -0,0 +1,55 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from bot.models import Order
+from bot.utils.export import FORMATS, export_lines, filter_orders
+
+
+STATUSES = [status for status, _ in Order._meta.get_field('status').choices]
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка заказов в CSV или JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=list(FORMATS),
+            default='csv',
+            help='Формат выгрузки'
+        )
+        parser.add_argument(
+            '--from',
+            dest='date_from',
+            type=date.fromisoformat,
+            help='Первая дата доставки (ГГГГ-ММ-ДД)'
+        )
+        parser.add_argument(
+            '--to',
+            dest='date_to',
+            type=date.fromisoformat,
+            help='Последняя дата доставки (ГГГГ-ММ-ДД)'
+        )
+        parser.add_argument('--status', choices=STATUSES, help='Статус заказа')
+        parser.add_argument(
+            '--output',
+            help='Файл для записи, по умолчанию стандартный вывод'
+        )
+
+    def handle(self, *args, **options):
+        queryset = filter_orders(
+            Order.objects.all(),
+            options['date_from'],
+            options['date_to'],
+            options['status']
+        )
+        lines = export_lines(queryset, options['format'])
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as file:
+                file.writelines(lines)
+        else:
+            sys.stdout.writelines(lines)
+            sys.stdout.flush()
@@ -0,0 +1,272 @@
+import csv
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from bot.models import Category, Item, Shop
+from bot.utils.images import derived_names, ingest_photo, render_args
+
+
+ITEM_FIELDS = ('name', 'description', 'price', 'category', 'structure')
+# Артикул входит в имя файла фото, поэтому в нем нет разделителей пути
+EXTERNAL_ID_RE = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+
+
+class RowError(Exception):
+    """Ошибка данных в строке импорта"""
+    pass
+
+
+def read_rows(path: Path, file_format: str):
+    """
+    Построчно читает файл каталога.
+
+    Args:
+        path (Path): Путь к файлу.
+        file_format (str): Формат файла: csv или jsonl.
+
+    Yields:
+        Tuple[int, dict]: Номер строки и ее данные.
+    """
+    with open(path, encoding='utf-8', newline='') as file:
+        if file_format == 'csv':
+            for line_number, row in enumerate(csv.DictReader(file), start=2):
+                yield line_number, row
+        else:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError:
+                    yield line_number, None
+
+
+def validate_row(row: dict, photos_dir: Path) -> dict:
+    """
+    Проверяет строку каталога и приводит значения к нужным типам.
+
+    Args:
+        row (dict): Данные строки.
+        photos_dir (Path): Каталог с исходными фото.
+
+    Returns:
+        dict: Проверенные данные букета.
+    """
+    if not isinstance(row, dict):
+        raise RowError('строка не является объектом JSON')
+
+    external_id = str(row.get('external_id') or '').strip()
+    if not external_id:
+        raise RowError('не указан external_id')
+    if not EXTERNAL_ID_RE.match(external_id) or external_id.strip('.') == '':
+        raise RowError(
+            f'некорректный external_id {external_id!r}: допустимы латинские буквы, '
+            'цифры, «_», «.» и «-», не более 64 символов'
+        )
+
+    values = {field: str(row.get(field) or '').strip() for field in ITEM_FIELDS}
+    for field, max_length in (
+        ('name', 30), ('description', 120), ('category', 100), ('structure', 100)
+    ):
+        if not values[field]:
+            raise RowError(f'не заполнено поле {field}')
+        if len(values[field]) > max_length:
+            raise RowError(f'поле {field} длиннее {max_length} символов')
+
+    try:
+        price = Decimal(values['price'].replace(',', '.'))
+    except InvalidOperation:
+        raise RowError(f'некорректная цена {values["price"]!r}')
+    if price <= 0:
+        raise RowError('цена должна быть больше нуля')
+
+    photo = str(row.get('photo') or '').strip()
+    source = photos_dir / photo if photo else None
+    if source and not source.is_file():
+        raise RowError(f'фото {photo} не найдено')
+
+    values.update(external_id=external_id, price=price, source=source)
+    return values
+
+
+class Command(BaseCommand):
+    help = 'Импорт каталога букетов из CSV или JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=Path, help='Файл каталога')
+        parser.add_argument(
+            '--format',
+            choices=('csv', 'jsonl'),
+            help='Формат файла, по умолчанию определяется по расширению'
+        )
+        parser.add_argument(
+            '--photos-dir',
+            type=Path,
+            help='Каталог с фото, по умолчанию каталог файла'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Количество строк в одной транзакции'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.PHOTO_WORKERS,
+            help='Количество процессов для обработки фото'
+        )
+        parser.add_argument(
+            '--shop',
+            type=int,
+            help='ID магазина, которому принадлежит каталог; по умолчанию основной магазин'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Начать заново, игнорируя сохраненный прогресс'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not path.is_file():
+            raise CommandError(f'Файл {path} не найден')
+
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in ('csv', 'jsonl'):
+            raise CommandError('Укажите формат файла: --format csv или jsonl')
+
+        self.shop_id = options['shop']
+        if self.shop_id is not None and not Shop.objects.filter(id=self.shop_id).exists():
+            raise CommandError(f'Магазин {self.shop_id} не найден')
+        # Артикулы уникальны только внутри магазина, как и имена фото
+        self.photo_prefix = f'shop_{self.shop_id}/' if self.shop_id is not None else ''
+
+        photos_dir = options['photos_dir'] or path.parent
+        suffix = f'.shop{self.shop_id}' if self.shop_id is not None else ''
+        checkpoint = path.with_name(f'{path.name}{suffix}.progress')
+        done_line = 0
+        if checkpoint.exists() and not options['restart']:
+            done_line = int(checkpoint.read_text())
+            self.stdout.write(f'Продолжение импорта после строки {done_line}')
+
+        self.categories = dict(
+            Category.objects.filter(shop_id=self.shop_id).values_list('name', 'id')
+        )
+        self.stats = {'created': 0, 'updated': 0, 'errors': 0}
+        started = time.perf_counter()
+        processed = 0
+
+        rows = (
+            (line_number, row)
+            for line_number, row in read_rows(path, file_format)
+            if line_number > done_line
+        )
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            while chunk := list(islice(rows, options['chunk_size'])):
+                self.import_chunk(chunk, photos_dir, executor)
+                checkpoint.write_text(str(chunk[-1][0]))
+                processed += len(chunk)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'Строк: {processed}, {processed / elapsed:.0f} строк/с'
+                )
+
+        checkpoint.unlink(missing_ok=True)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт завершен за {elapsed:.1f} с: создано {self.stats["created"]}, '
+            f'обновлено {self.stats["updated"]}, ошибок {self.stats["errors"]}'
+        ))
+
+    def import_chunk(self, chunk, photos_dir, executor):
+        """Проверяет строки, обрабатывает фото и сохраняет букеты одной транзакцией."""
+        valid = {}
+        for line_number, row in chunk:
+            try:
+                values = validate_row(row, photos_dir)
+            except RowError as e:
+                self.stats['errors'] += 1
+                self.stderr.write(f'Строка {line_number}: {e}')
+                continue
+            valid[values['external_id']] = values
+
+        photos = {}
+        for external_id, values in valid.items():
+            source = values['source']
+            if source:
+                photo_name = f'bouquets/{self.photo_prefix}{external_id}{source.suffix.lower()}'
+                photos[external_id] = (photo_name, executor.submit(
+                    ingest_photo,
+                    str(source),
+                    os.path.join(settings.MEDIA_ROOT, photo_name),
+                    *render_args(photo_name)[1:]
+                ))
+
+        for external_id, (photo_name, future) in list(photos.items()):
+            try:
+                future.result()
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.stderr.write(f'Фото {external_id}: {e}')
+                del photos[external_id]
+
+        with transaction.atomic():
+            self.create_categories(valid.values())
+            existing = {
+                item.external_id: item
+                for item in Item.objects.filter(shop_id=self.shop_id, external_id__in=valid)
+            }
+            now = timezone.now()
+            to_create, to_update = [], []
+            for external_id, values in valid.items():
+                item = existing.get(external_id) or Item(
+                    external_id=external_id, shop_id=self.shop_id
+                )
+                item.name = values['name']
+                item.description = values['description']
+                item.price = values['price']
+                item.structure = values['structure']
+                item.category_id = self.categories[values['category']]
+                item.updated_at = now
+                if external_id in photos:
+                    item.photo = photos[external_id][0]
+                    item.photo_optimized, item.photo_thumbnail = derived_names(
+                        item.photo.name
+                    )
+                    item.photo_file_id = ''
+                (to_update if item.pk else to_create).append(item)
+
+            Item.objects.bulk_create(to_create)
+            Item.objects.bulk_update(to_update, [
+                'name', 'description', 'price', 'structure', 'category',
+                'photo', 'photo_optimized', 'photo_thumbnail', 'photo_file_id',
+                'updated_at'
+            ])
+
+        self.stats['created'] += len(to_create)
+        self.stats['updated'] += len(to_update)
+
+    def create_categories(self, rows):
+        """Создает недостающие категории и запоминает их ID."""
+        names = {values['category'] for values in rows} - set(self.categories)
+        if not names:
+            return
+        Category.objects.bulk_create(
+            [Category(name=name, shop_id=self.shop_id) for name in names]
+        )
+        self.categories.update(
+            Category.objects.filter(shop_id=self.shop_id, name__in=names)
+            .values_list('name', 'id')
+        )
@@ -0,0 +1,68 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from bot.models import Item
+from bot.utils.images import (
+    derived_names,
+    needs_processing,
+    render_args,
+    render_variants
+)
+
+
+class Command(BaseCommand):
+    help = 'Подготовка оптимизированных фото и миниатюр для всего каталога'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.PHOTO_WORKERS,
+            help='Количество процессов для обработки фото'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Обработать заново даже уже подготовленные фото'
+        )
+
+    def handle(self, *args, **options):
+        items = [
+            item for item in Item.objects.exclude(photo='')
+            if options['force'] or needs_processing(item)
+        ]
+        if not items:
+            self.stdout.write('Нет фото для обработки.')
+            return
+
+        processed = []
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {
+                executor.submit(render_variants, *render_args(item.photo.name)): item
+                for item in items
+            }
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    self.stderr.write(f'Ошибка обработки {item.photo.name}: {e}')
+                    continue
+                item.photo_optimized, item.photo_thumbnail = derived_names(
+                    item.photo.name
+                )
+                item.photo_file_id = ''
+                item.updated_at = timezone.now()
+                processed.append(item)
+
+        Item.objects.bulk_update(
+            processed,
+            ['photo_optimized', 'photo_thumbnail', 'photo_file_id', 'updated_at'],
+            batch_size=500
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано фото: {len(processed)} из {len(items)}'
+        ))
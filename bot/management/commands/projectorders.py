@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from bot.models import Order
+from bot.utils.order_events import backfill, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересчет статусов и длительностей заказов по журналу событий'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backfill',
+            action='store_true',
+            help='Восстановить журнал для заказов без событий'
+        )
+        parser.add_argument('--order', type=int, help='Пересчитать только один заказ')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество заказов в одной транзакции'
+        )
+
+    def handle(self, *args, **options):
+        orders = Order.objects.order_by('id')
+        if options['order']:
+            orders = orders.filter(id=options['order'])
+
+        restored = 0
+        if options['backfill']:
+            for order in orders.filter(events__isnull=True).iterator():
+                backfill(order)
+                restored += 1
+            self.stdout.write(f'Восстановлен журнал заказов: {restored}')
+
+        rebuilt = 0
+        skipped = 0
+        last_id = 0
+        while True:
+            batch = list(orders.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            with transaction.atomic():
+                count = rebuild(batch)
+            rebuilt += count
+            skipped += len(batch) - count
+            last_id = batch[-1].id
+        if skipped:
+            self.stdout.write(f'Пропущено заказов без журнала: {skipped} (восстановите его через --backfill)')
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано заказов: {rebuilt}'))
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from bot.models import Item
+from bot.utils.recommendations import similar_ids
+
+
+class Command(BaseCommand):
+    help = 'Пересчет похожих букетов для всего каталога'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=3,
+            help='Количество похожих букетов для каждого букета'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=512,
+            help='Количество строк матрицы сходства в одном блоке'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        items = list(
+            Item.objects.values_list('id', 'structure', 'price', 'category_id', 'shop_id')
+        )
+        # Похожие букеты ищутся только в каталоге того же магазина
+        shops = {}
+        for item_id, structure, price, category_id, shop_id in items:
+            shops.setdefault(shop_id, []).append(
+                (item_id, structure, float(price), category_id)
+            )
+        neighbours = {}
+        for catalog in shops.values():
+            neighbours.update(similar_ids(catalog, options['top_k'], options['batch_size']))
+        computed = time.perf_counter()
+
+        now = timezone.now()
+        Item.objects.bulk_update(
+            [
+                Item(id=item_id, similar_ids=similar, updated_at=now)
+                for item_id, similar in neighbours.items()
+            ],
+            ['similar_ids', 'updated_at'],
+            batch_size=1000
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Букетов: {len(items)}, расчет: {computed - started:.2f} с, '
+            f'сохранение: {time.perf_counter() - computed:.2f} с'
+        ))
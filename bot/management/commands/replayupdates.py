@@ -0,0 +1,291 @@
+import asyncio
+import difflib
+import json
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from itertools import count
+from pathlib import Path
+from typing import Dict, List, Optional, Union, get_args, get_origin
+
+from aiogram import Bot
+from aiogram.client.default import Default
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import Chat, InputFile, Message, PhotoSize, User
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from bot.utils.capture import read_capture
+from bot.utils.dispatcher import create_dispatcher
+from bot.utils.inventory import PAYLOAD_PREFIX
+
+
+current_update: ContextVar[Optional[int]] = ContextVar("current_update", default=None)
+
+BOT_USER = User(id=42, is_bot=True, first_name="Replay", username="replay_bot")
+
+
+def jsonable(value):
+    """Приводит файлы и даты в параметрах запроса к виду, пригодному для сравнения."""
+    if isinstance(value, InputFile):
+        return f"file:{getattr(value, 'path', None) or value.filename}"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def method_call(method: TelegramMethod) -> list:
+    """
+    Возвращает название и параметры запроса к Telegram.
+
+    Параметры со значениями по умолчанию бота не включаются, а случайная
+    часть payload счета заменяется звездочкой, чтобы не мешать сравнению
+    прогонов.
+    """
+    params = {
+        name: value
+        for name, value in method.model_dump(exclude_none=True).items()
+        if not isinstance(value, Default)
+    }
+    if str(params.get("payload", "")).startswith(PAYLOAD_PREFIX):
+        params["payload"] = PAYLOAD_PREFIX + "*"
+    return [method.__api_method__, json.loads(json.dumps(params, default=jsonable))]
+
+
+class ReplaySession(BaseSession):
+    """
+    Сессия, которая запоминает запросы бота вместо отправки в Telegram.
+
+    Запросы группируются по обновлению, при обработке которого сделаны.
+    На запросы отправки возвращаются правдоподобные сообщения, чтобы
+    обработчики, читающие file_id отправленного фото, работали как обычно.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.calls: Dict[int, List[list]] = {}
+        self.message_ids = count(1)
+
+    def message(self, method: TelegramMethod, photo=None) -> Message:
+        chat_id = getattr(method, "chat_id", None)
+        photo = photo if photo is not None else getattr(method, "photo", None)
+        sizes = None
+        if photo is not None:
+            file_id = photo if isinstance(photo, str) else f"replay:{jsonable(photo)}"
+            sizes = [PhotoSize(file_id=file_id, file_unique_id=file_id, width=1, height=1)]
+        return Message(
+            message_id=next(self.message_ids),
+            date=datetime.now(),
+            chat=Chat(id=chat_id if isinstance(chat_id, int) else 0, type="private"),
+            from_user=BOT_USER,
+            text=getattr(method, "text", None),
+            photo=sizes
+        )
+
+    def result(self, method: TelegramMethod):
+        returning = method.__returning__
+        if get_origin(returning) is list and get_args(returning)[0] is Message:
+            return [self.message(method, media.media) for media in method.media]
+        if returning is Message or (
+            get_origin(returning) is Union and Message in get_args(returning)
+        ):
+            return self.message(method)
+        if returning is User:
+            return BOT_USER
+        return True
+
+    async def make_request(self, bot, method, timeout=None):
+        update_id = current_update.get()
+        self.calls.setdefault(update_id, []).append(method_call(method))
+        result = self.result(method)
+        return result.as_(bot) if isinstance(result, Message) else result
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+async def replay(path: Path, speed: float, limit: Optional[int]) -> dict:
+    """
+    Подает записанные обновления в диспетчер бота.
+
+    Args:
+        path (Path): Путь к файлу записи.
+        speed (float): Во сколько раз быстрее исходного темпа подавать
+            обновления; 0 — без пауз.
+        limit (Optional[int]): Максимальное количество обновлений.
+
+    Returns:
+        dict: Запросы бота по обновлениям, задержки и ошибки.
+    """
+    session = ReplaySession()
+    bot = Bot(token="42:REPLAY", session=session)
+    dispatcher = create_dispatcher({bot.id: None})
+
+    latencies = []
+    errors = []
+
+    async def process(update: dict) -> None:
+        current_update.set(update["update_id"])
+        arrived = time.perf_counter()
+        try:
+            await dispatcher.feed_raw_update(bot, update)
+        except Exception as e:
+            errors.append(f'{update["update_id"]}: {e!r}')
+        latencies.append(time.perf_counter() - arrived)
+
+    tasks = []
+    started = time.perf_counter()
+    for number, (at, update) in enumerate(read_capture(path)):
+        if limit is not None and number >= limit:
+            break
+        if speed:
+            delay = started + at / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(process(update)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    await dispatcher.storage.close()
+
+    return {
+        "calls": session.calls,
+        "latencies": sorted(latencies),
+        "elapsed": elapsed,
+        "errors": errors,
+    }
+
+
+def write_outputs(calls: Dict[int, List[list]], path: Path) -> None:
+    """Сохраняет запросы бота по обновлениям в JSONL для следующего сравнения."""
+    with open(path, "w", encoding="utf-8") as file:
+        for update_id in sorted(calls, key=lambda key: key or 0):
+            file.write(json.dumps(
+                {"update_id": update_id, "calls": calls[update_id]}, ensure_ascii=False
+            ) + "\n")
+
+
+def read_outputs(path: Path) -> Dict[int, List[list]]:
+    """Читает запросы бота, сохраненные предыдущим прогоном."""
+    with open(path, encoding="utf-8") as file:
+        records = (json.loads(line) for line in file if line.strip())
+        return {record["update_id"]: record["calls"] for record in records}
+
+
+def diff_outputs(baseline: Dict[int, List[list]], current: Dict[int, List[list]]):
+    """
+    Сравнивает запросы бота двух прогонов.
+
+    Returns:
+        Tuple[int, List[str]]: Количество совпавших обновлений и
+        различия по остальным в формате unified diff.
+    """
+    same = 0
+    diffs = []
+    for update_id in sorted(set(baseline) | set(current), key=lambda key: key or 0):
+        before = baseline.get(update_id, [])
+        after = current.get(update_id, [])
+        if before == after:
+            same += 1
+            continue
+        diffs.append("\n".join(difflib.unified_diff(
+            json.dumps(before, ensure_ascii=False, indent=1, sort_keys=True).splitlines(),
+            json.dumps(after, ensure_ascii=False, indent=1, sort_keys=True).splitlines(),
+            fromfile=f"baseline/{update_id}",
+            tofile=f"current/{update_id}",
+            lineterm=""
+        )))
+    return same, diffs
+
+
+def percentile(values: List[float], share: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * share))] * 1000 if values else 0.0
+
+
+class Command(BaseCommand):
+    help = 'Воспроизведение записанных обновлений без обращения к Telegram'
+
+    def add_arguments(self, parser):
+        parser.add_argument('capture', type=Path, help='Файл записи runbot --capture')
+        parser.add_argument(
+            '--speed',
+            type=float,
+            default=1.0,
+            help='Ускорение относительно исходного темпа, 0 — без пауз'
+        )
+        parser.add_argument('--limit', type=int, help='Воспроизвести первые N обновлений')
+        parser.add_argument(
+            '--database',
+            type=Path,
+            help='Копия базы SQLite, на которой воспроизводить запись'
+        )
+        parser.add_argument(
+            '--allow-live',
+            action='store_true',
+            help='Воспроизводить на базе из настроек'
+        )
+        parser.add_argument('--output', type=Path, help='Куда сохранить запросы бота')
+        parser.add_argument(
+            '--baseline',
+            type=Path,
+            help='Запросы предыдущего прогона для сравнения'
+        )
+        parser.add_argument(
+            '--max-diffs',
+            type=int,
+            default=10,
+            help='Сколько различий показать'
+        )
+
+    def handle(self, *args, **options):
+        if not options['capture'].exists():
+            raise CommandError(f'Файл {options["capture"]} не найден')
+        # Обработчики резервируют букеты и ставят сообщения курьерам в
+        # очередь, которую доставит работающий бот
+        if options['database']:
+            self.use_database(options['database'])
+        elif not options['allow_live']:
+            raise CommandError(
+                'Обработчики пишут в базу: укажите копию базы в --database '
+                'или явно разрешите базу из настроек флагом --allow-live'
+            )
+
+        result = asyncio.run(replay(options['capture'], options['speed'], options['limit']))
+        latencies = result["latencies"]
+        calls = result["calls"]
+        self.stdout.write(
+            f'Обновлений: {len(latencies)} за {result["elapsed"]:.2f} с '
+            f'({len(latencies) / result["elapsed"]:.0f} в секунду), '
+            f'запросов бота: {sum(map(len, calls.values()))}, '
+            f'задержка p50 {percentile(latencies, 0.5):.1f} мс, '
+            f'p95 {percentile(latencies, 0.95):.1f} мс, '
+            f'p99 {percentile(latencies, 0.99):.1f} мс, '
+            f'ошибок: {len(result["errors"])}'
+        )
+        for error in result["errors"][:options['max_diffs']]:
+            self.stderr.write(error)
+
+        if options['output']:
+            write_outputs(calls, options['output'])
+        if options['baseline']:
+            same, diffs = diff_outputs(read_outputs(options['baseline']), calls)
+            self.stdout.write(f'Совпало обновлений: {same}, отличается: {len(diffs)}')
+            for diff in diffs[:options['max_diffs']]:
+                self.stdout.write(diff)
+
+    def use_database(self, path: Path) -> None:
+        """Переключает соединение по умолчанию на копию базы SQLite."""
+        connection = connections['default']
+        if connection.vendor != 'sqlite':
+            raise CommandError('--database поддерживается только для SQLite')
+        if not path.exists():
+            raise CommandError(f'База {path} не найдена')
+        if path.resolve() == Path(settings.DATABASES['default']['NAME']).resolve():
+            raise CommandError('--database указывает на базу из настроек')
+        connection.close()
+        # Соединения потоков sync_to_async создаются по этому же словарю
+        connection.settings_dict['NAME'] = str(path)
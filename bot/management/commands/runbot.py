@@ -1,26 +1,104 @@
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from aiogram import Bot, Dispatcher
-from aiogram.enums import ParseMode
 import asyncio
-from bot.handlers.handlers import router
-from aiogram.client.default import DefaultBotProperties
+from pathlib import Path
+from bot.utils.startup import StartupTimer, first_calls_middleware, preload
+
+
+RESERVATION_REAP_INTERVAL = 60
 
 
 class Command(BaseCommand):
     help = 'Запуск Telegram бота'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--preload',
+            action='store_true',
+            help='Загрузить поисковый индекс, клавиатуры и file_id фото до опроса обновлений'
+        )
+        parser.add_argument(
+            '--shops',
+            action='store_true',
+            help='Кроме бота TG_BOT_TOKEN опрашивать ботов всех работающих магазинов'
+        )
+        parser.add_argument(
+            '--capture',
+            type=Path,
+            help='Записывать обезличенные входящие обновления в сжатый JSONL-файл'
+        )
+
     def handle(self, *args, **options):
+        timer = StartupTimer()
+        timer.mark("django")
+
+        # Обработчики тянут за собой aiogram.types — самый долгий импорт запуска
+        from aiogram import Bot
+        from aiogram.client.default import DefaultBotProperties
+        from aiogram.enums import ParseMode
+        from bot.utils.dispatcher import create_dispatcher, create_recorder
+        from bot.utils.inventory import inventory, run_reservation_reaper
+        from bot.utils.outbox import run_outbox_worker
+        from bot.utils.search import run_refresher
+        from bot.utils.telegram import create_session
+        from bot.utils.sessions import restore_snapshot, run_snapshotter, save_snapshot
+        from bot.utils.staff import load_staff
+        from bot.utils.tenancy import active_shops
+        timer.mark("router")
+
         async def main():
-            bot = Bot(
-                token=settings.TG_BOT_TOKEN,
-                default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+            # Боты всех магазинов делят одну HTTP-сессию и ее пул соединений
+            session = create_session(settings.TELEGRAM_API_URL or None)
+            session.middleware(first_calls_middleware(timer))
+            default = DefaultBotProperties(parse_mode=ParseMode.HTML)
+            shops = await active_shops() if options['shops'] else []
+            bots = {None: Bot(token=settings.TG_BOT_TOKEN, session=session, default=default)}
+            bots.update(
+                (shop.id, Bot(token=shop.bot_token, session=session, default=default))
+                for shop in shops
             )
+            tenants = {bots[None].id: None}
+            tenants.update((bots[shop.id].id, shop) for shop in shops)
 
-            dp = Dispatcher()
-            dp.include_router(router)
+            recorder = create_recorder(options['capture']) if options['capture'] else None
+            dp = create_dispatcher(tenants, recorder)
 
-            await bot.delete_webhook(drop_pending_updates=True)
-            await dp.start_polling(bot)
+            snapshot_path = Path(settings.SESSION_SNAPSHOT_PATH)
+            await restore_snapshot(
+                dp.storage, snapshot_path, settings.FSM_TTL_DAYS * 86400
+            )
+            await inventory.load()
+            await load_staff()
+            timer.mark("restore")
+            if options['preload']:
+                await preload(timer, [None, *shops])
+            snapshotter = asyncio.create_task(
+                run_snapshotter(
+                    dp.storage, snapshot_path, settings.SESSION_SNAPSHOT_INTERVAL
+                )
+            )
+            reaper = asyncio.create_task(
+                run_reservation_reaper(RESERVATION_REAP_INTERVAL)
+            )
+            refresher = asyncio.create_task(
+                run_refresher(settings.SEARCH_REFRESH_INTERVAL)
+            )
+            outbox = asyncio.create_task(
+                run_outbox_worker(bots, settings.OUTBOX_POLL_INTERVAL)
+            )
+            try:
+                await asyncio.gather(*(
+                    bot.delete_webhook(drop_pending_updates=False) for bot in bots.values()
+                ))
+                timer.log(f"Боты готовы к опросу обновлений: {len(bots)}")
+                await dp.start_polling(*bots.values())
+            finally:
+                refresher.cancel()
+                outbox.cancel()
+                reaper.cancel()
+                snapshotter.cancel()
+                await save_snapshot(dp.storage, snapshot_path)
+                if recorder:
+                    recorder.close()
 
-        asyncio.run(main())
\ No newline at end of file
+        asyncio.run(main())
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bot.utils.synthetic import clear, has_synthetic, seed
+
+
+class Command(BaseCommand):
+    help = 'Заполнение базы синтетическими букетами, пользователями, сотрудниками и заказами'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=10000, help='Количество букетов')
+        parser.add_argument('--orders', type=int, default=100000, help='Количество заказов')
+        parser.add_argument('--users', type=int, default=20000, help='Количество пользователей')
+        parser.add_argument('--couriers', type=int, default=20, help='Количество курьеров')
+        parser.add_argument('--florists', type=int, default=5, help='Количество флористов')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Количество строк в одной вставке'
+        )
+        parser.add_argument('--seed', type=int, default=1, help='Зерно генератора')
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Удалить синтетические данные прошлого запуска'
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted = clear(options['batch_size'])
+            self.stdout.write(f'Удалено синтетических заказов: {deleted}')
+        elif has_synthetic():
+            raise CommandError('В базе уже есть синтетические данные, добавьте --clear')
+
+        started = time.perf_counter()
+        created = seed(
+            items=options['items'],
+            orders=options['orders'],
+            users=options['users'],
+            couriers=options['couriers'],
+            florists=options['florists'],
+            batch_size=options['batch_size'],
+            random_seed=options['seed']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано за {time.perf_counter() - started:.1f} с: '
+            + ', '.join(f'{table} {count}' for table, count in created.items())
+        ))
@@ -0,0 +1,167 @@
+# Generated by Django 5.1.7 on 2026-10-18 23:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0010_remove_item_photo_url'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FSMData',
+            fields=[
+                ('user_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('state', models.CharField(blank=True, max_length=255, null=True)),
+                ('data', models.TextField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AlterModelOptions(
+            name='category',
+            options={'verbose_name': 'Событие', 'verbose_name_plural': 'События'},
+        ),
+        migrations.AlterModelOptions(
+            name='courier',
+            options={'verbose_name': 'Курьер', 'verbose_name_plural': 'Курьеры'},
+        ),
+        migrations.AlterModelOptions(
+            name='florist',
+            options={'verbose_name': 'Флорист', 'verbose_name_plural': 'Флористы'},
+        ),
+        migrations.AlterModelOptions(
+            name='item',
+            options={'verbose_name': 'Букет', 'verbose_name_plural': 'Букеты'},
+        ),
+        migrations.AlterModelOptions(
+            name='order',
+            options={'verbose_name': 'Заказ', 'verbose_name_plural': 'Заказы'},
+        ),
+        migrations.AlterModelOptions(
+            name='user',
+            options={'verbose_name': 'Пользователь', 'verbose_name_plural': 'Пользователи'},
+        ),
+        migrations.AddField(
+            model_name='courier',
+            name='status',
+            field=models.CharField(choices=[('active', 'Активен'), ('vacation', 'В отпуске'), ('sick', 'На больничном')], default='active', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='florist',
+            name='status',
+            field=models.CharField(choices=[('active', 'Активен'), ('vacation', 'В отпуске'), ('sick', 'На больничном')], default='active', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='courier',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='bot.courier'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='processing_time',
+            field=models.DurationField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[('new', 'Новый'), ('in_work', 'В работе'), ('delivered', 'Доставлен'), ('canceled', 'Отменен')], default='new', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='item',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='delivery_date',
+            field=models.DateField(default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='CourierAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assigned_at', models.DateTimeField(auto_now_add=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('delivery_time', models.DurationField(blank=True, null=True)),
+                ('courier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bot.courier')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bot.order')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='courier',
+            name='assigned_orders',
+            field=models.ManyToManyField(related_name='courier_assignments', through='bot.CourierAssignment', to='bot.order'),
+        ),
+        migrations.CreateModel(
+            name='CourierDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delivered', models.BooleanField(default=False, verbose_name='Доставлено')),
+                ('delivered_at', models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True, verbose_name='Время доставки')),
+                ('courier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bot.courier', verbose_name='Курьер')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bot.order', verbose_name='Заказ')),
+            ],
+            options={
+                'verbose_name': 'Доставка курьера',
+                'verbose_name_plural': 'Доставки курьеров',
+            },
+        ),
+        migrations.CreateModel(
+            name='FloristAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assigned_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('processing_time', models.DurationField(blank=True, null=True)),
+                ('florist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bot.florist')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bot.order')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='florist',
+            name='assigned_orders',
+            field=models.ManyToManyField(through='bot.FloristAssignment', to='bot.order'),
+        ),
+        migrations.CreateModel(
+            name='FloristCallback',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('needs_callback', models.BooleanField(default=True, verbose_name='Требуется перезвонить')),
+                ('callback_made', models.BooleanField(default=False, verbose_name='Перезвонил')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('phone_number', models.CharField(blank=True, max_length=20, null=True, verbose_name='Номер телефона')),
+                ('florist', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='bot.florist', verbose_name='Флорист')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='bot.order', verbose_name='Заказ')),
+            ],
+            options={
+                'verbose_name': 'Звонок флориста',
+                'verbose_name_plural': 'Звонки флористов',
+            },
+        ),
+        migrations.CreateModel(
+            name='Owner',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('can_assign', models.BooleanField(default=True)),
+                ('can_view_stats', models.BooleanField(default=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='bot.user')),
+            ],
+            options={
+                'verbose_name': 'Владелец',
+                'verbose_name_plural': 'Владелецы',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0011_sync_models'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='photo_optimized',
+            field=models.ImageField(blank=True, editable=False, upload_to='bouquets/optimized/', verbose_name='Оптимизированное фото'),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='photo_thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='bouquets/thumbnails/', verbose_name='Миниатюра'),
+        ),
+    ]
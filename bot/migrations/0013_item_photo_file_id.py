@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 23:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0012_item_photo_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='photo_file_id',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='file_id фото в Telegram'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 23:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0014_item_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='similar_ids',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Похожие букеты'),
+        ),
+    ]
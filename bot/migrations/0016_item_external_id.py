@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 23:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0015_item_similar_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True, verbose_name='Артикул'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-18 23:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0016_item_external_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.CharField(max_length=20)),
+                ('user_tg_id', models.BigIntegerField(null=True)),
+                ('item_id', models.BigIntegerField(null=True)),
+                ('item_name', models.CharField(max_length=30, null=True)),
+                ('item_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('name', models.CharField(max_length=30, null=True)),
+                ('address', models.CharField(max_length=50, null=True)),
+                ('delivery_date', models.DateField()),
+                ('delivery_time', models.TimeField()),
+                ('created_at', models.DateTimeField(null=True)),
+                ('completed_at', models.DateTimeField(null=True)),
+                ('processing_time', models.DurationField(null=True)),
+                ('courier_id', models.BigIntegerField(null=True)),
+                ('courier_name', models.CharField(max_length=30, null=True)),
+                ('delivered_at', models.DateTimeField(null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Архивный заказ',
+                'verbose_name_plural': 'Архивные заказы',
+            },
+        ),
+        migrations.AddField(
+            model_name='fsmdata',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
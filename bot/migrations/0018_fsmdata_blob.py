@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 23:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0017_retention'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fsmdata',
+            name='blob',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
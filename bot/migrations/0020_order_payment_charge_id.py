@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 00:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0019_geocoding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='payment_charge_id',
+            field=models.CharField(blank=True, editable=False, max_length=255, null=True, unique=True, verbose_name='ID платежа'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-19 00:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0021_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='stock',
+            field=models.PositiveIntegerField(blank=True, help_text='Пусто — без ограничения', null=True, verbose_name='Остаток'),
+        ),
+        migrations.CreateModel(
+            name='Reservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=32, unique=True)),
+                ('user_tg_id', models.BigIntegerField()),
+                ('status', models.CharField(choices=[('held', 'Забронирован'), ('confirmed', 'Оплачен'), ('released', 'Снят')], default='held', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bot.item')),
+            ],
+            options={
+                'verbose_name': 'Бронь',
+                'verbose_name_plural': 'Брони',
+            },
+        ),
+    ]
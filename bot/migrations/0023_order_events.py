@@ -0,0 +1,56 @@
+# Generated by Django 5.1.7 on 2026-10-19 00:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0022_inventory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='assigned_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Назначен курьер'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='delivery_duration',
+            field=models.DurationField(blank=True, null=True, verbose_name='Время доставки'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='paid_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Оплачен'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='picked_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Передан курьеру'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='preparation_time',
+            field=models.DurationField(blank=True, null=True, verbose_name='Время сборки'),
+        ),
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('created', 'Создан'), ('paid', 'Оплачен'), ('assigned', 'Назначен курьер'), ('picked', 'Передан курьеру'), ('delivered', 'Доставлен'), ('cancelled', 'Отменен')], max_length=10)),
+                ('at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('courier', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='bot.courier')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='bot.order')),
+            ],
+            options={
+                'verbose_name': 'Событие заказа',
+                'verbose_name_plural': 'События заказов',
+                'ordering': ['at', 'id'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('kind', 'assigned'), _negated=True), fields=('order', 'kind'), name='order_event_once')],
+            },
+        ),
+    ]
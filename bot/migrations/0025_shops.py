@@ -0,0 +1,103 @@
+# Generated by Django 5.1.7 on 2026-10-19 00:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+COLUMNS = "user_id, state, data, blob, updated_at"
+
+
+def copy_states(apps, schema_editor):
+    old = apps.get_model("bot", "FSMData")._meta.db_table
+    new = apps.get_model("bot", "FSMDataByShop")._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {new} ({COLUMNS}) SELECT {COLUMNS} FROM {old}")
+
+
+def copy_states_back(apps, schema_editor):
+    old = apps.get_model("bot", "FSMData")._meta.db_table
+    new = apps.get_model("bot", "FSMDataByShop")._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {old} ({COLUMNS}) SELECT {COLUMNS} FROM {new} WHERE shop_id IS NULL"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0024_staff_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Shop',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('bot_token', models.CharField(max_length=64, unique=True, verbose_name='Токен бота')),
+                ('payment_token', models.CharField(blank=True, help_text='Пусто — общий токен PAY_TG_TOKEN', max_length=255, verbose_name='Токен платежей')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Работает')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Магазин',
+                'verbose_name_plural': 'Магазины',
+            },
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='shop',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='bot.shop', verbose_name='Магазин'),
+        ),
+        migrations.AddField(
+            model_name='courier',
+            name='shop',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='bot.shop', verbose_name='Магазин'),
+        ),
+        migrations.AddField(
+            model_name='florist',
+            name='shop',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='bot.shop', verbose_name='Магазин'),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='shop',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='bot.shop', verbose_name='Магазин'),
+        ),
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='shop',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='bot.shop'),
+        ),
+        # Ключ состояния меняется с user_id на (магазин, user_id): таблица
+        # пересоздается, потому что первичный ключ нельзя переопределить на месте
+        migrations.CreateModel(
+            name='FSMDataByShop',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField()),
+                ('state', models.CharField(blank=True, max_length=255, null=True)),
+                ('data', models.TextField(blank=True, null=True)),
+                ('blob', models.BinaryField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('shop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='bot.shop')),
+            ],
+        ),
+        migrations.RunPython(copy_states, copy_states_back),
+        migrations.DeleteModel(
+            name='FSMData',
+        ),
+        migrations.RenameModel(
+            old_name='FSMDataByShop',
+            new_name='FSMData',
+        ),
+        migrations.AddConstraint(
+            model_name='fsmdata',
+            constraint=models.UniqueConstraint(fields=('shop', 'user_id'), name='fsm_data_shop_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='fsmdata',
+            constraint=models.UniqueConstraint(condition=models.Q(('shop__isnull', True)), fields=('user_id',), name='fsm_data_default_user'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-19 00:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0025_shops'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedorder',
+            name='assigned_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='delivery_duration',
+            field=models.DurationField(null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='paid_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='picked_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='preparation_time',
+            field=models.DurationField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='orderevent',
+            name='order',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='events', to='bot.order'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-19 00:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0026_archive_order_timings'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='item',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='Артикул'),
+        ),
+        migrations.AddConstraint(
+            model_name='item',
+            constraint=models.UniqueConstraint(fields=('shop', 'external_id'), name='item_shop_external_id'),
+        ),
+        migrations.AddConstraint(
+            model_name='item',
+            constraint=models.UniqueConstraint(condition=models.Q(('shop__isnull', True)), fields=('external_id',), name='item_default_external_id'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0027_item_external_id_per_shop'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedorder',
+            name='address',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='address',
+            field=models.CharField(max_length=255, null=True),
+        ),
+    ]
@@ -4,6 +4,29 @@ from django.db import models
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from bot.utils.images import needs_processing, schedule_item_photo
+
+
+class Shop(models.Model):
+    """Модель магазина со своим ботом, каталогом и сотрудниками"""
+    name = models.CharField(max_length=100, verbose_name="Название")
+    bot_token = models.CharField(max_length=64, unique=True, verbose_name="Токен бота")
+    payment_token = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="Токен платежей",
+        help_text="Пусто — общий токен PAY_TG_TOKEN"
+    )
+    is_active = models.BooleanField(default=True, verbose_name="Работает")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Магазин"
+        verbose_name_plural = "Магазины"
+
+    def __str__(self):
+        return self.name
+
 
 class User(models.Model):
     """Модель пользователя, представляющая его уникальный идентификатор в Telegram"""
@@ -20,6 +43,13 @@ class User(models.Model):
 class Category(models.Model):
     """Модель категории, представляющая разные категории событий"""
     name = models.CharField(max_length=100)
+    shop = models.ForeignKey(
+        "Shop",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name="Магазин"
+    )
 
     class Meta:
         verbose_name = "Событие"
@@ -31,6 +61,12 @@ class Category(models.Model):
 
 class Item(models.Model):
     """Модель товара, представляющая букет с его свойствами"""
+    external_id = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        verbose_name="Артикул"
+    )
     name = models.CharField(max_length=30)
     description = models.TextField(max_length=120)
     price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -40,11 +76,62 @@ class Item(models.Model):
         null=True
     )
     structure = models.TextField(max_length=100)
+    shop = models.ForeignKey(
+        "Shop",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name="Магазин"
+    )
+    stock = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Остаток",
+        help_text="Пусто — без ограничения"
+    )
     photo = models.ImageField(upload_to="bouquets/")
+    photo_optimized = models.ImageField(
+        upload_to="bouquets/optimized/",
+        blank=True,
+        editable=False,
+        verbose_name="Оптимизированное фото"
+    )
+    photo_thumbnail = models.ImageField(
+        upload_to="bouquets/thumbnails/",
+        blank=True,
+        editable=False,
+        verbose_name="Миниатюра"
+    )
+    photo_file_id = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        verbose_name="file_id фото в Telegram"
+    )
+    similar_ids = models.JSONField(
+        default=list,
+        blank=True,
+        editable=False,
+        verbose_name="Похожие букеты"
+    )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = "Букет"
         verbose_name_plural = "Букеты"
+        constraints = [
+            # Артикул уникален в каталоге магазина; записи без магазина
+            # проверяются отдельно, так как NULL не равен NULL
+            models.UniqueConstraint(
+                fields=["shop", "external_id"],
+                name="item_shop_external_id"
+            ),
+            models.UniqueConstraint(
+                fields=["external_id"],
+                condition=models.Q(shop__isnull=True),
+                name="item_default_external_id"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} — {self.price:.2f}₽"
@@ -64,6 +151,14 @@ class Courier(models.Model):
         through="CourierAssignment",
         related_name="courier_assignments"
     )
+    shop = models.ForeignKey(
+        "Shop",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name="Магазин"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Курьер"
@@ -86,6 +181,14 @@ class Florist(models.Model):
         "Order",
         through="FloristAssignment"
     )
+    shop = models.ForeignKey(
+        "Shop",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name="Магазин"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Флорист"
@@ -107,11 +210,24 @@ class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     item = models.ForeignKey(Item, on_delete=models.SET_NULL, null=True)
     name = models.CharField(max_length=30, null=True)
-    address = models.CharField(max_length=50, null=True)
+    address = models.CharField(max_length=255, null=True)
     delivery_date = models.DateField(default=timezone.now)
     delivery_time = models.TimeField()
     created_at = models.DateTimeField(auto_now_add=True, null=True)
+    paid_at = models.DateTimeField(null=True, blank=True, verbose_name="Оплачен")
+    assigned_at = models.DateTimeField(null=True, blank=True, verbose_name="Назначен курьер")
+    picked_at = models.DateTimeField(null=True, blank=True, verbose_name="Передан курьеру")
     completed_at = models.DateTimeField(null=True, blank=True)
+    preparation_time = models.DurationField(
+        null=True,
+        blank=True,
+        verbose_name="Время сборки"
+    )
+    delivery_duration = models.DurationField(
+        null=True,
+        blank=True,
+        verbose_name="Время доставки"
+    )
     processing_time = models.DurationField(null=True, blank=True)
     courier = models.ForeignKey(
         "Courier",
@@ -120,6 +236,16 @@ class Order(models.Model):
         blank=True,
         related_name="orders"
     )
+    latitude = models.FloatField(null=True, blank=True, verbose_name="Широта")
+    longitude = models.FloatField(null=True, blank=True, verbose_name="Долгота")
+    payment_charge_id = models.CharField(
+        max_length=255,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="ID платежа"
+    )
 
     class Meta:
         verbose_name = "Заказ"
@@ -129,11 +255,164 @@ class Order(models.Model):
         return f"Заказ# {self.id} для {self.name}"
 
 
+class OrderEvent(models.Model):
+    """Модель события заказа; события только добавляются и не изменяются"""
+    KINDS = [
+        ("created", "Создан"),
+        ("paid", "Оплачен"),
+        ("assigned", "Назначен курьер"),
+        ("picked", "Передан курьеру"),
+        ("delivered", "Доставлен"),
+        ("cancelled", "Отменен")
+    ]
+
+    # Журнал переживает перенос заказа в архив: ArchivedOrder сохраняет ID
+    # заказа, поэтому события архивного заказа находятся по order_id
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="events"
+    )
+    kind = models.CharField(max_length=10, choices=KINDS)
+    courier = models.ForeignKey(
+        "Courier",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True
+    )
+    at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Событие заказа"
+        verbose_name_plural = "События заказов"
+        ordering = ["at", "id"]
+        constraints = [
+            # Переназначить курьера можно, остальные события случаются один раз
+            models.UniqueConstraint(
+                fields=["order", "kind"],
+                condition=~models.Q(kind="assigned"),
+                name="order_event_once"
+            )
+        ]
+
+    def __str__(self):
+        return f"Заказ #{self.order_id}: {self.get_kind_display()}"
+
+
+class ArchivedOrder(models.Model):
+    """Модель архивного заказа, перенесенного из таблицы заказов"""
+    id = models.BigIntegerField(primary_key=True)
+    status = models.CharField(max_length=20)
+    user_tg_id = models.BigIntegerField(null=True)
+    item_id = models.BigIntegerField(null=True)
+    item_name = models.CharField(max_length=30, null=True)
+    item_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    name = models.CharField(max_length=30, null=True)
+    address = models.CharField(max_length=255, null=True)
+    delivery_date = models.DateField()
+    delivery_time = models.TimeField()
+    created_at = models.DateTimeField(null=True)
+    completed_at = models.DateTimeField(null=True)
+    processing_time = models.DurationField(null=True)
+    paid_at = models.DateTimeField(null=True)
+    assigned_at = models.DateTimeField(null=True)
+    picked_at = models.DateTimeField(null=True)
+    preparation_time = models.DurationField(null=True)
+    delivery_duration = models.DurationField(null=True)
+    courier_id = models.BigIntegerField(null=True)
+    courier_name = models.CharField(max_length=30, null=True)
+    delivered_at = models.DateTimeField(null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Архивный заказ"
+        verbose_name_plural = "Архивные заказы"
+
+    def __str__(self):
+        return f"Архивный заказ# {self.id} для {self.name}"
+
+
+class Reservation(models.Model):
+    """Модель брони букета на время оплаты счета"""
+    token = models.CharField(max_length=32, unique=True)
+    item = models.ForeignKey(Item, on_delete=models.CASCADE)
+    user_tg_id = models.BigIntegerField()
+    status = models.CharField(max_length=10, choices=[
+        ("held", "Забронирован"),
+        ("confirmed", "Оплачен"),
+        ("released", "Снят")
+    ], default="held")
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Бронь"
+        verbose_name_plural = "Брони"
+
+    def __str__(self):
+        return f"Бронь {self.item_id} для {self.user_tg_id}"
+
+
+class OutboxMessage(models.Model):
+    """Модель исходящего уведомления сотруднику, отправляемого фоновой задачей"""
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, null=True, blank=True)
+    chat_id = models.BigIntegerField()
+    text = models.TextField()
+    reply_markup = models.JSONField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now, null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Исходящее уведомление"
+        verbose_name_plural = "Исходящие уведомления"
+        indexes = [models.Index(fields=["sent_at", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"Уведомление #{self.id} для {self.chat_id}"
+
+
+class GeocodeCache(models.Model):
+    """Модель сохраненных координат адресов доставки"""
+    key = models.CharField(max_length=255, unique=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    precision = models.CharField(max_length=10, choices=[
+        ("house", "Дом"),
+        ("street", "Улица")
+    ])
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Координаты адреса"
+        verbose_name_plural = "Координаты адресов"
+
+    def __str__(self):
+        return self.key
+
+
 class FSMData(models.Model):
     """Модель для хранения данных конечного автомата состояния"""
-    user_id = models.IntegerField(primary_key=True)
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, null=True, blank=True)
+    user_id = models.BigIntegerField()
     state = models.CharField(max_length=255, blank=True, null=True)
     data = models.TextField(blank=True, null=True)
+    blob = models.BinaryField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            # У пользователя одно сохраненное состояние в каждом магазине
+            models.UniqueConstraint(fields=["shop", "user_id"], name="fsm_data_shop_user"),
+            models.UniqueConstraint(
+                fields=["user_id"],
+                condition=models.Q(shop__isnull=True),
+                name="fsm_data_default_user"
+            )
+        ]
 
     def __str__(self):
         return f"FSMData for user {self.user_id}"
@@ -174,11 +453,24 @@ class Owner(models.Model):
         verbose_name_plural = "Владелецы"
 
 
+@receiver(post_save, sender=Item)
+def process_item_photo(sender, instance, **kwargs):
+    """Запускает фоновую подготовку фото букета для отправки в Telegram"""
+    if needs_processing(instance) and instance.photo_file_id:
+        Item.objects.filter(id=instance.id).update(photo_file_id="", updated_at=timezone.now())
+    schedule_item_photo(instance)
+
+
 @receiver(post_save, sender=Order)
 def assign_courier(sender, instance, created, **kwargs):
     """Автоматически назначает активного курьера на новый заказ"""
-    if created:
-        courier = Courier.objects.filter(status="active").first()
+    if created and instance.courier_id is None and not getattr(instance, "events_recorded", False):
+        # Журнал и список сотрудников импортируют модели, поэтому импорт здесь
+        from bot.utils.order_events import record_event
+        from bot.utils.staff import couriers
+
+        shop_id = Item.objects.filter(id=instance.item_id).values_list("shop_id", flat=True).first()
+        courier = couriers.pick(shop_id)
         if courier:
             CourierAssignment.objects.create(
                 courier=courier,
@@ -186,6 +478,7 @@ def assign_courier(sender, instance, created, **kwargs):
             )
             instance.courier = courier
             instance.save()
+            record_event(instance, "assigned", courier=courier)
 
 
 class FloristCallback(models.Model):
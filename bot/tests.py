@@ -1,3 +1,682 @@
-from django.test import TestCase
+import asyncio
+import json
+import tempfile
+import zlib
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from aiogram.exceptions import (
+    ClientDecodeError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError
+)
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import GetChat, GetUpdates, SendMessage
+from aiogram.types import Chat, Message
+from aiogram.types import User as TelegramUser
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone as django_timezone
+
+from bot.management.commands.importcatalog import RowError, validate_row
+from bot.models import (
+    Courier,
+    FSMData,
+    Item,
+    Order,
+    OrderEvent,
+    OutboxMessage,
+    Reservation,
+    Shop,
+    User
+)
+from bot.utils.address import canonical_address, is_valid, parse_address
+from bot.utils.capture import Anonymizer
+from bot.utils.fsm_codec import (
+    T_DATE,
+    T_DATETIME,
+    T_DECIMAL,
+    T_TIME,
+    VERSION,
+    CodecError,
+    ItemIds,
+    _put_uint,
+    attach_items,
+    decode_legacy_json,
+    decode_state,
+    encode_state
+)
+from bot.utils.inventory import confirm, hold, release_expired
+from bot.utils.order_events import project, record_event
+from bot.utils.outbox import send_due
+from bot.utils.requests import commit_order, get_fsm_state
+from bot.utils.sessions import MAGIC, _frame, decode_snapshot, encode_snapshot, restore_snapshot
+from bot.utils.scheduling import OrderedIsolation
+from bot.utils.staff import couriers, florists
+from bot.utils.telegram import RetryPolicy
+from bot.utils.tenancy import using
+from bot.utils.throttling import FloodControl
+
+
+class FSMCodecTests(SimpleTestCase):
+    """Проверки двоичного кодека состояния FSM"""
+
+    def assertRoundTrip(self, data):
+        decoded = decode_state(encode_state(data))
+        self.assertEqual(decoded, data)
+        for key, value in data.items():
+            self.assertIs(type(decoded[key]), type(value), key)
+        return decoded
+
+    def test_scalars(self):
+        self.assertRoundTrip({
+            "occasion": "2",
+            "current_page": 3,
+            "latitude": 55.75,
+            "with_flowers": "",
+            "phone": None,
+            "flag": True,
+            "negative": -2**40,
+        })
+
+    def test_decimal_keeps_exponent(self):
+        decoded = self.assertRoundTrip({
+            "item_price": Decimal("1500.00"),
+            "custom": Decimal("-0.125"),
+        })
+        self.assertEqual(str(decoded["item_price"]), "1500.00")
+
+    def test_date_and_time(self):
+        self.assertRoundTrip({
+            "delivery_date": date(2025, 3, 8),
+            "delivery_time": time(14, 30, 5, 123),
+            "midnight": time(0, 0),
+            "created": datetime(2025, 3, 8, 14, 30, tzinfo=timezone.utc),
+        })
+
+    def test_nested_and_custom_keys(self):
+        self.assertRoundTrip({
+            "custom": {"a": [1, "б", None, [Decimal("2.5")]]},
+            "empty": [],
+        })
+
+    def test_items_are_stored_as_ids(self):
+        items = [Item(id=item_id, name=f"Букет {item_id}") for item_id in (7, 3, 1000, 3)]
+        decoded = decode_state(encode_state({"filtered_items": items}))
+        self.assertIsInstance(decoded["filtered_items"], ItemIds)
+        self.assertEqual(decoded["filtered_items"], [7, 3, 1000, 3])
+
+        by_id = {item.id: item for item in items if item.id != 1000}
+        attached = attach_items(decoded, by_id)
+        self.assertEqual([item.id for item in attached["filtered_items"]], [7, 3, 3])
+
+    def test_large_state_is_compressed(self):
+        data = {"address": "ул. Ленина, д. 15 " * 100}
+        raw = encode_state(data)
+        self.assertEqual(raw[1], 1)
+        self.assertEqual(decode_state(raw), data)
+
+    def test_unsupported_type(self):
+        with self.assertRaises(CodecError):
+            encode_state({"value": object()})
+
+    def test_legacy_json(self):
+        text = json.dumps({
+            "occasion": "2",
+            "item_price": 1500.0,
+            "filtered_items": [{"id": 5, "name": "Букет", "price": 0.0}, {"name": "без id"}],
+        })
+        data = decode_legacy_json(text)
+        self.assertEqual(data["item_price"], Decimal("1500.0"))
+        self.assertIsInstance(data["filtered_items"], ItemIds)
+        self.assertEqual(data["filtered_items"], [5])
+        self.assertEqual(data["occasion"], "2")
+
+    def test_corrupt_input(self):
+        valid = encode_state({"name": "Анна", "current_page": 300})
+        day_and_more = bytearray((VERSION, 0, 1, T_TIME))
+        _put_uint(day_and_more, 86400 * 1_000_000)
+        cases = {
+            "short": b"\x01",
+            "version": bytes((VERSION + 1, 0)),
+            "truncated": valid[:-1],
+            "unknown type": bytes((VERSION, 0, 1, 200)),
+            "unknown key": bytes((VERSION, 0, 250, 0)),
+            "bad utf-8": bytes((VERSION, 0, 1, 5, 2, 0xff, 0xfe)),
+            "bad zlib": bytes((VERSION, 1)) + b"not zlib",
+            "truncated zlib": bytes((VERSION, 1)) + zlib.compress(b"\x01\x05\x10")[:-2],
+            "bad decimal": bytes((VERSION, 0, 1, T_DECIMAL, 3)) + b"abc",
+            "zero date": bytes((VERSION, 0, 1, T_DATE, 0)),
+            "bad datetime": bytes((VERSION, 0, 1, T_DATETIME, 3)) + b"bad",
+            "time past midnight": bytes(day_and_more),
+        }
+        for name, raw in cases.items():
+            with self.subTest(name), self.assertRaises(CodecError):
+                decode_state(raw)
+
+        with self.assertRaises(CodecError):
+            decode_legacy_json("{не json")
+
+
+class FSMStorageTests(TestCase):
+    """Проверки загрузки сохраненного состояния FSM"""
+
+    def test_corrupt_blob_resets_data(self):
+        FSMData.objects.create(
+            user_id=1, state="OrderState:choosing_price", blob=bytes((VERSION, 1)) + b"bad"
+        )
+        self.assertEqual(get_fsm_state.func(1), ("OrderState:choosing_price", {}))
+
+    def test_legacy_row_is_read(self):
+        FSMData.objects.create(user_id=2, state="OrderState:choosing_occasion", data='{"occasion": "3"}')
+        self.assertEqual(get_fsm_state.func(2), ("OrderState:choosing_occasion", {"occasion": "3"}))
+
+
+class OrderProjectionTests(TestCase):
+    """Проверки пересчета заказов по журналу событий"""
+
+    def create_order(self, **fields):
+        return Order.objects.create(delivery_time=time(12, 0), **fields)
+
+    def test_legacy_order_survives_rebuild(self):
+        completed = datetime(2025, 3, 8, 15, 0, tzinfo=timezone.utc)
+        order = self.create_order(status="delivered", completed_at=completed)
+        OrderEvent.objects.filter(order=order).delete()
+
+        call_command("projectorders", stdout=StringIO())
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, "delivered")
+        self.assertEqual(order.completed_at, completed)
+
+    def test_events_are_replayed(self):
+        order = self.create_order()
+        paid = order.created_at + timedelta(minutes=5)
+        record_event(order, "paid", at=paid)
+        record_event(order, "delivered", at=paid + timedelta(hours=1))
+        Order.objects.filter(id=order.id).update(status="new", completed_at=None, paid_at=None)
+
+        call_command("projectorders", stdout=StringIO())
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, "delivered")
+        self.assertEqual(order.paid_at, paid)
+        self.assertEqual(order.processing_time, timedelta(hours=1, minutes=5))
+
+    def test_backfill_restores_journal(self):
+        order = self.create_order(status="canceled")
+        OrderEvent.objects.filter(order=order).delete()
+
+        call_command("projectorders", "--backfill", stdout=StringIO())
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, "canceled")
+        self.assertEqual(
+            list(order.events.values_list("kind", flat=True)), ["created", "cancelled"]
+        )
+
+
+class AddressTests(SimpleTestCase):
+    """Проверки разбора адреса доставки"""
+
+    def assertCanonical(self, text, expected):
+        canonical = canonical_address(parse_address(text))
+        self.assertEqual(canonical, expected)
+        self.assertTrue(is_valid(canonical), canonical)
+
+    def test_spellings(self):
+        self.assertCanonical("город Москва улица Ленина дом 15", "г. Москва, ул. Ленина, д. 15")
+        self.assertCanonical(
+            "г.Москва, ул.Ленина, д.15, корп. 2, стр. 1, кв. 3",
+            "г. Москва, ул. Ленина, д. 15, к. 2, стр. 1, кв. 3"
+        )
+
+    def test_street_type_after_name(self):
+        self.assertCanonical(
+            "г. Санкт-Петербург, Невский проспект, дом 25/3, кв. 10",
+            "г. Санкт-Петербург, пр-т Невский, д. 25/3, кв. 10"
+        )
+
+    def test_flat_with_letter(self):
+        self.assertCanonical("г. Москва, ул. Ленина, д. 5, кв. 3А", "г. Москва, ул. Ленина, д. 5, кв. 3а")
+
+    def test_long_address(self):
+        self.assertCanonical(
+            "г. Санкт-Петербург, набережная Реки Фонтанки, дом 120, корпус 2, квартира 145",
+            "г. Санкт-Петербург, наб. Реки Фонтанки, д. 120, к. 2, кв. 145"
+        )
+
+    def test_missing_house(self):
+        address = parse_address("г. Москва, ул. Ленина")
+        self.assertEqual((address.city, address.street, address.house), ("Москва", "Ленина", ""))
+        self.assertFalse(is_valid(canonical_address(address)))
+
+
+class FlakyBot:
+    """Бот, отправка которого в выбранные чаты падает с ошибкой"""
+
+    def __init__(self, failing_chats):
+        self.failing_chats = failing_chats
+        self.sent = []
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        if chat_id in self.failing_chats:
+            raise RuntimeError("сбой")
+        self.sent.append(chat_id)
+
+
+class OutboxTests(TestCase):
+    """Проверки отправки уведомлений из очереди"""
+
+    async def test_unexpected_error_does_not_stop_batch(self):
+        failing = await OutboxMessage.objects.acreate(chat_id=1, text="первое")
+        await OutboxMessage.objects.acreate(chat_id=2, text="второе")
+        bot = FlakyBot({1})
+
+        with self.assertLogs("bot.utils.outbox", "ERROR"):
+            self.assertEqual(await send_due({None: bot}), 2)
+
+        self.assertEqual(bot.sent, [2])
+        await failing.arefresh_from_db()
+        self.assertIsNone(failing.sent_at)
+        self.assertEqual(failing.attempts, 1)
+        self.assertGreater(failing.next_attempt_at, failing.created_at)
+        self.assertEqual(failing.last_error, "сбой")
+        self.assertEqual(await OutboxMessage.objects.filter(sent_at__isnull=False).acount(), 1)
+
+
+def forget_staff():
+    """Сбрасывает списки сотрудников в памяти: они переживают откат транзакции теста."""
+    for roster in (couriers, florists):
+        roster.members, roster.by_tg_id, roster.load, roster.version = {}, {}, {}, None
+
+
+class CheckoutTests(TestCase):
+    """Проверки оформления оплаченного заказа"""
+
+    def setUp(self):
+        User.objects.create(tg_id=100)
+        self.item = Item.objects.create(name="Букет", description="", price=Decimal(1500), structure="")
+        self.courier = Courier.objects.create(name="Курьер", tg_id=200)
+        couriers.reload()
+        self.addCleanup(forget_staff)
+
+    def commit(self, payment_charge_id="charge-1"):
+        return commit_order.func(
+            100, self.item.id, "Анна", "г. Москва, ул. Ленина, д. 15", "2025-03-08", "14:00",
+            payment_charge_id
+        )
+
+    def test_order_is_assigned_to_courier(self):
+        order, delivery, created = self.commit()
+        self.assertTrue(created)
+        self.assertEqual((order.status, order.courier_id), ("in_work", self.courier.id))
+        self.assertEqual(delivery.courier_id, self.courier.id)
+        self.assertEqual(
+            list(order.events.values_list("kind", flat=True)), ["created", "paid", "assigned"]
+        )
+        self.assertEqual(couriers.load[self.courier.id], 1)
+
+    def test_repeated_payment_keeps_load(self):
+        first, _, _ = self.commit()
+        second, _, created = self.commit()
+        self.assertFalse(created)
+        self.assertEqual(second.id, first.id)
+        self.assertEqual(couriers.load[self.courier.id], 1)
+
+    def test_failure_releases_courier_load(self):
+        with mock.patch("bot.utils.requests.confirm_reservation", side_effect=RuntimeError("сбой")):
+            with self.assertRaises(RuntimeError):
+                self.commit()
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(couriers.load[self.courier.id], 0)
+
+
+class ImportRowTests(SimpleTestCase):
+    """Проверки строк импорта каталога"""
+
+    def row(self, external_id):
+        return {
+            "external_id": external_id,
+            "name": "Букет",
+            "description": "Описание",
+            "price": "1500,50",
+            "category": "8 марта",
+            "structure": "Розы",
+        }
+
+    def test_valid_row(self):
+        values = validate_row(self.row(" A-1_b.2 "), Path("."))
+        self.assertEqual(values["external_id"], "A-1_b.2")
+        self.assertEqual(values["price"], Decimal("1500.50"))
+        self.assertIsNone(values["source"])
+
+    def test_external_id_is_safe_file_name(self):
+        for external_id in ("../../x", "a/b", "a\\b", "..", ".", "артикул", "a" * 65):
+            with self.subTest(external_id), self.assertRaises(RowError):
+                validate_row(self.row(external_id), Path("."))
+
+
+class SnapshotTests(SimpleTestCase):
+    """Проверки снимка сессий FSM"""
+
+    key = StorageKey(bot_id=42, chat_id=1, user_id=1)
+
+    def snapshot_with_bad_entry(self):
+        raw, count = encode_snapshot([(self.key, "OrderState:waiting_for_name", {"occasion": "2"})])
+        self.assertEqual(count, 1)
+        # Запись без состояния и запись с лишним полем ключа
+        bad = _frame(encode_state({"bot_id": 42, "chat_id": 2, "user_id": 2})) + _frame(encode_state({}))
+        bad += _frame(encode_state({"chat": 3, "state": None})) + _frame(encode_state({}))
+        body = bad + zlib.decompress(raw[len(MAGIC) + 1:])
+        return raw[:len(MAGIC) + 1] + zlib.compress(body)
+
+    def test_round_trip(self):
+        raw, _ = encode_snapshot([(self.key, "OrderState:waiting_for_name", {"occasion": "2"})])
+        self.assertEqual(
+            decode_snapshot(raw), [(self.key, "OrderState:waiting_for_name", {"occasion": "2"})]
+        )
+
+    def test_malformed_entry_is_skipped(self):
+        with self.assertLogs("bot.utils.sessions", "WARNING") as logs:
+            sessions = decode_snapshot(self.snapshot_with_bad_entry())
+        self.assertEqual(len(logs.output), 2)
+        self.assertEqual(sessions, [(self.key, "OrderState:waiting_for_name", {"occasion": "2"})])
+
+    async def test_restore_skips_malformed_entry(self):
+        storage = MemoryStorage()
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "sessions.snapshot"
+            path.write_bytes(self.snapshot_with_bad_entry())
+            with self.assertLogs("bot.utils.sessions", "WARNING"):
+                self.assertEqual(await restore_snapshot(storage, path, 3600), 1)
+        self.assertEqual(await storage.get_state(self.key), "OrderState:waiting_for_name")
+        self.assertEqual(await storage.get_data(self.key), {"occasion": "2"})
+
+    def test_unknown_format(self):
+        with self.assertRaises(CodecError):
+            decode_snapshot(b"not a snapshot")
+
+
+class OrderedIsolationTests(SimpleTestCase):
+    """Проверки очереди обновлений пользователей"""
+
+    async def test_same_user_is_processed_in_order(self):
+        isolation = OrderedIsolation(10)
+        key = StorageKey(bot_id=42, chat_id=1, user_id=1)
+        processed = []
+
+        async def handle(number, pause):
+            async with isolation.lock(key):
+                await asyncio.sleep(pause)
+                processed.append(number)
+
+        await asyncio.gather(handle(1, 0.02), handle(2, 0), handle(3, 0))
+        self.assertEqual(processed, [1, 2, 3])
+        self.assertEqual(isolation.queues, {})
+
+    async def test_in_flight_limit(self):
+        isolation = OrderedIsolation(2)
+        running = peak = 0
+
+        async def handle(user_id):
+            nonlocal running, peak
+            async with isolation.lock(StorageKey(bot_id=42, chat_id=user_id, user_id=user_id)):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(handle(user_id) for user_id in range(6)))
+        self.assertEqual(peak, 2)
+        self.assertEqual(isolation.queues, {})
+
+
+class FloodControlTests(SimpleTestCase):
+    """Проверки ограничения частоты запросов"""
+
+    def test_burst_and_refill(self):
+        flood_control = FloodControl(rate=1, burst=3, dedup_window=1)
+        self.assertEqual([flood_control.allow(1, 0.0) for _ in range(4)], [True, True, True, False])
+        self.assertTrue(flood_control.allow(2, 0.0))
+        self.assertFalse(flood_control.allow(1, 0.5))
+        self.assertTrue(flood_control.allow(1, 1.6))
+
+    def test_duplicate_press(self):
+        flood_control = FloodControl(rate=1, burst=3, dedup_window=1)
+        self.assertFalse(flood_control.is_duplicate(1, "buy", 0.0))
+        self.assertTrue(flood_control.is_duplicate(1, "buy", 0.5))
+        self.assertFalse(flood_control.is_duplicate(1, "next", 0.6))
+        self.assertFalse(flood_control.is_duplicate(1, "next", 2.0))
+        flood_control.in_flight.add((1, "pay"))
+        self.assertTrue(flood_control.is_duplicate(1, "pay", 10.0))
+
+    def test_prune(self):
+        flood_control = FloodControl(rate=1, burst=3, dedup_window=1)
+        flood_control.allow(1, 0.0)
+        flood_control.is_duplicate(1, "buy", 0.0)
+        flood_control.prune(10.0)
+        self.assertEqual((flood_control.buckets, flood_control.recent), ({}, {}))
+
+    async def test_messages_over_limit_are_dropped(self):
+        flood_control = FloodControl(rate=0.001, burst=2, dedup_window=1)
+        message = Message(
+            message_id=1, date=datetime.now(), chat=Chat(id=1, type="private"), text="привет"
+        )
+        data = {"event_from_user": TelegramUser(id=1, is_bot=False, first_name="U")}
+        handled = []
+
+        async def handler(event, data):
+            handled.append(event.message_id)
+            return True
+
+        results = [await flood_control(handler, message, data) for _ in range(3)]
+        self.assertEqual(results, [True, True, None])
+        self.assertEqual(len(handled), 2)
+
+
+class RetryPolicyTests(SimpleTestCase):
+    """Проверки повтора запросов к Bot API"""
+
+    async def call(self, method, errors):
+        errors = list(errors)
+        calls = []
+
+        async def make_request(bot, method):
+            calls.append(method.__api_method__)
+            if errors:
+                raise errors.pop(0)
+            return "ok"
+
+        try:
+            with mock.patch("bot.utils.telegram.logger"):
+                result = await RetryPolicy(retries=3, backoff_max=0)(make_request, None, method)
+        except Exception as e:
+            result = e
+        return result, len(calls)
+
+    async def test_idempotent_method_is_retried(self):
+        method = GetChat(chat_id=1)
+        result, calls = await self.call(method, [TelegramServerError(method, "Bad Gateway")])
+        self.assertEqual((result, calls), ("ok", 2))
+
+    async def test_send_is_not_retried_after_server_error(self):
+        method = SendMessage(chat_id=1, text="привет")
+        for error in (
+            TelegramServerError(method, "Bad Gateway"),
+            ClientDecodeError("Ответ не JSON", ValueError(), "<html>"),
+            TelegramNetworkError(method, "ServerDisconnectedError: Server disconnected"),
+        ):
+            with self.subTest(type(error).__name__):
+                result, calls = await self.call(method, [error])
+                self.assertIs(result, error)
+                self.assertEqual(calls, 1)
+
+    async def test_send_is_retried_when_not_connected(self):
+        method = SendMessage(chat_id=1, text="привет")
+        error = TelegramNetworkError(method, "ClientConnectorError: Cannot connect to host")
+        result, calls = await self.call(method, [error])
+        self.assertEqual((result, calls), ("ok", 2))
+
+    async def test_retry_after(self):
+        method = SendMessage(chat_id=1, text="привет")
+        result, calls = await self.call(method, [TelegramRetryAfter(method, "Flood", retry_after=0)])
+        self.assertEqual((result, calls), ("ok", 2))
+        result, calls = await self.call(method, [TelegramRetryAfter(method, "Flood", retry_after=30)])
+        self.assertIsInstance(result, TelegramRetryAfter)
+        self.assertEqual(calls, 1)
+
+    async def test_attempts_are_limited(self):
+        method = GetChat(chat_id=1)
+        result, calls = await self.call(method, [TelegramServerError(method, "Bad Gateway")] * 5)
+        self.assertIsInstance(result, TelegramServerError)
+        self.assertEqual(calls, 4)
+
+    async def test_get_updates_is_not_retried(self):
+        method = GetUpdates()
+        result, calls = await self.call(method, [TelegramServerError(method, "Bad Gateway")])
+        self.assertIsInstance(result, TelegramServerError)
+        self.assertEqual(calls, 1)
+
+
+class InventoryTests(TestCase):
+    """Проверки броней букетов"""
+
+    def setUp(self):
+        self.shop = Shop.objects.create(name="Второй магазин", bot_token="2:token")
+        self.item = self.create_item(stock=2)
+        self.other_item = self.create_item(stock=1, shop=self.shop)
+
+    def create_item(self, **fields):
+        return Item.objects.create(name="Букет", description="", price=Decimal(1500), structure="", **fields)
+
+    def stock(self, item):
+        item.refresh_from_db()
+        return item.stock
+
+    def test_hold_takes_stock(self):
+        reservation, released = hold(self.item.id, 1, 600)
+        self.assertEqual((reservation.status, released), ("held", []))
+        self.assertEqual(self.stock(self.item), 1)
+
+    def test_out_of_stock(self):
+        hold(self.item.id, 1, 600)
+        hold(self.item.id, 2, 600)
+        reservation, _ = hold(self.item.id, 3, 600)
+        self.assertIsNone(reservation)
+        self.assertEqual(self.stock(self.item), 0)
+
+    def test_new_hold_releases_previous_in_same_shop(self):
+        first, _ = hold(self.item.id, 1, 600)
+        second, released = hold(self.item.id, 1, 600)
+        self.assertEqual(released, [first.token])
+        self.assertEqual(Reservation.objects.get(id=first.id).status, "released")
+        self.assertEqual(self.stock(self.item), 1)
+
+    def test_holds_in_other_shops_are_kept(self):
+        with using(self.shop):
+            other, _ = hold(self.other_item.id, 1, 600)
+        _, released = hold(self.item.id, 1, 600)
+        self.assertEqual(released, [])
+        self.assertEqual(Reservation.objects.get(id=other.id).status, "held")
+        self.assertEqual(self.stock(self.other_item), 0)
+
+    def test_confirm(self):
+        reservation, _ = hold(self.item.id, 1, 600)
+        confirm(reservation.token, self.item.id)
+        self.assertEqual(Reservation.objects.get(id=reservation.id).status, "confirmed")
+        self.assertEqual(self.stock(self.item), 1)
+
+    def test_confirm_after_expiry_takes_stock_again(self):
+        reservation, _ = hold(self.item.id, 1, 0)
+        self.assertEqual(release_expired(django_timezone.now()), [reservation.token])
+        self.assertEqual(self.stock(self.item), 2)
+        confirm(reservation.token, self.item.id)
+        self.assertEqual(self.stock(self.item), 1)
+
+
+class ProjectionTests(SimpleTestCase):
+    """Проверки применения событий к заказу"""
+
+    started = datetime(2025, 3, 8, 10, 0, tzinfo=timezone.utc)
+
+    def event(self, kind, minutes, courier_id=None):
+        return OrderEvent(kind=kind, at=self.started + timedelta(minutes=minutes), courier_id=courier_id)
+
+    def test_timings(self):
+        order = Order(created_at=self.started)
+        for event in (
+            self.event("created", 0),
+            self.event("paid", 5),
+            self.event("assigned", 6, courier_id=3),
+            self.event("picked", 35),
+            self.event("delivered", 80),
+        ):
+            project(order, event)
+        self.assertEqual((order.status, order.courier_id), ("delivered", 3))
+        self.assertEqual(order.preparation_time, timedelta(minutes=30))
+        self.assertEqual(order.delivery_duration, timedelta(minutes=45))
+        self.assertEqual(order.processing_time, timedelta(minutes=80))
+
+    def test_final_status_is_kept(self):
+        order = Order(created_at=self.started)
+        project(order, self.event("cancelled", 10))
+        self.assertEqual(project(order, self.event("delivered", 20)), [])
+        self.assertEqual(order.status, "canceled")
+        self.assertEqual(order.completed_at, self.started + timedelta(minutes=10))
+        self.assertIsNone(order.delivery_duration)
+
+
+class AnonymizerTests(SimpleTestCase):
+    """Проверки обезличивания записанных обновлений"""
+
+    anonymizer = Anonymizer("secret")
+
+    def update(self, text):
+        return {
+            "update_id": 1,
+            "message": {
+                "chat": {"id": -100, "type": "group", "title": "Семья"},
+                "from": {"id": 5, "is_bot": False, "first_name": "Анна", "username": "anna"},
+                "text": text,
+                "location": {"latitude": 55.755831, "longitude": 37.617673},
+                "successful_payment": {"order_info": {
+                    "name": "Anna Ivanova",
+                    "phone_number": "+79991234567",
+                    "email": "anna@example.com",
+                    "shipping_address": {"city": "Москва", "street_line1": "Ленина 1"},
+                }},
+            },
+        }
+
+    def test_people(self):
+        message = self.anonymizer.scrub(self.update("привет"))["message"]
+        self.assertEqual(message["from"]["first_name"], "User")
+        self.assertNotIn("username", message["from"])
+        self.assertNotIn("title", message["chat"])
+        self.assertEqual(message["from"]["id"], self.anonymizer.pseudonym(5))
+        self.assertNotEqual(message["from"]["id"], 5)
+        self.assertLess(message["chat"]["id"], 0)
+
+    def test_phone_keeps_format(self):
+        text = self.anonymizer.scrub(self.update("звоните +7 (999) 123-45-67"))["message"]["text"]
+        self.assertRegex(text, r"^звоните \+7 \(\d{3}\) \d{3}-\d{2}-\d{2}$")
+        self.assertNotIn("123-45-67", text)
+
+    def test_private_reply_is_masked(self):
+        text = self.anonymizer.scrub(self.update("г. Москва, ул. Ленина, д. 15"), mask_text=True)
+        self.assertEqual(text["message"]["text"], "х. Хххххх, хх. Хххххх, х. 15")
+
+    def test_location_and_order_info(self):
+        message = self.anonymizer.scrub(self.update("привет"))["message"]
+        self.assertEqual(message["location"], {"latitude": 55.76, "longitude": 37.62})
+        order_info = message["successful_payment"]["order_info"]
+        self.assertEqual(order_info["name"], "Xxxx Xxxxxxx")
+        self.assertNotIn("email", order_info)
+        self.assertNotEqual(order_info["phone_number"], "+79991234567")
+        self.assertEqual(order_info["shipping_address"], {"city": "Хххххх", "street_line1": "Хххххх 1"})
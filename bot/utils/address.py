@@ -0,0 +1,323 @@
+import csv
+import logging
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from bot.models import GeocodeCache
+
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[^\s,]+|,")
+HOUSE_RE = re.compile(r"^\d+[а-я]?(/\d+[а-я]?)?$")
+CANONICAL_RE = re.compile(
+    r"^г\. [А-ЯЁ][А-Яа-яЁё\- ]*, "
+    r"(ул\.|пр-т|пер\.|б-р|ш\.|наб\.|пл\.|проезд) [0-9А-Яа-яЁё\- ]+, "
+    r"д\. \d+[а-я]?(/\d+[а-я]?)?"
+    r"(, к\. \d+[а-я]?)?(, стр\. \d+)?(, кв\. \d+[а-я]?)?$"
+)
+
+# Варианты написания частей адреса и их каноническая форма
+CITY_MARKERS = {"г": "г.", "гор": "г.", "город": "г."}
+STREET_MARKERS = {
+    "ул": "ул.", "улица": "ул.",
+    "пр-т": "пр-т", "просп": "пр-т", "проспект": "пр-т", "пр": "пр-т",
+    "пер": "пер.", "переулок": "пер.",
+    "б-р": "б-р", "бул": "б-р", "бульвар": "б-р",
+    "ш": "ш.", "шоссе": "ш.",
+    "наб": "наб.", "набережная": "наб.",
+    "пл": "пл.", "площадь": "пл.",
+    "проезд": "проезд",
+}
+HOUSE_MARKERS = {"д": "house", "дом": "house"}
+PART_MARKERS = {
+    "к": "building", "корп": "building", "корпус": "building",
+    "стр": "structure", "строение": "structure",
+    "кв": "flat", "квартира": "flat",
+}
+
+
+class ParsedAddress(NamedTuple):
+    """Части адреса доставки в канонической записи"""
+    city: str = ""
+    street_type: str = ""
+    street: str = ""
+    house: str = ""
+    building: str = ""
+    structure: str = ""
+    flat: str = ""
+
+
+class Point(NamedTuple):
+    """Координаты адреса и точность, с которой они найдены"""
+    latitude: float
+    longitude: float
+    precision: str
+
+
+def _title(words: List[str]) -> str:
+    return " ".join(word[:1].upper() + word[1:] for word in words)
+
+
+def parse_address(text: str) -> ParsedAddress:
+    """
+    Разбирает адрес в свободной записи на части.
+
+    Понимает разные написания («г.», «город», «ул», «улица», «проспект»,
+    «д.», «дом», «кв», «квартира»), тип улицы после названия
+    («Невский проспект») и номера без пробела после точки («д.15»).
+
+    Args:
+        text (str): Адрес, введенный пользователем.
+
+    Returns:
+        ParsedAddress: Найденные части адреса; отсутствующие части пустые.
+    """
+    parts = {}
+    current, words = None, []
+
+    def flush():
+        nonlocal current, words
+        if words or current:
+            kind = current
+            if kind is None:
+                if "city" not in parts:
+                    kind = "city"
+                elif "street" not in parts and not HOUSE_RE.match(words[0].lower()):
+                    kind = "street"
+                    parts["street_type"] = "ул."
+                elif "house" not in parts:
+                    kind = "house"
+            if kind and kind not in parts:
+                parts[kind] = words
+        current, words = None, []
+
+    text = text.replace(".", ". ")
+    for token in TOKEN_RE.findall(text):
+        if token == ",":
+            flush()
+            continue
+        marker = token.lower().rstrip(".")
+        if marker in CITY_MARKERS and current is None and not words:
+            current = "city"
+        elif marker in STREET_MARKERS and "street" not in parts:
+            if current is None and words and "city" in parts:
+                # Тип улицы после названия: «Невский проспект»
+                current = "street"
+                parts["street_type"] = STREET_MARKERS[marker]
+            else:
+                flush()
+                current = "street"
+                parts["street_type"] = STREET_MARKERS[marker]
+        elif marker in HOUSE_MARKERS:
+            flush()
+            current = "house"
+        elif marker in PART_MARKERS and "street" in parts:
+            flush()
+            current = PART_MARKERS[marker]
+        else:
+            words.append(token)
+    flush()
+
+    numbers = {
+        kind: "".join(parts.get(kind, [])).lower()
+        for kind in ("house", "building", "structure", "flat")
+    }
+    return ParsedAddress(
+        city=_title(parts.get("city", [])),
+        street_type=parts.get("street_type", "") if parts.get("street") else "",
+        street=_title(parts.get("street", [])),
+        **numbers
+    )
+
+
+def canonical_address(address: ParsedAddress) -> str:
+    """
+    Собирает адрес в канонической записи.
+
+    Args:
+        address (ParsedAddress): Части адреса.
+
+    Returns:
+        str: Адрес вида «г. Москва, ул. Ленина, д. 15, кв. 3».
+    """
+    parts = [
+        f"г. {address.city}",
+        f"{address.street_type} {address.street}",
+        f"д. {address.house}",
+    ]
+    if address.building:
+        parts.append(f"к. {address.building}")
+    if address.structure:
+        parts.append(f"стр. {address.structure}")
+    if address.flat:
+        parts.append(f"кв. {address.flat}")
+    return ", ".join(parts)
+
+
+def is_valid(canonical: str) -> bool:
+    """
+    Проверяет, что адрес в канонической записи полон и корректен.
+
+    Args:
+        canonical (str): Адрес в канонической записи.
+
+    Returns:
+        bool: True, если адрес корректен.
+    """
+    return CANONICAL_RE.match(canonical) is not None
+
+
+def address_keys(address: ParsedAddress) -> Tuple[str, str]:
+    """
+    Возвращает ключи поиска координат дома и улицы.
+
+    Квартира в ключ не входит: у всех квартир дома одни координаты.
+
+    Args:
+        address (ParsedAddress): Части адреса.
+
+    Returns:
+        Tuple[str, str]: Ключ дома и ключ улицы.
+    """
+    street = "|".join((address.city, address.street_type, address.street))
+    street = street.lower().replace("ё", "е")
+    house = "|".join((street, address.house, address.building, address.structure))
+    return house, street
+
+
+class Gazetteer:
+    """Локальный справочник координат домов и улиц"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.points: Optional[Dict[str, Point]] = None
+
+    def load(self) -> Dict[str, Point]:
+        """
+        Загружает справочник при первом обращении.
+
+        Файл CSV содержит колонки address, latitude, longitude. Адрес без
+        номера дома задает координаты улицы.
+
+        Returns:
+            Dict[str, Point]: Координаты по ключу адреса.
+        """
+        if self.points is not None:
+            return self.points
+
+        self.points = {}
+        if not self.path.exists():
+            logger.warning("Справочник адресов %s не найден", self.path)
+            return self.points
+
+        with open(self.path, encoding="utf-8", newline="") as file:
+            for row in csv.DictReader(file):
+                address = parse_address(row["address"])
+                house_key, street_key = address_keys(address)
+                try:
+                    latitude, longitude = float(row["latitude"]), float(row["longitude"])
+                except (TypeError, ValueError):
+                    logger.warning("Пропущена строка справочника: %s", row)
+                    continue
+                if address.house:
+                    self.points[house_key] = Point(latitude, longitude, "house")
+                else:
+                    self.points[street_key] = Point(latitude, longitude, "street")
+        logger.info("Загружено адресов из справочника: %s", len(self.points))
+        return self.points
+
+    def lookup(self, address: ParsedAddress) -> Optional[Point]:
+        """
+        Ищет координаты дома, а если дома нет в справочнике — улицы.
+
+        Args:
+            address (ParsedAddress): Части адреса.
+
+        Returns:
+            Optional[Point]: Координаты или None.
+        """
+        points = self.load()
+        house_key, street_key = address_keys(address)
+        return points.get(house_key) or points.get(street_key)
+
+
+class Geocoder:
+    """Поиск координат с кэшем в памяти и в базе данных"""
+
+    def __init__(self, gazetteer: Gazetteer, cache_size: int):
+        self.gazetteer = gazetteer
+        self.cache_size = cache_size
+        self.memory: "OrderedDict[str, Optional[Point]]" = OrderedDict()
+
+    def remember(self, key: str, point: Optional[Point]) -> None:
+        """
+        Сохраняет результат в кэше в памяти, вытесняя самый старый.
+
+        Args:
+            key (str): Ключ адреса.
+            point (Optional[Point]): Найденные координаты.
+        """
+        self.memory[key] = point
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.cache_size:
+            self.memory.popitem(last=False)
+
+    def resolve(self, key: str, address: ParsedAddress) -> Optional[Point]:
+        """
+        Ищет координаты в кэше в базе, затем в справочнике.
+
+        Найденные в справочнике координаты сохраняются в базе, чтобы после
+        перезапуска бота не загружать справочник ради знакомых адресов.
+
+        Args:
+            key (str): Ключ адреса.
+            address (ParsedAddress): Части адреса.
+
+        Returns:
+            Optional[Point]: Координаты или None.
+        """
+        cached = GeocodeCache.objects.filter(key=key).first()
+        if cached:
+            return Point(cached.latitude, cached.longitude, cached.precision)
+
+        point = self.gazetteer.lookup(address)
+        if point:
+            GeocodeCache.objects.get_or_create(
+                key=key,
+                defaults={
+                    "latitude": point.latitude,
+                    "longitude": point.longitude,
+                    "precision": point.precision,
+                }
+            )
+        return point
+
+    async def locate(self, address: ParsedAddress) -> Optional[Point]:
+        """
+        Возвращает координаты адреса.
+
+        Повторный адрес берется из памяти без обращения к базе.
+
+        Args:
+            address (ParsedAddress): Части адреса.
+
+        Returns:
+            Optional[Point]: Координаты или None, если адрес не найден.
+        """
+        key, _ = address_keys(address)
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+
+        point = await sync_to_async(self.resolve)(key, address)
+        self.remember(key, point)
+        return point
+
+
+geocoder = Geocoder(Gazetteer(settings.GAZETTEER_PATH), settings.GEOCODE_CACHE_SIZE)
@@ -0,0 +1,242 @@
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Collection, Dict, Iterator, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from bot.utils.metrics import incr
+
+
+logger = logging.getLogger(__name__)
+
+FLUSH_EVERY = 100
+PHONE_RE = re.compile(r"\+?\d[\d\s()-]{8,}\d")
+DROPPED_KEYS = {"last_name", "username", "title", "email", "bio"}
+# Адреса мест и данные покупателя из платежей: все строки в них маскируются
+MASKED_KEYS = {"address", "order_info", "shipping_address"}
+# Координаты округляются до сотых градуса (около километра)
+LOCATION_DIGITS = 2
+
+
+class Anonymizer:
+    """
+    Заменяет в обновлениях личные данные пользователей.
+
+    ID пользователей и чатов заменяются псевдонимами, вычисленными по
+    секретному ключу, поэтому обновления одного пользователя в записи
+    остаются связаны, а восстановить настоящий ID без ключа нельзя.
+    Номера телефонов сохраняют формат, чтобы проверки в обработчиках
+    проходили так же, как с настоящими данными.
+
+    Остальной свободный текст сообщений сохраняется как есть, кроме
+    ответов, для которых передан mask_text: в них буквы заменяются.
+    Координаты округляются, данные покупателя из платежей маскируются.
+    """
+
+    def __init__(self, key: str):
+        self.key = key.encode()
+
+    def _digest(self, value: str) -> bytes:
+        return hmac.new(self.key, value.encode(), hashlib.sha256).digest()
+
+    def pseudonym(self, value: int) -> int:
+        """
+        Возвращает псевдоним ID пользователя или чата.
+
+        Args:
+            value (int): Настоящий ID.
+
+        Returns:
+            int: Псевдоним с тем же знаком.
+        """
+        number = int.from_bytes(self._digest(str(abs(value)))[:5], "big") % 10 ** 10 + 1
+        return -number if value < 0 else number
+
+    def phone(self, value: str) -> str:
+        """
+        Заменяет цифры номера телефона, кроме первой.
+
+        Args:
+            value (str): Номер телефона.
+
+        Returns:
+            str: Номер того же формата с другими цифрами.
+        """
+        digits = iter(self._digest(re.sub(r"\D", "", value)) * 2)
+        first = True
+        masked = []
+        for char in value:
+            if char.isdigit() and not first:
+                char = str(next(digits) % 10)
+            elif char.isdigit():
+                first = False
+            masked.append(char)
+        return "".join(masked)
+
+    @staticmethod
+    def mask(value: str) -> str:
+        """
+        Заменяет буквы текста, сохраняя регистр, цифры и знаки.
+
+        Args:
+            value (str): Текст.
+
+        Returns:
+            str: Текст той же длины, в котором буквы заменены на «х» или «x».
+        """
+        masked = []
+        for char in value:
+            if char.isalpha():
+                letter = "х" if "а" <= char.lower() <= "я" or char.lower() == "ё" else "x"
+                char = letter.upper() if char.isupper() else letter
+            masked.append(char)
+        return "".join(masked)
+
+    def mask_all(self, value: Any) -> Any:
+        """
+        Маскирует все строки в данных покупателя.
+
+        Args:
+            value (Any): Словарь order_info или shipping_address либо его часть.
+
+        Returns:
+            Any: Замаскированная копия; номер телефона сохраняет формат.
+        """
+        if isinstance(value, list):
+            return [self.mask_all(item) for item in value]
+        if isinstance(value, dict):
+            return {
+                key: self.phone(item) if key == "phone_number" else self.mask_all(item)
+                for key, item in value.items()
+                if key not in DROPPED_KEYS
+            }
+        if isinstance(value, str):
+            return self.mask(value)
+        return value
+
+    def scrub(self, value: Any, mask_text: bool = False) -> Any:
+        """
+        Рекурсивно обезличивает данные обновления.
+
+        Args:
+            value (Any): Обновление в виде словаря или его часть.
+            mask_text (bool): Маскировать ли текст сообщения целиком.
+
+        Returns:
+            Any: Обезличенная копия.
+        """
+        if isinstance(value, list):
+            return [self.scrub(item, mask_text) for item in value]
+        if not isinstance(value, dict):
+            return value
+
+        # Пользователи и чаты, кроме самого бота
+        person = ("first_name" in value or "type" in value) and not value.get("is_bot")
+        scrubbed = {}
+        for key, item in value.items():
+            if key in DROPPED_KEYS:
+                continue
+            if key == "id" and person and isinstance(item, int):
+                item = self.pseudonym(item)
+            elif key == "user_id" and isinstance(item, int):
+                item = self.pseudonym(item)
+            elif key == "first_name" and person:
+                item = "User"
+            elif key == "phone_number":
+                item = self.phone(item)
+            elif key in MASKED_KEYS:
+                item = self.mask_all(item)
+            elif key in ("latitude", "longitude") and isinstance(item, float):
+                item = round(item, LOCATION_DIGITS)
+            elif key in ("text", "caption") and isinstance(item, str):
+                item = PHONE_RE.sub(lambda match: self.phone(match.group()), item)
+                if mask_text:
+                    item = self.mask(item)
+            else:
+                item = self.scrub(item, mask_text)
+            scrubbed[key] = item
+        return scrubbed
+
+
+class UpdateRecorder(BaseMiddleware):
+    """
+    Записывает входящие обновления в сжатый JSONL-файл.
+
+    Каждая строка содержит время прихода обновления в секундах от начала
+    записи и само обновление после обезличивания. Текст сообщений,
+    пришедших в состояниях из private_states, маскируется целиком.
+    """
+
+    def __init__(self, path: Path, anonymizer: Anonymizer, private_states: Collection[str] = ()):
+        self.path = path
+        self.anonymizer = anonymizer
+        self.private_states = frozenset(private_states)
+        self.file = gzip.open(path, "wt", encoding="utf-8")
+        self.started = time.monotonic()
+        self.count = 0
+
+    def write(self, update: Update, mask_text: bool = False) -> None:
+        """
+        Записывает обновление.
+
+        Args:
+            update (Update): Входящее обновление.
+            mask_text (bool): Маскировать ли текст сообщения целиком.
+        """
+        record = {
+            "at": round(time.monotonic() - self.started, 3),
+            "update": self.anonymizer.scrub(
+                update.model_dump(mode="json", exclude_none=True, by_alias=True),
+                mask_text
+            ),
+        }
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.count += 1
+        if self.count % FLUSH_EVERY == 0:
+            self.file.flush()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        state = data.get("state")
+        mask_text = bool(self.private_states) and state is not None and (
+            await state.get_state() in self.private_states
+        )
+        try:
+            self.write(event, mask_text)
+            incr("capture.updates")
+        except (OSError, ValueError) as e:
+            logger.error("Обновление %s не записано: %s", event.update_id, e)
+        return await handler(event, data)
+
+    def close(self) -> None:
+        """Дописывает буфер и закрывает файл записи."""
+        self.file.close()
+        logger.info("Записано обновлений: %s в %s", self.count, self.path)
+
+
+def read_capture(path: Path) -> Iterator[Tuple[float, dict]]:
+    """
+    Читает записанные обновления.
+
+    Args:
+        path (Path): Путь к файлу записи.
+
+    Yields:
+        Tuple[float, dict]: Время прихода и обновление.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                yield record["at"], record["update"]
@@ -0,0 +1,116 @@
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from aiogram import html
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bot.models import Item
+
+
+CAPTION_LIMIT = 1024
+CARD_HINT = "Выберите похожий букет, оформите заказ или закажите консультацию флориста"
+
+
+@dataclass(frozen=True)
+class ItemCard:
+    """Готовая к отправке карточка букета"""
+    id: int
+    name: str
+    price: Decimal
+    category_id: Optional[int]
+    shop_id: Optional[int]
+    photo: Optional[str]
+    photo_file_id: str
+    caption: str
+    similar_ids: List[int]
+    loaded: float
+
+
+_cards: Dict[int, ItemCard] = {}
+
+
+def _length(text: str) -> int:
+    # Telegram считает длину подписи в кодовых единицах UTF-16
+    return len(text.encode("utf-16-le")) // 2
+
+
+def render_caption(item: Item) -> str:
+    """
+    Формирует HTML-подпись к фото букета.
+
+    Описание сокращается, чтобы подпись уложилась в ограничение Telegram
+    на длину подписи к фото.
+
+    Args:
+        item (Item): Объект букета.
+
+    Returns:
+        str: Подпись карточки.
+    """
+    description = item.description or ""
+    fields = [
+        ("Букет", item.name),
+        ("Описание", description),
+        ("Цветочный состав", item.structure or ""),
+        ("Цена", f"{item.price}р."),
+    ]
+    visible = sum(_length(f"{label}: {value}\n") for label, value in fields)
+    overflow = visible + 1 + _length(CARD_HINT) - CAPTION_LIMIT
+    if overflow > 0:
+        fields[1] = ("Описание", description[:max(len(description) - overflow - 1, 0)] + "…")
+
+    lines = [f"<b>{label}:</b> {html.quote(value)}" for label, value in fields]
+    return "\n".join(lines + ["", f"<i>{html.quote(CARD_HINT)}</i>"])
+
+
+def _build_card(item: Item) -> ItemCard:
+    photo = item.photo_optimized or item.photo
+    return ItemCard(
+        id=item.id,
+        name=item.name,
+        price=item.price,
+        category_id=item.category_id,
+        shop_id=item.shop_id,
+        photo=photo.name if photo else None,
+        photo_file_id=item.photo_file_id,
+        caption=render_caption(item),
+        similar_ids=list(item.similar_ids or []),
+        loaded=time.monotonic()
+    )
+
+
+@sync_to_async
+def _load_card(item_id: int) -> ItemCard:
+    return _build_card(Item.objects.get(id=item_id))
+
+
+async def get_card(item_id: int) -> ItemCard:
+    """
+    Возвращает карточку букета из кэша или из базы данных.
+
+    Карточка обновляется при сохранении букета в этом процессе, а изменения
+    из других процессов подхватываются не позже чем через
+    SEARCH_REFRESH_INTERVAL секунд.
+
+    Args:
+        item_id (int): ID букета.
+
+    Returns:
+        ItemCard: Карточка букета.
+    """
+    card = _cards.get(item_id)
+    if card is None or time.monotonic() - card.loaded > settings.SEARCH_REFRESH_INTERVAL:
+        card = _cards[item_id] = await _load_card(item_id)
+    return card
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def forget_card(sender, instance, **kwargs):
+    """Удаляет из кэша карточку измененного букета"""
+    _cards.pop(instance.id, None)
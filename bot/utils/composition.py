@@ -0,0 +1,173 @@
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+WORD_RE = re.compile(r"[а-яa-z]+")
+
+# Ключ цветка: (название для кнопок, основы слова)
+FLOWERS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "rose": ("Розы", ("роз",)),
+    "peony": ("Пионы", ("пион",)),
+    "lily": ("Лилии", ("лили",)),
+    "tulip": ("Тюльпаны", ("тюльпан",)),
+    "chrysanthemum": ("Хризантемы", ("хризантем",)),
+    "chamomile": ("Ромашки", ("ромашк", "ромашек")),
+    "gerbera": ("Герберы", ("гербер",)),
+    "carnation": ("Гвоздики", ("гвоздик", "гвоздичк")),
+    "alstroemeria": ("Альстромерии", ("альстромери", "альстрамери")),
+    "hydrangea": ("Гортензии", ("гортензи",)),
+    "orchid": ("Орхидеи", ("орхиде",)),
+    "iris": ("Ирисы", ("ирис",)),
+    "eustoma": ("Эустомы", ("эустом", "лизиантус")),
+    "ranunculus": ("Ранункулюсы", ("ранункулюс",)),
+    "freesia": ("Фрезии", ("фрези",)),
+    "gypsophila": ("Гипсофила", ("гипсофил",)),
+    "matthiola": ("Маттиолы", ("маттиол", "матиол")),
+    "sunflower": ("Подсолнухи", ("подсолнух", "подсолнечник")),
+    "lavender": ("Лаванда", ("лаванд",)),
+    "eucalyptus": ("Эвкалипт", ("эвкалипт",)),
+    "pistacia": ("Фисташка", ("фисташк", "писташ")),
+}
+
+# Окончания существительных: отсекают прилагательные вроде «розовые»
+ENDINGS = frozenset({
+    "", "а", "я", "ы", "и", "е", "у", "ю", "ь", "й", "ой", "ей", "ом", "ем",
+    "ов", "ев", "ам", "ям", "ами", "ями", "ах", "ях", "ию", "ия", "ии", "ий",
+})
+
+_STEMS: List[Tuple[str, str]] = sorted(
+    ((stem, key) for key, (_, stems) in FLOWERS.items() for stem in stems),
+    key=lambda pair: -len(pair[0])
+)
+
+
+def normalize_flower(word: str) -> str | None:
+    """
+    Приводит слово к ключу цветка из справочника.
+
+    Args:
+        word (str): Слово из описания состава.
+
+    Returns:
+        str | None: Ключ цветка или None, если слово не является цветком.
+    """
+    word = word.lower().replace("ё", "е")
+    for stem, key in _STEMS:
+        if word.startswith(stem) and word[len(stem):] in ENDINGS:
+            return key
+    return None
+
+
+def tokenize_structure(structure: str) -> Set[str]:
+    """
+    Извлекает ключи цветков из текстового описания состава.
+
+    Args:
+        structure (str): Состав букета, например «5 роз, эвкалипт».
+
+    Returns:
+        Set[str]: Ключи найденных цветков.
+    """
+    flowers = set()
+    for word in WORD_RE.findall(structure.lower().replace("ё", "е")):
+        key = normalize_flower(word)
+        if key:
+            flowers.add(key)
+    return flowers
+
+
+class CompositionIndex:
+    """Инвертированный индекс «цветок → ID букетов» по составу букетов"""
+
+    def __init__(self) -> None:
+        self.items_by_flower: Dict[str, Set[int]] = defaultdict(set)
+        self.flowers_by_item: Dict[int, Set[str]] = {}
+
+    def add(self, item_id: int, structure: str) -> None:
+        """
+        Добавляет или заменяет состав букета в индексе.
+
+        Args:
+            item_id (int): ID букета.
+            structure (str): Состав букета.
+        """
+        self.remove(item_id)
+        flowers = tokenize_structure(structure)
+        for flower in flowers:
+            self.items_by_flower[flower].add(item_id)
+        self.flowers_by_item[item_id] = flowers
+
+    def remove(self, item_id: int) -> None:
+        """
+        Удаляет букет из индекса.
+
+        Args:
+            item_id (int): ID букета.
+        """
+        for flower in self.flowers_by_item.pop(item_id, ()):
+            ids = self.items_by_flower[flower]
+            ids.discard(item_id)
+            if not ids:
+                del self.items_by_flower[flower]
+
+    def matching(
+        self,
+        item_ids: Iterable[int],
+        with_flowers: Iterable[str] = (),
+        without_flowers: Iterable[str] = ()
+    ) -> Set[int]:
+        """
+        Отбирает букеты, содержащие все нужные цветы и ни одного исключенного.
+
+        Args:
+            item_ids (Iterable[int]): ID букетов, среди которых идет отбор.
+            with_flowers (Iterable[str]): Ключи обязательных цветов.
+            without_flowers (Iterable[str]): Ключи исключенных цветов.
+
+        Returns:
+            Set[int]: ID подходящих букетов.
+        """
+        result = set(item_ids)
+        required = sorted(
+            (self.items_by_flower.get(flower, set()) for flower in with_flowers),
+            key=len
+        )
+        for ids in required:
+            result &= ids
+            if not result:
+                return result
+        for flower in without_flowers:
+            result -= self.items_by_flower.get(flower, set())
+        return result
+
+    def flower_counts(self, item_ids: Iterable[int]) -> List[Tuple[str, int]]:
+        """
+        Считает, в скольких букетах из списка встречается каждый цветок.
+
+        Args:
+            item_ids (Iterable[int]): ID букетов.
+
+        Returns:
+            List[Tuple[str, int]]: Ключи цветков и количество букетов, по убыванию.
+        """
+        counts = Counter()
+        for item_id in item_ids:
+            counts.update(self.flowers_by_item.get(item_id, ()))
+        return counts.most_common()
+
+
+composition_index = CompositionIndex()
+
+
+def parse_flowers(value: str | None) -> List[str]:
+    """
+    Разбирает список ключей цветков, сохраненный в состоянии строкой.
+
+    Args:
+        value (str | None): Ключи через запятую.
+
+    Returns:
+        List[str]: Ключи цветков.
+    """
+    return [key for key in (value or "").split(",") if key in FLOWERS]
@@ -0,0 +1,65 @@
+from typing import Dict, Optional
+
+from aiogram import Dispatcher
+from django.conf import settings
+
+from bot.handlers.handlers import OrderState, router
+from bot.models import Shop
+from bot.utils.capture import Anonymizer, UpdateRecorder
+from bot.utils.metrics import log_snapshot
+from bot.utils.scheduling import OrderedIsolation
+from bot.utils.tenancy import TenantMiddleware
+from bot.utils.throttling import FloodControl
+
+
+# Ответы в этих состояниях содержат имя и адрес получателя
+PRIVATE_STATES = (OrderState.waiting_for_name.state, OrderState.waiting_for_address.state)
+
+
+def create_recorder(path) -> UpdateRecorder:
+    """
+    Создает запись входящих обновлений с обезличиванием по SECRET_KEY.
+
+    Args:
+        path (Path): Путь к файлу записи.
+
+    Returns:
+        UpdateRecorder: Промежуточный слой записи.
+    """
+    return UpdateRecorder(path, Anonymizer(settings.SECRET_KEY), private_states=PRIVATE_STATES)
+
+
+def create_dispatcher(
+    tenants: Dict[int, Optional[Shop]],
+    recorder: Optional[UpdateRecorder] = None
+) -> Dispatcher:
+    """
+    Собирает диспетчер бота с промежуточными слоями и обработчиками.
+
+    Один и тот же диспетчер используется при запуске бота и при
+    воспроизведении записанных обновлений, чтобы обновления проходили
+    одинаковый путь.
+
+    Args:
+        tenants (Dict[int, Optional[Shop]]): Магазины по ID их ботов.
+        recorder (Optional[UpdateRecorder]): Запись входящих обновлений.
+
+    Returns:
+        Dispatcher: Диспетчер бота.
+    """
+    dp = Dispatcher(
+        events_isolation=OrderedIsolation(settings.UPDATE_CONCURRENCY)
+    )
+    dp.update.outer_middleware(TenantMiddleware(tenants))
+    flood_control = FloodControl(
+        settings.FLOOD_RATE,
+        settings.FLOOD_BURST,
+        settings.CALLBACK_DEDUP_WINDOW
+    )
+    if recorder:
+        dp.update.outer_middleware(recorder)
+    dp.message.outer_middleware(flood_control)
+    dp.callback_query.outer_middleware(flood_control)
+    dp.include_router(router)
+    dp.shutdown.register(log_snapshot)
+    return dp
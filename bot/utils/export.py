@@ -0,0 +1,151 @@
+import csv
+import json
+from datetime import date
+from typing import Iterable, Iterator, Optional
+
+from django.db.models import QuerySet
+
+from bot.models import Order
+
+
+EXPORT_COLUMNS = (
+    ("id", "id"),
+    ("status", "status"),
+    ("created_at", "created_at"),
+    ("delivery_date", "delivery_date"),
+    ("delivery_time", "delivery_time"),
+    ("completed_at", "completed_at"),
+    ("preparation_time", "preparation_time"),
+    ("delivery_duration", "delivery_duration"),
+    ("name", "name"),
+    ("address", "address"),
+    ("user_tg_id", "user__tg_id"),
+    ("item_id", "item_id"),
+    ("item_name", "item__name"),
+    ("item_price", "item__price"),
+    ("courier_name", "courier__name"),
+)
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """Псевдобуфер, возвращающий записанную строку вместо ее хранения"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def filter_orders(
+    queryset: QuerySet,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    status: Optional[str] = None
+) -> QuerySet:
+    """
+    Отбирает заказы по диапазону дат доставки и статусу.
+
+    Args:
+        queryset (QuerySet): Исходный набор заказов.
+        date_from (Optional[date]): Первая дата доставки включительно.
+        date_to (Optional[date]): Последняя дата доставки включительно.
+        status (Optional[str]): Статус заказа.
+
+    Returns:
+        QuerySet: Отфильтрованный набор заказов.
+    """
+    if date_from:
+        queryset = queryset.filter(delivery_date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(delivery_date__lte=date_to)
+    if status:
+        queryset = queryset.filter(status=status)
+    return queryset
+
+
+def order_rows(queryset: QuerySet) -> Iterator[tuple]:
+    """
+    Построчно читает заказы вместе с пользователем, букетом и курьером.
+
+    Связанные таблицы присоединяются в том же запросе, а строки читаются
+    порциями, поэтому память не зависит от количества заказов.
+
+    Args:
+        queryset (QuerySet): Набор заказов.
+
+    Returns:
+        Iterator[tuple]: Значения колонок EXPORT_COLUMNS.
+    """
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    return (
+        queryset.order_by("id")
+        .values_list(*lookups)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def csv_lines(rows: Iterable[tuple]) -> Iterator[str]:
+    """
+    Превращает строки заказов в строки CSV с заголовком.
+
+    Args:
+        rows (Iterable[tuple]): Значения колонок.
+
+    Returns:
+        Iterator[str]: Строки CSV.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow([column for column, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(rows: Iterable[tuple]) -> Iterator[str]:
+    """
+    Превращает строки заказов в строки JSON Lines.
+
+    Args:
+        rows (Iterable[tuple]): Значения колонок.
+
+    Returns:
+        Iterator[str]: Строки JSON, по одной на заказ.
+    """
+    columns = [column for column, _ in EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(
+            dict(zip(columns, row)), ensure_ascii=False, default=str
+        ) + "\n"
+
+
+FORMATS = {
+    "csv": (csv_lines, "text/csv"),
+    "jsonl": (jsonl_lines, "application/x-ndjson"),
+}
+
+
+def export_lines(queryset: QuerySet, export_format: str) -> Iterator[str]:
+    """
+    Возвращает генератор строк выгрузки заказов в указанном формате.
+
+    Args:
+        queryset (QuerySet): Набор заказов.
+        export_format (str): Формат выгрузки: csv или jsonl.
+
+    Returns:
+        Iterator[str]: Строки выгрузки.
+    """
+    lines, _ = FORMATS[export_format]
+    return lines(order_rows(queryset))
+
+
+def plain_orders(queryset: QuerySet) -> QuerySet:
+    """
+    Возвращает заказы набора без аннотаций админки.
+
+    Args:
+        queryset (QuerySet): Набор заказов, возможно с агрегатами.
+
+    Returns:
+        QuerySet: Набор тех же заказов без агрегатов и группировки.
+    """
+    return Order.objects.filter(pk__in=queryset.values("pk"))
@@ -0,0 +1,213 @@
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from decimal import ROUND_CEILING, Decimal
+from typing import Dict, List, Optional, Set, Tuple
+
+from django.conf import settings
+
+
+# Границы ценовых корзин округляются вверх до этого шага
+PRICE_STEP = Decimal(100)
+# Нижняя граница цены (не включая) и верхняя; None — без ограничения
+PriceRange = Tuple[Optional[Decimal], Optional[Decimal]]
+
+# Значения цены, сохраненные в состоянии до появления корзин
+LEGACY_PRICES: Dict[str, PriceRange] = {
+    "~500": (None, Decimal(500)),
+    "~1000": (None, Decimal(1000)),
+    "~2000": (None, Decimal(2000)),
+    "Больше": (Decimal(2000), None),
+}
+ANY_PRICE = "Не важно"
+
+
+def price_bounds(prices: List[Decimal], buckets: int) -> List[Decimal]:
+    """
+    Делит цены каталога на корзины с примерно равным числом букетов.
+
+    Args:
+        prices (List[Decimal]): Отсортированные цены букетов.
+        buckets (int): Желаемое количество корзин.
+
+    Returns:
+        List[Decimal]: Верхние границы всех корзин, кроме последней.
+    """
+    bounds = []
+    for number in range(1, buckets):
+        quantile = prices[-(-number * len(prices) // buckets) - 1]
+        bound = (quantile / PRICE_STEP).to_integral_value(ROUND_CEILING) * PRICE_STEP
+        if bound < prices[-1] and (not bounds or bound > bounds[-1]):
+            bounds.append(bound)
+    return bounds
+
+
+def price_value(price_range: PriceRange) -> str:
+    """
+    Записывает диапазон цен строкой для callback_data и состояния.
+
+    Args:
+        price_range (PriceRange): Нижняя граница (не включая) и верхняя.
+
+    Returns:
+        str: Строка вида «800-1500», «-800» или «1500-».
+    """
+    low, high = price_range
+    return f"{low if low is not None else ''}-{high if high is not None else ''}"
+
+
+def parse_price(value: Optional[str]) -> PriceRange:
+    """
+    Разбирает диапазон цен, записанный price_value.
+
+    Args:
+        value (Optional[str]): Строка диапазона, прежнее значение кнопки или «Не важно».
+
+    Returns:
+        PriceRange: Нижняя граница (не включая) и верхняя; None — без ограничения.
+    """
+    if value in LEGACY_PRICES:
+        return LEGACY_PRICES[value]
+    if not value or "-" not in value:
+        return None, None
+    low, high = value.split("-", 1)
+    return Decimal(low) if low else None, Decimal(high) if high else None
+
+
+def price_label(price_range: PriceRange) -> str:
+    """
+    Возвращает подпись кнопки ценовой корзины.
+
+    Args:
+        price_range (PriceRange): Нижняя граница (не включая) и верхняя.
+
+    Returns:
+        str: Подпись вида «до 800р.», «800–1500р.» или «дороже 1500р.».
+    """
+    low, high = price_range
+    if low is None and high is None:
+        return ANY_PRICE
+    if low is None:
+        return f"до {high:.0f}р."
+    if high is None:
+        return f"дороже {low:.0f}р."
+    return f"{low:.0f}–{high:.0f}р."
+
+
+class FacetIndex:
+    """
+    Количество букетов по категориям и ценовым корзинам каждого магазина.
+
+    Счетчики меняются вместе с поисковым индексом при каждом изменении
+    букета. Границы корзин — квантили цен каталога магазина; они
+    пересчитываются при обновлении поискового индекса из базы и только
+    для магазинов, каталог которых изменился.
+    """
+
+    def __init__(self, buckets: int = 4) -> None:
+        self.buckets = buckets
+        self.entries: Dict[int, Tuple[Optional[int], Optional[int], Decimal]] = {}
+        self.bounds: Dict[Optional[int], List[Decimal]] = {}
+        self.counts: Dict[Optional[int], Counter] = defaultdict(Counter)
+        self.changed: Set[Optional[int]] = set()
+
+    def bucket(self, shop_id: Optional[int], price: Decimal) -> int:
+        """Возвращает номер корзины цены в магазине."""
+        return bisect_left(self.bounds.get(shop_id, []), price)
+
+    def add(
+        self,
+        item_id: int,
+        shop_id: Optional[int],
+        category_id: Optional[int],
+        price: Decimal
+    ) -> None:
+        """
+        Добавляет или заменяет букет в счетчиках.
+
+        Args:
+            item_id (int): ID букета.
+            shop_id (Optional[int]): Магазин букета.
+            category_id (Optional[int]): Категория букета.
+            price (Decimal): Цена букета.
+        """
+        self.remove(item_id)
+        self.entries[item_id] = (shop_id, category_id, price)
+        self.counts[shop_id][category_id, self.bucket(shop_id, price)] += 1
+        self.changed.add(shop_id)
+
+    def remove(self, item_id: int) -> None:
+        """
+        Удаляет букет из счетчиков.
+
+        Args:
+            item_id (int): ID букета.
+        """
+        entry = self.entries.pop(item_id, None)
+        if entry is None:
+            return
+        shop_id, category_id, price = entry
+        counts = self.counts[shop_id]
+        key = category_id, self.bucket(shop_id, price)
+        counts[key] -= 1
+        if not counts[key]:
+            del counts[key]
+        self.changed.add(shop_id)
+
+    def rebalance(self) -> None:
+        """Пересчитывает границы корзин магазинов, каталог которых изменился."""
+        changed, self.changed = self.changed, set()
+        by_shop = defaultdict(list)
+        for shop_id, category_id, price in self.entries.values():
+            if shop_id in changed:
+                by_shop[shop_id].append((category_id, price))
+
+        for shop_id in changed:
+            entries = by_shop.get(shop_id, [])
+            prices = sorted(price for _, price in entries)
+            bounds = price_bounds(prices, self.buckets) if prices else []
+            if bounds == self.bounds.get(shop_id, []):
+                continue
+            self.bounds[shop_id] = bounds
+            self.counts[shop_id] = Counter(
+                (category_id, self.bucket(shop_id, price)) for category_id, price in entries
+            )
+
+    def category_counts(self, shop_id: Optional[int]) -> Dict[Optional[int], int]:
+        """
+        Считает букеты в каждой категории магазина.
+
+        Args:
+            shop_id (Optional[int]): Магазин.
+
+        Returns:
+            Dict[Optional[int], int]: Количество букетов по ID категорий.
+        """
+        totals = Counter()
+        for (category_id, _), count in self.counts.get(shop_id, {}).items():
+            totals[category_id] += count
+        return totals
+
+    def price_counts(
+        self, shop_id: Optional[int], category_id: Optional[int]
+    ) -> List[Tuple[PriceRange, int]]:
+        """
+        Возвращает непустые ценовые корзины категории.
+
+        Args:
+            shop_id (Optional[int]): Магазин.
+            category_id (Optional[int]): Категория.
+
+        Returns:
+            List[Tuple[PriceRange, int]]: Диапазоны цен и количество букетов по возрастанию цены.
+        """
+        bounds = self.bounds.get(shop_id, [])
+        counts = self.counts.get(shop_id, {})
+        edges = [None, *bounds, None]
+        return [
+            ((edges[number], edges[number + 1]), counts[category_id, number])
+            for number in range(len(bounds) + 1)
+            if counts.get((category_id, number))
+        ]
+
+
+facet_index = FacetIndex(settings.FACET_PRICE_BUCKETS)
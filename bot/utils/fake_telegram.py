@@ -0,0 +1,86 @@
+import asyncio
+import random
+import time
+from collections import Counter
+from itertools import count
+
+from aiohttp import web
+
+
+class FakeTelegram:
+    """
+    Локальный сервер Bot API для нагрузочных замеров без обращения к Telegram.
+
+    Отвечает на запросы с заданной задержкой и с заданной вероятностью
+    возвращает 502 или обрывает соединение. Отправка сообщений возвращает
+    сообщение, опрос обновлений — пустой список после паузы.
+    """
+
+    def __init__(self, latency: float, error_rate: float = 0.0, drop_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.stats: Counter = Counter()
+        self.connections = set()
+        self.message_ids = count(1)
+
+    def result(self, method: str, params) -> object:
+        if method == "getMe":
+            return {"id": 42, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}
+        if method == "getUpdates":
+            return []
+        if method.startswith(("send", "edit")):
+            message = {
+                "message_id": next(self.message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+            }
+            if "text" in params:
+                message["text"] = params["text"]
+            return message
+        return True
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        method = request.match_info["method"]
+        params = await request.post()
+        self.stats["requests"] += 1
+        self.connections.add(id(request.transport))
+
+        if method == "getUpdates":
+            await asyncio.sleep(min(float(params.get("timeout", 0)), 1.0))
+        else:
+            await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+
+        roll = random.random()
+        if roll < self.drop_rate:
+            self.stats["dropped"] += 1
+            request.transport.close()
+            return web.Response()
+        if roll < self.drop_rate + self.error_rate:
+            self.stats["errors"] += 1
+            return web.json_response(
+                {"ok": False, "error_code": 502, "description": "Bad Gateway"}, status=502
+            )
+        return web.json_response({"ok": True, "result": self.result(method, params)})
+
+    def app(self) -> web.Application:
+        """Возвращает приложение aiohttp с маршрутом /bot<token>/<method>."""
+        application = web.Application()
+        application.router.add_post("/bot{token}/{method}", self.handle)
+        return application
+
+    async def start(self, host: str, port: int) -> web.AppRunner:
+        """
+        Запускает сервер в текущем цикле событий.
+
+        Args:
+            host (str): Адрес для прослушивания.
+            port (int): Порт.
+
+        Returns:
+            web.AppRunner: Запущенный сервер; остановка — cleanup().
+        """
+        runner = web.AppRunner(self.app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
@@ -0,0 +1,380 @@
+import json
+import struct
+import zlib
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, List, Tuple
+
+from bot.models import Item
+
+
+VERSION = 1
+FLAG_ZLIB = 1
+COMPRESS_THRESHOLD = 512
+
+# Ключи состояния и их постоянные номера. Номера не меняются и не
+# переиспользуются: новые ключи добавляются в конец.
+SCHEMA_KEYS = (
+    "occasion",
+    "price",
+    "filtered_items",
+    "current_page",
+    "item_price",
+    "item_photo",
+    "item_name",
+    "name",
+    "address",
+    "delivery_date",
+    "delivery_time",
+    "phone",
+    "with_flowers",
+    "without_flowers",
+    "latitude",
+    "longitude",
+    "item_id",
+)
+KEY_IDS = {key: number for number, key in enumerate(SCHEMA_KEYS, start=1)}
+CUSTOM_KEY = 0
+
+(
+    T_NONE, T_FALSE, T_TRUE, T_INT, T_FLOAT, T_STR, T_DECIMAL,
+    T_DATE, T_TIME, T_DATETIME, T_LIST, T_DICT, T_ITEMS,
+) = range(13)
+
+_DOUBLE = struct.Struct("<d")
+_US_PER_SECOND = 1_000_000
+
+
+class CodecError(ValueError):
+    """Ошибка декодирования состояния FSM"""
+    pass
+
+
+class ItemIds(list):
+    """Список ID букетов, сохраненный вместо списка объектов Item"""
+    pass
+
+
+def _put_uint(buffer: bytearray, value: int) -> None:
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _put_int(buffer: bytearray, value: int) -> None:
+    if not -2**63 <= value < 2**63:
+        raise CodecError(f"Целое число {value} не помещается в 64 бита")
+    _put_uint(buffer, (value << 1) ^ (value >> 63))
+
+
+def _put_str(buffer: bytearray, value: str) -> None:
+    raw = value.encode("utf-8")
+    _put_uint(buffer, len(raw))
+    buffer += raw
+
+
+def _put_value(buffer: bytearray, value: Any) -> None:
+    if value is None:
+        buffer.append(T_NONE)
+    elif value is True:
+        buffer.append(T_TRUE)
+    elif value is False:
+        buffer.append(T_FALSE)
+    elif isinstance(value, int):
+        buffer.append(T_INT)
+        _put_int(buffer, value)
+    elif isinstance(value, float):
+        buffer.append(T_FLOAT)
+        buffer += _DOUBLE.pack(value)
+    elif isinstance(value, str):
+        buffer.append(T_STR)
+        _put_str(buffer, value)
+    elif isinstance(value, Decimal):
+        buffer.append(T_DECIMAL)
+        _put_str(buffer, str(value))
+    elif isinstance(value, datetime):
+        buffer.append(T_DATETIME)
+        _put_str(buffer, value.isoformat())
+    elif isinstance(value, date):
+        buffer.append(T_DATE)
+        _put_uint(buffer, value.toordinal())
+    elif isinstance(value, time):
+        buffer.append(T_TIME)
+        seconds = value.hour * 3600 + value.minute * 60 + value.second
+        _put_uint(buffer, seconds * _US_PER_SECOND + value.microsecond)
+    elif isinstance(value, (list, tuple)):
+        if value and all(isinstance(element, Item) for element in value):
+            buffer.append(T_ITEMS)
+            _put_uint(buffer, len(value))
+            previous = 0
+            for element in value:
+                _put_int(buffer, element.id - previous)
+                previous = element.id
+        else:
+            buffer.append(T_LIST)
+            _put_uint(buffer, len(value))
+            for element in value:
+                _put_value(buffer, element)
+    elif isinstance(value, dict):
+        buffer.append(T_DICT)
+        _put_uint(buffer, len(value))
+        for key, element in value.items():
+            _put_str(buffer, str(key))
+            _put_value(buffer, element)
+    else:
+        raise CodecError(f"Тип {type(value).__name__} не поддерживается")
+
+
+def encode_state(data: Dict[str, Any]) -> bytes:
+    """
+    Кодирует данные состояния FSM в компактный двоичный вид.
+
+    Списки объектов Item сохраняются как списки ID, остальные значения
+    сохраняются без потерь с исходными типами.
+
+    Args:
+        data (Dict[str, Any]): Данные состояния.
+
+    Returns:
+        bytes: Закодированные данные с заголовком версии.
+    """
+    body = bytearray()
+    for key, value in data.items():
+        key_id = KEY_IDS.get(key, CUSTOM_KEY)
+        body.append(key_id)
+        if key_id == CUSTOM_KEY:
+            _put_str(body, key)
+        _put_value(body, value)
+
+    flags = 0
+    if len(body) > COMPRESS_THRESHOLD:
+        compressed = zlib.compress(body, 6)
+        if len(compressed) < len(body):
+            body, flags = compressed, FLAG_ZLIB
+    return bytes((VERSION, flags)) + body
+
+
+def _get_uint(raw: bytes, position: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = raw[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+
+def _get_int(raw: bytes, position: int) -> Tuple[int, int]:
+    value, position = _get_uint(raw, position)
+    return (value >> 1) ^ -(value & 1), position
+
+
+def _get_str(raw: bytes, position: int) -> Tuple[str, int]:
+    length, position = _get_uint(raw, position)
+    end = position + length
+    return raw[position:end].decode("utf-8"), end
+
+
+def _get_decimal(raw: bytes, position: int) -> Tuple[Decimal, int]:
+    text, position = _get_str(raw, position)
+    return Decimal(text), position
+
+
+def _get_datetime(raw: bytes, position: int) -> Tuple[datetime, int]:
+    text, position = _get_str(raw, position)
+    return datetime.fromisoformat(text), position
+
+
+def _get_date(raw: bytes, position: int) -> Tuple[date, int]:
+    ordinal, position = _get_uint(raw, position)
+    return date.fromordinal(ordinal), position
+
+
+def _get_time(raw: bytes, position: int) -> Tuple[time, int]:
+    micros, position = _get_uint(raw, position)
+    seconds, microsecond = divmod(micros, _US_PER_SECOND)
+    minutes, second = divmod(seconds, 60)
+    hour, minute = divmod(minutes, 60)
+    return time(hour, minute, second, microsecond), position
+
+
+def _get_float(raw: bytes, position: int) -> Tuple[float, int]:
+    return _DOUBLE.unpack_from(raw, position)[0], position + _DOUBLE.size
+
+
+def _get_items(raw: bytes, position: int) -> Tuple[ItemIds, int]:
+    count, position = _get_uint(raw, position)
+    ids = ItemIds()
+    previous = 0
+    for _ in range(count):
+        delta, position = _get_int(raw, position)
+        previous += delta
+        ids.append(previous)
+    return ids, position
+
+
+def _get_list(raw: bytes, position: int) -> Tuple[list, int]:
+    count, position = _get_uint(raw, position)
+    values = []
+    for _ in range(count):
+        value, position = _get_value(raw, position)
+        values.append(value)
+    return values, position
+
+
+def _get_dict(raw: bytes, position: int) -> Tuple[dict, int]:
+    count, position = _get_uint(raw, position)
+    values = {}
+    for _ in range(count):
+        key, position = _get_str(raw, position)
+        values[key], position = _get_value(raw, position)
+    return values, position
+
+
+_READERS = {
+    T_NONE: lambda raw, position: (None, position),
+    T_FALSE: lambda raw, position: (False, position),
+    T_TRUE: lambda raw, position: (True, position),
+    T_INT: _get_int,
+    T_FLOAT: _get_float,
+    T_STR: _get_str,
+    T_DECIMAL: _get_decimal,
+    T_DATE: _get_date,
+    T_TIME: _get_time,
+    T_DATETIME: _get_datetime,
+    T_LIST: _get_list,
+    T_DICT: _get_dict,
+    T_ITEMS: _get_items,
+}
+
+
+def _get_value(raw: bytes, position: int) -> Tuple[Any, int]:
+    kind = raw[position]
+    position += 1
+    # Короткие строки и небольшие числа — большая часть состояния,
+    # поэтому их длина в один байт читается без вызова функций
+    if kind == T_STR and raw[position] < 0x80:
+        end = position + 1 + raw[position]
+        return raw[position + 1:end].decode("utf-8"), end
+    if kind == T_INT and raw[position] < 0x80:
+        value = raw[position]
+        return (value >> 1) ^ -(value & 1), position + 1
+    reader = _READERS.get(kind)
+    if reader is None:
+        raise CodecError(f"Неизвестный тип значения {kind}")
+    return reader(raw, position)
+
+
+def decode_state(raw: bytes) -> Dict[str, Any]:
+    """
+    Декодирует данные состояния FSM.
+
+    Списки букетов возвращаются как ItemIds; объекты Item по ним
+    загружает вызывающий код.
+
+    Args:
+        raw (bytes): Закодированные данные.
+
+    Returns:
+        Dict[str, Any]: Данные состояния.
+    """
+    raw = bytes(raw)
+    if len(raw) < 2:
+        raise CodecError("Слишком короткие данные состояния")
+    version, flags = raw[0], raw[1]
+    if version != VERSION:
+        raise CodecError(f"Неподдерживаемая версия состояния {version}")
+
+    data = {}
+    try:
+        if flags & FLAG_ZLIB:
+            body, position = zlib.decompress(raw[2:]), 0
+        else:
+            body, position = raw, 2
+        size = len(body)
+        while position < size:
+            key_id = body[position]
+            position += 1
+            if key_id == CUSTOM_KEY:
+                key, position = _get_str(body, position)
+            elif key_id <= len(SCHEMA_KEYS):
+                key = SCHEMA_KEYS[key_id - 1]
+            else:
+                raise CodecError(f"Неизвестный ключ состояния {key_id}")
+            if body[position] == T_STR and body[position + 1] < 0x80:
+                # Повтор быстрого пути _get_value без вызова функции
+                end = position + 2 + body[position + 1]
+                data[key] = body[position + 2:end].decode("utf-8")
+                position = end
+            else:
+                data[key], position = _get_value(body, position)
+    except CodecError:
+        raise
+    except (IndexError, ValueError, ArithmeticError, struct.error, zlib.error) as e:
+        # ValueError и ArithmeticError — недопустимые дата, время или Decimal
+        raise CodecError(f"Поврежденные данные состояния: {e}") from e
+    return data
+
+
+def item_ids(data: Dict[str, Any]) -> List[int]:
+    """
+    Собирает ID всех букетов, на которые ссылается состояние.
+
+    Args:
+        data (Dict[str, Any]): Декодированные данные состояния.
+
+    Returns:
+        List[int]: ID букетов без повторов.
+    """
+    ids = set()
+    for value in data.values():
+        if isinstance(value, ItemIds):
+            ids.update(value)
+    return list(ids)
+
+
+def attach_items(data: Dict[str, Any], items: Dict[int, Item]) -> Dict[str, Any]:
+    """
+    Заменяет списки ID букетов объектами Item.
+
+    Удаленные из каталога букеты пропускаются.
+
+    Args:
+        data (Dict[str, Any]): Декодированные данные состояния.
+        items (Dict[int, Item]): Букеты по ID.
+
+    Returns:
+        Dict[str, Any]: Данные состояния с объектами Item.
+    """
+    for key, value in data.items():
+        if isinstance(value, ItemIds):
+            data[key] = [items[item_id] for item_id in value if item_id in items]
+    return data
+
+
+def decode_legacy_json(text: str) -> Dict[str, Any]:
+    """
+    Декодирует состояние, сохраненное старым форматом JSON.
+
+    Args:
+        text (str): JSON-текст состояния.
+
+    Returns:
+        Dict[str, Any]: Данные состояния, списки букетов — как ItemIds.
+    """
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise CodecError(f"Поврежденные данные состояния: {e}") from e
+
+    for key, value in data.items():
+        if isinstance(value, list) and key == "filtered_items":
+            data[key] = ItemIds(
+                element["id"] for element in value
+                if isinstance(element, dict) and element.get("id") is not None
+            )
+        elif isinstance(value, float):
+            data[key] = Decimal(str(value))
+    return data
@@ -0,0 +1,196 @@
+import logging
+import os
+import shutil
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import PurePosixPath
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+logger = logging.getLogger(__name__)
+
+OPTIMIZED_DIR = "bouquets/optimized"
+THUMBNAIL_DIR = "bouquets/thumbnails"
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def derived_names(photo_name: str) -> Tuple[str, str]:
+    """
+    Возвращает относительные пути оптимизированной копии и миниатюры.
+
+    Args:
+        photo_name (str): Путь исходного фото относительно MEDIA_ROOT.
+
+    Returns:
+        Tuple[str, str]: Пути оптимизированного фото и миниатюры.
+    """
+    # В имя входят путь и расширение исходного фото, поэтому rose.jpg,
+    # rose.png и одноименные фото из разных каталогов не перезаписывают
+    # производные файлы друг друга
+    name = "_".join(PurePosixPath(photo_name).parts)
+    return (
+        f"{OPTIMIZED_DIR}/{name}.jpg",
+        f"{THUMBNAIL_DIR}/{name}.jpg",
+    )
+
+
+def _save_jpeg(image: "Image.Image", path: str, size: int, quality: int) -> None:
+    from PIL import Image
+
+    copy = image.copy()
+    copy.thumbnail((size, size), Image.LANCZOS)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    copy.save(path, "JPEG", quality=quality, optimize=True, progressive=True)
+
+
+def render_variants(
+    source: str,
+    optimized: str,
+    thumbnail: str,
+    max_size: int,
+    thumbnail_size: int
+) -> Tuple[str, str]:
+    """
+    Создает уменьшенную JPEG-копию фото и миниатюру.
+
+    Функция не обращается к Django и выполняется в отдельном процессе.
+
+    Args:
+        source (str): Абсолютный путь исходного фото.
+        optimized (str): Абсолютный путь оптимизированной копии.
+        thumbnail (str): Абсолютный путь миниатюры.
+        max_size (int): Максимальная сторона оптимизированной копии.
+        thumbnail_size (int): Максимальная сторона миниатюры.
+
+    Returns:
+        Tuple[str, str]: Пути созданных файлов.
+    """
+    # Pillow нужен только процессам обработки фото, а не каждому запуску manage.py
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        _save_jpeg(image, optimized, max_size, quality=85)
+        _save_jpeg(image, thumbnail, thumbnail_size, quality=75)
+    return optimized, thumbnail
+
+
+def ingest_photo(source: str, photo: str, *variant_args) -> Tuple[str, str]:
+    """
+    Копирует внешнее фото в каталог медиа и создает его варианты.
+
+    Args:
+        source (str): Путь к исходному файлу.
+        photo (str): Абсолютный путь фото в MEDIA_ROOT.
+        *variant_args: Остальные аргументы render_variants.
+
+    Returns:
+        Tuple[str, str]: Пути созданных файлов.
+    """
+    os.makedirs(os.path.dirname(photo), exist_ok=True)
+    shutil.copyfile(source, photo)
+    return render_variants(photo, *variant_args)
+
+
+def render_args(photo_name: str) -> tuple:
+    """
+    Собирает аргументы render_variants для фото букета.
+
+    Args:
+        photo_name (str): Путь исходного фото относительно MEDIA_ROOT.
+
+    Returns:
+        tuple: Абсолютные пути и размеры для render_variants.
+    """
+    optimized_name, thumbnail_name = derived_names(photo_name)
+    return (
+        os.path.join(settings.MEDIA_ROOT, photo_name),
+        os.path.join(settings.MEDIA_ROOT, optimized_name),
+        os.path.join(settings.MEDIA_ROOT, thumbnail_name),
+        settings.PHOTO_MAX_SIZE,
+        settings.PHOTO_THUMBNAIL_SIZE,
+    )
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """
+    Возвращает общий пул процессов для обработки фото.
+
+    Returns:
+        ProcessPoolExecutor: Пул процессов.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.PHOTO_WORKERS)
+    return _executor
+
+
+def needs_processing(item) -> bool:
+    """
+    Проверяет, нужно ли заново обработать фото букета.
+
+    Args:
+        item (Item): Объект букета.
+
+    Returns:
+        bool: True, если производные файлы отсутствуют или устарели.
+    """
+    if not item.photo:
+        return False
+    optimized_name, thumbnail_name = derived_names(item.photo.name)
+    return (
+        item.photo_optimized.name != optimized_name
+        or item.photo_thumbnail.name != thumbnail_name
+    )
+
+
+def _store_result(item_id: int, photo_name: str, future: Future) -> None:
+    from bot.models import Item
+
+    try:
+        future.result()
+        optimized_name, thumbnail_name = derived_names(photo_name)
+        Item.objects.filter(id=item_id, photo=photo_name).update(
+            photo_optimized=optimized_name,
+            photo_thumbnail=thumbnail_name,
+            photo_file_id="",
+            # update() не заполняет auto_now, а по нему индекс находит изменения
+            updated_at=timezone.now()
+        )
+    except Exception as e:
+        logger.error("Ошибка обработки фото букета %s: %s", item_id, e)
+    finally:
+        close_old_connections()
+
+
+def schedule_item_photo(item) -> None:
+    """
+    Ставит обработку фото букета в пул процессов после коммита транзакции.
+
+    Args:
+        item (Item): Сохраненный объект букета.
+    """
+    if not needs_processing(item):
+        return
+
+    item_id = item.id
+    photo_name = item.photo.name
+
+    def submit():
+        future = get_executor().submit(
+            render_variants, *render_args(photo_name)
+        )
+        future.add_done_callback(
+            lambda f: _store_result(item_id, photo_name, f)
+        )
+
+    transaction.on_commit(submit)
@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from bot.models import Item, Reservation
+from bot.utils.tenancy import shop_id
+
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_PREFIX = "order_"
+
+
+def payload_token(payload: str) -> str:
+    """
+    Извлекает токен брони из payload счета.
+
+    Args:
+        payload (str): Payload счета.
+
+    Returns:
+        str: Токен брони или пустая строка.
+    """
+    return payload[len(PAYLOAD_PREFIX):] if payload.startswith(PAYLOAD_PREFIX) else ""
+
+
+def take_stock(item_id: int) -> bool:
+    """
+    Атомарно уменьшает остаток букета на один.
+
+    Букеты без ограничения остатка всегда доступны.
+
+    Args:
+        item_id (int): ID букета.
+
+    Returns:
+        bool: True, если букет доступен.
+    """
+    if Item.objects.filter(id=item_id, stock__gt=0).update(stock=F("stock") - 1):
+        return True
+    return Item.objects.filter(id=item_id, stock__isnull=True).exists()
+
+
+def hold(item_id: int, user_id: int, ttl: int) -> Tuple[Optional[Reservation], List[str]]:
+    """
+    Бронирует букет для пользователя.
+
+    Предыдущие брони пользователя в текущем магазине снимаются в той же
+    транзакции; неоплаченные счета в других магазинах остаются в силе.
+
+    Args:
+        item_id (int): ID букета.
+        user_id (int): Telegram ID пользователя.
+        ttl (int): Срок брони в секундах.
+
+    Returns:
+        Tuple[Optional[Reservation], List[str]]: Бронь (None, если букет
+        закончился) и токены снятых прежних броней.
+    """
+    with transaction.atomic():
+        # Подзапрос вместо соединения: SELECT FOR UPDATE не блокирует букеты
+        released = release(Reservation.objects.filter(
+            user_tg_id=user_id,
+            status="held",
+            item__in=Item.objects.filter(shop_id=shop_id())
+        ))
+        if not take_stock(item_id):
+            return None, released
+        return Reservation.objects.create(
+            token=uuid.uuid4().hex,
+            item_id=item_id,
+            user_tg_id=user_id,
+            expires_at=timezone.now() + timedelta(seconds=ttl)
+        ), released
+
+
+def release(reservations) -> List[str]:
+    """
+    Снимает брони и возвращает букеты в остаток.
+
+    Вызывается внутри транзакции.
+
+    Args:
+        reservations (QuerySet): Брони для снятия.
+
+    Returns:
+        List[str]: Токены снятых броней.
+    """
+    rows = list(
+        reservations.select_for_update()
+        .filter(status="held")
+        .values_list("id", "token", "item_id")
+    )
+    if not rows:
+        return []
+    Reservation.objects.filter(id__in=[row[0] for row in rows]).update(status="released")
+    for item_id, count in Counter(row[2] for row in rows).items():
+        Item.objects.filter(id=item_id, stock__isnull=False).update(
+            stock=F("stock") + count
+        )
+    return [row[1] for row in rows]
+
+
+def confirm(token: str, item_id: int) -> None:
+    """
+    Подтверждает бронь после оплаты.
+
+    Если бронь уже снята по времени, букет списывается из остатка заново.
+    Вызывается внутри транзакции заказа.
+
+    Args:
+        token (str): Токен брони.
+        item_id (int): ID букета.
+    """
+    if Reservation.objects.filter(token=token, status="held").update(status="confirmed"):
+        return
+    if not take_stock(item_id):
+        logger.warning("Оплачен букет %s, которого нет в остатке", item_id)
+
+
+def release_expired(now: datetime) -> List[str]:
+    """
+    Снимает просроченные брони.
+
+    Args:
+        now (datetime): Текущее время.
+
+    Returns:
+        List[str]: Токены снятых броней.
+    """
+    with transaction.atomic():
+        return release(Reservation.objects.filter(status="held", expires_at__lte=now))
+
+
+class Inventory:
+    """Брони букетов с копией действующих броней в памяти"""
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.held: Dict[str, datetime] = {}
+
+    def is_held(self, token: str) -> bool:
+        """
+        Проверяет по памяти, что бронь действует.
+
+        Args:
+            token (str): Токен брони.
+
+        Returns:
+            bool: True, если бронь есть и не истекла.
+        """
+        expires_at = self.held.get(token)
+        return expires_at is not None and expires_at > timezone.now()
+
+    def forget(self, token: str) -> None:
+        """
+        Убирает бронь из памяти после оплаты или снятия.
+
+        Args:
+            token (str): Токен брони.
+        """
+        self.held.pop(token, None)
+
+    async def load(self) -> None:
+        """Загружает действующие брони из базы данных при запуске бота."""
+        rows = await sync_to_async(list)(
+            Reservation.objects.filter(
+                status="held", expires_at__gt=timezone.now()
+            ).values_list("token", "expires_at")
+        )
+        self.held = dict(rows)
+        logger.info("Загружено действующих броней: %s", len(self.held))
+
+    async def reserve(self, item_id: int, user_id: int) -> Optional[str]:
+        """
+        Бронирует букет на время оплаты счета.
+
+        Args:
+            item_id (int): ID букета.
+            user_id (int): Telegram ID пользователя.
+
+        Returns:
+            Optional[str]: Токен брони или None, если букет закончился.
+        """
+        reservation, released = await sync_to_async(hold)(item_id, user_id, self.ttl)
+        for token in released:
+            self.forget(token)
+        if reservation is None:
+            return None
+        self.held[reservation.token] = reservation.expires_at
+        return reservation.token
+
+    async def cancel(self, token: str) -> None:
+        """
+        Снимает бронь, например если счет не удалось отправить.
+
+        Args:
+            token (str): Токен брони.
+        """
+        self.forget(token)
+        await sync_to_async(transaction.atomic(release))(
+            Reservation.objects.filter(token=token)
+        )
+
+    async def release_expired(self) -> int:
+        """
+        Снимает просроченные брони в базе и в памяти.
+
+        Returns:
+            int: Количество снятых броней.
+        """
+        tokens = await sync_to_async(release_expired)(timezone.now())
+        for token in tokens:
+            self.forget(token)
+        return len(tokens)
+
+
+inventory = Inventory(settings.RESERVATION_TTL)
+
+
+async def run_reservation_reaper(interval: float) -> None:
+    """
+    Периодически возвращает в остаток букеты с просроченной бронью.
+
+    Args:
+        interval (float): Пауза между проверками в секундах.
+    """
+    while True:
+        try:
+            released = await inventory.release_expired()
+            if released:
+                logger.info("Снято просроченных броней: %s", released)
+        except Exception as e:
+            logger.error("Ошибка снятия броней: %s", e)
+        await asyncio.sleep(interval)
@@ -0,0 +1,104 @@
+import os
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from aiogram.types import FSInputFile
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from bot.models import Item
+
+
+_file_ids: Dict[str, str] = {}
+
+
+def photo_name(item: Item) -> Optional[str]:
+    """
+    Возвращает путь фото, которое бот отправляет для букета.
+
+    Args:
+        item (Item): Объект букета.
+
+    Returns:
+        Optional[str]: Путь относительно MEDIA_ROOT или None.
+    """
+    photo = item.photo_optimized or item.photo
+    return photo.name if photo else None
+
+
+def cached_file_id(name: str, stored_file_id: str = "") -> str:
+    """
+    Возвращает известный file_id фото.
+
+    Args:
+        name (str): Путь фото относительно MEDIA_ROOT.
+        stored_file_id (str): Сохраненный в базе file_id.
+
+    Returns:
+        str: file_id или пустая строка, если фото еще не загружалось.
+    """
+    return _file_ids.get(name) or stored_file_id
+
+
+def photo_input(name: str, stored_file_id: str = "") -> Union[str, FSInputFile]:
+    """
+    Возвращает file_id фото, а если фото еще не загружалось — файл.
+
+    Args:
+        name (str): Путь фото относительно MEDIA_ROOT.
+        stored_file_id (str): Сохраненный в базе file_id.
+
+    Returns:
+        Union[str, FSInputFile]: file_id или файл для загрузки.
+    """
+    file_id = cached_file_id(name, stored_file_id)
+    if file_id:
+        return file_id
+    return FSInputFile(os.path.join(settings.MEDIA_ROOT, name))
+
+
+@sync_to_async
+def _store_file_ids(photos: Dict[str, Tuple[int, str]]) -> None:
+    for name, (item_id, file_id) in photos.items():
+        Item.objects.filter(
+            Q(photo_optimized=name) | Q(photo_optimized="", photo=name),
+            id=item_id,
+        ).update(photo_file_id=file_id, updated_at=timezone.now())
+
+
+async def remember_file_ids(photos: Iterable[Tuple[int, str, str]]) -> None:
+    """
+    Запоминает file_id загруженных фото, чтобы не отправлять файлы повторно.
+
+    Args:
+        photos (Iterable[Tuple[int, str, str]]): ID букета, путь фото и file_id.
+    """
+    new = {}
+    for item_id, name, file_id in photos:
+        if _file_ids.get(name) != file_id:
+            _file_ids[name] = file_id
+            new[name] = (item_id, file_id)
+    if new:
+        await _store_file_ids(new)
+
+
+@sync_to_async
+def _stored_file_ids() -> Dict[str, str]:
+    photos = Item.objects.exclude(photo_file_id="").values_list(
+        "photo_optimized", "photo", "photo_file_id"
+    )
+    return {optimized or photo: file_id for optimized, photo, file_id in photos}
+
+
+async def load_file_ids() -> int:
+    """
+    Загружает сохраненные в базе file_id фото одним запросом.
+
+    Returns:
+        int: Количество загруженных file_id.
+    """
+    stored = await _stored_file_ids()
+    for name, file_id in stored.items():
+        _file_ids.setdefault(name, file_id)
+    return len(stored)
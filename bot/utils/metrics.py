@@ -0,0 +1,57 @@
+import logging
+from collections import Counter
+from typing import Dict
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType
+)
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+
+logger = logging.getLogger(__name__)
+
+counters: Counter = Counter()
+
+
+def incr(name: str, value: int = 1) -> None:
+    """
+    Увеличивает счетчик метрики.
+
+    Args:
+        name (str): Имя счетчика.
+        value (int): Величина приращения.
+    """
+    counters[name] += value
+
+
+def snapshot() -> Dict[str, int]:
+    """
+    Возвращает копию текущих значений счетчиков.
+
+    Returns:
+        Dict[str, int]: Значения счетчиков по именам.
+    """
+    return dict(counters)
+
+
+def log_snapshot() -> None:
+    """Записывает значения всех счетчиков в лог."""
+    for name, value in sorted(counters.items()):
+        logger.info("%s = %s", name, value)
+
+
+class ApiCallCounter(BaseRequestMiddleware):
+    """Считает вызовы Telegram Bot API по именам методов"""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        incr("api.total")
+        incr(f"api.{method.__api_method__}")
+        return await make_request(bot, method)
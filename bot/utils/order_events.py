@@ -0,0 +1,221 @@
+import logging
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from bot.models import (
+    Courier,
+    CourierAssignment,
+    CourierDelivery,
+    Order,
+    OrderEvent
+)
+from bot.utils.staff import couriers
+
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = {"delivered", "canceled"}
+TIMING_FIELDS = [
+    "paid_at",
+    "assigned_at",
+    "picked_at",
+    "completed_at",
+    "preparation_time",
+    "delivery_duration",
+    "processing_time",
+]
+
+
+def project(order: Order, event: OrderEvent) -> List[str]:
+    """
+    Применяет событие к вычисляемым полям заказа.
+
+    Статус и длительности считаются только по событиям, поэтому та же
+    функция используется и при записи события, и при пересчете заказа по
+    всему журналу. События после доставки или отмены не меняют заказ.
+
+    Args:
+        order (Order): Заказ; изменяется на месте.
+        event (OrderEvent): Событие заказа.
+
+    Returns:
+        List[str]: Имена измененных полей.
+    """
+    if order.status in FINAL_STATUSES:
+        return []
+
+    at = event.at
+    started = order.created_at or at
+    if event.kind == "paid":
+        order.paid_at = at
+        return ["paid_at"]
+    if event.kind == "assigned":
+        order.assigned_at = at
+        order.status = "in_work"
+        fields = ["assigned_at", "status"]
+        if event.courier_id:
+            order.courier_id = event.courier_id
+            fields.append("courier")
+        return fields
+    if event.kind == "picked":
+        order.picked_at = at
+        order.preparation_time = at - (order.paid_at or started)
+        order.status = "in_work"
+        return ["picked_at", "preparation_time", "status"]
+    if event.kind in ("delivered", "cancelled"):
+        order.status = "delivered" if event.kind == "delivered" else "canceled"
+        order.completed_at = at
+        order.processing_time = at - started
+        fields = ["status", "completed_at", "processing_time"]
+        handed_over = order.picked_at or order.assigned_at
+        if event.kind == "delivered" and handed_over:
+            order.delivery_duration = at - handed_over
+            fields.append("delivery_duration")
+        return fields
+    return []
+
+
+def record_event(
+    order: Order,
+    kind: str,
+    at: Optional[datetime] = None,
+    courier: Optional[Courier] = None
+) -> Optional[OrderEvent]:
+    """
+    Добавляет событие в журнал заказа и сразу обновляет заказ.
+
+    Повторное событие, которое случается один раз (например, повторное
+    нажатие «Доставлено»), не записывается.
+
+    Args:
+        order (Order): Заказ.
+        kind (str): Вид события из OrderEvent.KINDS.
+        at (Optional[datetime]): Время события; по умолчанию текущее.
+        courier (Optional[Courier]): Курьер, если событие с ним связано.
+
+    Returns:
+        Optional[OrderEvent]: Событие или None, если оно уже было.
+    """
+    try:
+        with transaction.atomic():
+            event = OrderEvent.objects.create(
+                order=order,
+                kind=kind,
+                courier=courier,
+                at=at or timezone.now()
+            )
+            current = Order.objects.select_for_update().get(id=order.id)
+            fields = project(current, event)
+            if fields:
+                current.save(update_fields=fields)
+                if current.status in FINAL_STATUSES:
+                    couriers.release(current.courier_id)
+            if kind == "delivered":
+                _complete_assignments(current, event.at)
+    except IntegrityError:
+        logger.info("Событие %s заказа #%s уже записано", kind, order.id)
+        return None
+    return event
+
+
+def record_checkout(order: Order) -> List[OrderEvent]:
+    """
+    Записывает события оформления заказа одной вставкой.
+
+    Оплата и назначение курьера уже заполнены в заказе при его создании,
+    поэтому заказ не перечитывается и не обновляется. Заказ из бота
+    создается уже оплаченным, поэтому все события записываются на момент
+    оплаты, а порядок задает ID.
+
+    Args:
+        order (Order): Созданный заказ.
+
+    Returns:
+        List[OrderEvent]: События создания, оплаты и назначения курьера.
+    """
+    events = [OrderEvent(order=order, kind="created", at=order.paid_at or order.created_at)]
+    if order.paid_at:
+        events.append(OrderEvent(order=order, kind="paid", at=order.paid_at))
+    if order.assigned_at:
+        events.append(OrderEvent(
+            order=order, kind="assigned", courier_id=order.courier_id, at=order.assigned_at
+        ))
+    return OrderEvent.objects.bulk_create(events)
+
+
+def _complete_assignments(order: Order, at: datetime) -> None:
+    for assignment in CourierAssignment.objects.filter(order=order, delivered_at__isnull=True):
+        assignment.delivered_at = at
+        assignment.delivery_time = at - assignment.assigned_at
+        assignment.save(update_fields=["delivered_at", "delivery_time"])
+
+
+def rebuild(orders: Iterable[Order]) -> int:
+    """
+    Пересчитывает статус и длительности заказов по журналу событий.
+
+    Заказы без событий (созданные до появления журнала) не меняются:
+    сбросить их по пустому журналу значило бы потерять настоящий статус.
+    Для них журнал сначала восстанавливается через backfill.
+
+    Args:
+        orders (Iterable[Order]): Заказы.
+
+    Returns:
+        int: Количество пересчитанных заказов.
+    """
+    orders = list(orders)
+    events = OrderEvent.objects.filter(order__in=orders).order_by("order_id", "at", "id")
+    by_order = {}
+    for event in events:
+        by_order.setdefault(event.order_id, []).append(event)
+
+    rebuilt = [order for order in orders if order.id in by_order]
+    for order in rebuilt:
+        for field in TIMING_FIELDS:
+            setattr(order, field, None)
+        order.status = "new"
+        for event in by_order[order.id]:
+            project(order, event)
+    Order.objects.bulk_update(rebuilt, ["status", "courier", *TIMING_FIELDS])
+    return len(rebuilt)
+
+
+def backfill(order: Order) -> List[OrderEvent]:
+    """
+    Восстанавливает события заказа, созданного до появления журнала.
+
+    Args:
+        order (Order): Заказ без событий.
+
+    Returns:
+        List[OrderEvent]: Созданные события.
+    """
+    started = order.created_at or timezone.now()
+    events = [OrderEvent(order=order, kind="created", at=started)]
+    if order.payment_charge_id:
+        events.append(OrderEvent(order=order, kind="paid", at=started))
+    for assignment in CourierAssignment.objects.filter(order=order):
+        events.append(OrderEvent(
+            order=order, kind="assigned", courier_id=assignment.courier_id, at=assignment.assigned_at
+        ))
+    delivery = CourierDelivery.objects.filter(order=order, delivered=True).first()
+    if delivery or order.status == "delivered":
+        at = delivery.delivered_at if delivery else order.completed_at
+        events.append(OrderEvent(order=order, kind="delivered", at=at or started))
+    elif order.status == "canceled":
+        events.append(OrderEvent(order=order, kind="cancelled", at=order.completed_at or started))
+    return OrderEvent.objects.bulk_create(events)
+
+
+@receiver(post_save, sender=Order)
+def order_created(sender, instance, created, **kwargs):
+    """Записывает создание заказа в журнал"""
+    # Заказ из бота записывает свои события сам через record_checkout
+    if created and not getattr(instance, "events_recorded", False):
+        record_event(instance, "created", at=instance.created_at)
@@ -0,0 +1,293 @@
+import asyncio
+import logging
+import random
+from datetime import timedelta
+from typing import Collection, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter
+)
+from aiogram.types import InlineKeyboardMarkup
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from bot.models import CourierDelivery, FloristCallback, OutboxMessage
+from bot.utils.metrics import incr
+
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE = 2
+BATCH_SIZE = 50
+
+# Ошибки, после которых повтор не поможет: чат недоступен или запрос неверен
+PERMANENT_ERRORS = (TelegramBadRequest, TelegramForbiddenError)
+
+wakeup = asyncio.Event()
+
+
+def enqueue(
+    chat_id: int,
+    text: str,
+    reply_markup: Optional[InlineKeyboardMarkup] = None,
+    shop_id: Optional[int] = None
+) -> OutboxMessage:
+    """
+    Ставит уведомление в очередь отправки.
+
+    Вызывается внутри транзакции, изменяющей данные, о которых сообщается:
+    уведомление сохраняется вместе с ними или не сохраняется вовсе.
+
+    Args:
+        chat_id (int): Telegram ID получателя.
+        text (str): Текст сообщения.
+        reply_markup (Optional[InlineKeyboardMarkup]): Клавиатура сообщения.
+        shop_id (Optional[int]): Магазин, бот которого отправит уведомление.
+
+    Returns:
+        OutboxMessage: Сохраненное уведомление.
+    """
+    return OutboxMessage.objects.create(
+        shop_id=shop_id,
+        chat_id=chat_id,
+        text=text,
+        reply_markup=(
+            reply_markup.model_dump(mode="json", exclude_none=True)
+            if reply_markup else None
+        )
+    )
+
+
+def notify_courier(delivery: CourierDelivery) -> OutboxMessage:
+    """
+    Ставит в очередь уведомление курьеру о новом заказе.
+
+    Args:
+        delivery (CourierDelivery): Доставка с заказом и курьером.
+
+    Returns:
+        OutboxMessage: Сохраненное уведомление.
+    """
+    # Клавиатуры импортируют bot.utils.requests, который импортирует этот модуль
+    from bot.keyboards.keyboards import create_courier_keyboard
+
+    order, courier = delivery.order, delivery.courier
+    return enqueue(
+        courier.tg_id,
+        (
+            f">>>>{courier.name}\n"
+            "🚨 Новый заказ!\n"
+            f"🔢 Номер заказа: #{order.id}\n"
+            f"📦 Адрес: {order.address}\n"
+            f"📅 Дата: {order.delivery_date}\n"
+            f"⏰ Время: {order.delivery_time}\n"
+            f"👤 Клиент: {order.name}\n"
+        ),
+        create_courier_keyboard(delivery.id),
+        courier.shop_id
+    )
+
+
+def notify_florist(florist_callback: FloristCallback) -> OutboxMessage:
+    """
+    Ставит в очередь просьбу флористу перезвонить клиенту.
+
+    Args:
+        florist_callback (FloristCallback): Заявка на звонок с флористом.
+
+    Returns:
+        OutboxMessage: Сохраненное уведомление.
+    """
+    from bot.keyboards.keyboards import create_florist_keyboard
+
+    return enqueue(
+        florist_callback.florist.tg_id,
+        (
+            "Звонок клиенту:\n"
+            "🚨 Требуется консультация клиенту\n"
+            f"🔢 Номер тел: #{florist_callback.phone_number}"
+        ),
+        create_florist_keyboard(florist_callback.id),
+        florist_callback.florist.shop_id
+    )
+
+
+def wake() -> None:
+    """Будит фоновую задачу, чтобы новые уведомления ушли без ожидания."""
+    wakeup.set()
+
+
+def backoff(attempts: int) -> float:
+    """
+    Возвращает паузу перед следующей попыткой с экспоненциальным ростом.
+
+    Args:
+        attempts (int): Количество сделанных попыток.
+
+    Returns:
+        float: Пауза в секундах.
+    """
+    delay = min(BACKOFF_BASE ** attempts, settings.OUTBOX_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1)
+
+
+def due_messages(limit: int, shop_ids: Collection[Optional[int]]) -> List[OutboxMessage]:
+    """
+    Возвращает неотправленные уведомления, время попытки которых наступило.
+
+    Args:
+        limit (int): Максимальное количество уведомлений.
+        shop_ids (Collection[Optional[int]]): Магазины, боты которых
+            запущены в этом процессе; None — магазин по умолчанию.
+
+    Returns:
+        List[OutboxMessage]: Уведомления в порядке создания.
+    """
+    shops = Q(shop_id__in=[shop_id for shop_id in shop_ids if shop_id is not None])
+    if None in shop_ids:
+        shops |= Q(shop__isnull=True)
+    return list(
+        OutboxMessage.objects.filter(
+            shops,
+            sent_at__isnull=True,
+            next_attempt_at__lte=timezone.now()
+        ).order_by("id")[:limit]
+    )
+
+
+def mark_sent(message_id: int) -> None:
+    """
+    Отмечает уведомление отправленным.
+
+    Args:
+        message_id (int): ID уведомления.
+    """
+    OutboxMessage.objects.filter(id=message_id).update(
+        sent_at=timezone.now(),
+        attempts=F("attempts") + 1
+    )
+
+
+def mark_failed(
+    message: OutboxMessage,
+    error: Exception,
+    delay: Optional[float] = None,
+    permanent: bool = False
+) -> None:
+    """
+    Записывает неудачную попытку и назначает следующую.
+
+    После OUTBOX_MAX_ATTEMPTS попыток или постоянной ошибки уведомление
+    больше не отправляется (next_attempt_at очищается).
+
+    Args:
+        message (OutboxMessage): Уведомление.
+        error (Exception): Ошибка отправки.
+        delay (Optional[float]): Пауза, которую запросил Telegram.
+        permanent (bool): Ошибка не исчезнет при повторе.
+    """
+    attempts = message.attempts + 1
+    if permanent or attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        next_attempt_at = None
+        logger.error("Уведомление #%s не доставлено: %s", message.id, error)
+        incr("outbox.dropped")
+    else:
+        pause = delay if delay is not None else backoff(attempts)
+        next_attempt_at = timezone.now() + timedelta(seconds=pause)
+    OutboxMessage.objects.filter(id=message.id).update(
+        attempts=attempts,
+        next_attempt_at=next_attempt_at,
+        last_error=str(error)[:1000]
+    )
+
+
+async def deliver(bot: Bot, message: OutboxMessage) -> bool:
+    """
+    Отправляет одно уведомление и записывает результат.
+
+    Args:
+        bot (Bot): Экземпляр бота.
+        message (OutboxMessage): Уведомление.
+
+    Returns:
+        bool: True, если уведомление отправлено.
+    """
+    try:
+        await bot.send_message(
+            chat_id=message.chat_id,
+            text=message.text,
+            reply_markup=(
+                InlineKeyboardMarkup.model_validate(message.reply_markup)
+                if message.reply_markup else None
+            )
+        )
+    except TelegramRetryAfter as e:
+        await sync_to_async(mark_failed)(message, e, delay=e.retry_after)
+    except PERMANENT_ERRORS as e:
+        await sync_to_async(mark_failed)(message, e, permanent=True)
+    except (TelegramAPIError, OSError, asyncio.TimeoutError) as e:
+        logger.warning("Повтор уведомления #%s: %s", message.id, e)
+        await sync_to_async(mark_failed)(message, e)
+    else:
+        await sync_to_async(mark_sent)(message.id)
+        incr("outbox.sent")
+        return True
+    incr("outbox.failed")
+    return False
+
+
+async def send_due(bots: Dict[Optional[int], Bot]) -> int:
+    """
+    Отправляет одну пачку уведомлений, время попытки которых наступило.
+
+    Непредвиденная ошибка отправки одного уведомления не останавливает
+    пачку: уведомление откладывается, как после сетевой ошибки.
+
+    Args:
+        bots (Dict[Optional[int], Bot]): Боты запущенных магазинов по ID магазина.
+
+    Returns:
+        int: Количество уведомлений в пачке.
+    """
+    messages = await sync_to_async(due_messages)(BATCH_SIZE, list(bots))
+    for message in messages:
+        try:
+            await deliver(bots[message.shop_id], message)
+        except Exception as e:
+            logger.exception("Ошибка отправки уведомления #%s", message.id)
+            incr("outbox.failed")
+            await sync_to_async(mark_failed)(message, e)
+    return len(messages)
+
+
+async def run_outbox_worker(bots: Dict[Optional[int], Bot], interval: float) -> None:
+    """
+    Отправляет уведомления из очереди, повторяя неудачные с нарастающей паузой.
+
+    Уведомление отмечается отправленным только после ответа Telegram,
+    поэтому после сбоя процесса оно будет отправлено повторно: доставка
+    гарантируется хотя бы один раз.
+
+    Args:
+        bots (Dict[Optional[int], Bot]): Боты запущенных магазинов по ID
+            магазина; уведомления других магазинов не отправляются.
+        interval (float): Пауза между проверками очереди в секундах.
+    """
+    while True:
+        wakeup.clear()
+        try:
+            count = await send_due(bots)
+        except Exception as e:
+            logger.error("Ошибка отправки уведомлений: %s", e)
+            count = 0
+        if count < BATCH_SIZE:
+            try:
+                await asyncio.wait_for(wakeup.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
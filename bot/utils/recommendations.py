@@ -0,0 +1,123 @@
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from bot.utils.composition import FLOWERS, tokenize_structure
+
+
+PRICE_CENTERS = 8
+PRICE_WEIGHT = 1.0
+CATEGORY_WEIGHT = 0.7
+FLOWER_WEIGHT = 1.0
+
+
+def vectorize(
+    items: Sequence[Tuple[int, str, float, int | None]]
+) -> np.ndarray:
+    """
+    Строит нормированные векторы букетов по составу, цене и событию.
+
+    Цена кодируется близостью логарифма цены к равномерно расставленным
+    центрам, поэтому близкие по цене букеты получают похожие векторы.
+
+    Args:
+        items (Sequence[Tuple[int, str, float, int | None]]): ID, состав,
+            цена и ID категории каждого букета.
+
+    Returns:
+        np.ndarray: Матрица размера (число букетов, число признаков).
+    """
+    flower_columns = {key: column for column, key in enumerate(FLOWERS)}
+    category_ids = sorted({category for *_, category in items if category})
+    category_columns = {
+        category: len(flower_columns) + column
+        for column, category in enumerate(category_ids)
+    }
+    price_offset = len(flower_columns) + len(category_columns)
+
+    matrix = np.zeros(
+        (len(items), price_offset + PRICE_CENTERS), dtype=np.float32
+    )
+    for row, (_, structure, _, category) in enumerate(items):
+        for flower in tokenize_structure(structure):
+            matrix[row, flower_columns[flower]] = FLOWER_WEIGHT
+        if category in category_columns:
+            matrix[row, category_columns[category]] = CATEGORY_WEIGHT
+
+    prices = np.log1p(np.array([price for _, _, price, _ in items], dtype=np.float32))
+    if len(prices):
+        low, high = float(prices.min()), float(prices.max())
+        centers = np.linspace(low, high, PRICE_CENTERS, dtype=np.float32)
+        width = max((high - low) / PRICE_CENTERS, 1e-3)
+        matrix[:, price_offset:] = PRICE_WEIGHT * np.exp(
+            -((prices[:, None] - centers[None, :]) ** 2) / (2 * width ** 2)
+        )
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+def top_k_neighbours(
+    matrix: np.ndarray,
+    k: int,
+    batch_size: int = 512
+) -> np.ndarray:
+    """
+    Находит для каждой строки k строк с наибольшим косинусным сходством.
+
+    Сходство считается блоками, чтобы не хранить всю матрицу N×N в памяти.
+
+    Args:
+        matrix (np.ndarray): Нормированные векторы.
+        k (int): Количество соседей.
+        batch_size (int): Количество строк в блоке.
+
+    Returns:
+        np.ndarray: Индексы соседей размера (N, min(k, N - 1)), по убыванию сходства.
+    """
+    total = len(matrix)
+    k = min(k, total - 1)
+    if k <= 0:
+        return np.empty((total, 0), dtype=np.int64)
+
+    result = np.empty((total, k), dtype=np.int64)
+    for start in range(0, total, batch_size):
+        stop = min(start + batch_size, total)
+        scores = matrix[start:stop] @ matrix.T
+        rows = np.arange(stop - start)
+        scores[rows, rows + start] = -np.inf
+
+        # Для малых k последовательный argmax быстрее argpartition
+        for column in range(k):
+            best = scores.argmax(axis=1)
+            result[start:stop, column] = best
+            scores[rows, best] = -np.inf
+    return result
+
+
+def similar_ids(
+    items: Sequence[Tuple[int, str, float, int | None]],
+    k: int,
+    batch_size: int = 512
+) -> Dict[int, List[int]]:
+    """
+    Вычисляет похожие букеты для всего каталога.
+
+    Args:
+        items (Sequence[Tuple[int, str, float, int | None]]): ID, состав,
+            цена и ID категории каждого букета.
+        k (int): Количество похожих букетов.
+        batch_size (int): Количество строк в блоке.
+
+    Returns:
+        Dict[int, List[int]]: ID похожих букетов для каждого ID.
+    """
+    if not items:
+        return {}
+    ids = np.array([item_id for item_id, *_ in items], dtype=np.int64)
+    neighbours = top_k_neighbours(vectorize(items), k, batch_size)
+    return {
+        int(item_id): ids[row].tolist()
+        for item_id, row in zip(ids, neighbours)
+    }
@@ -1,6 +1,36 @@
+import logging
+from decimal import Decimal
+
 from asgiref.sync import sync_to_async
-from bot.models import User, Category, Item, Order, Courier
-from typing import List, Dict, Any
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from bot.models import (
+    User,
+    Category,
+    Item,
+    Order,
+    CourierAssignment,
+    CourierDelivery,
+    FloristCallback,
+    FSMData
+)
+from bot.utils.fsm_codec import (
+    CodecError,
+    attach_items,
+    decode_legacy_json,
+    decode_state,
+    encode_state,
+    item_ids
+)
+from bot.utils.inventory import confirm as confirm_reservation
+from bot.utils.order_events import record_checkout, record_event
+from bot.utils.outbox import notify_courier, notify_florist
+from bot.utils.staff import couriers, florists
+from bot.utils.tenancy import shop_id
+from typing import List, Dict, Any, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
 
 
 @sync_to_async
@@ -17,62 +47,59 @@ def set_user(tg_id: int) -> None:
 @sync_to_async
 def get_categories() -> List[Category]:
     """
-    Возвращает список всех категорий букетов.
+    Возвращает список категорий букетов текущего магазина.
 
     Returns:
         List[Category]: Список объектов категорий.
     """
-    return list(Category.objects.all())
+    return list(Category.objects.filter(shop_id=shop_id()))
 
 
 @sync_to_async
-def get_category_item(category_id: int) -> List[Item]:
+def get_category_item(
+    category_id: int,
+    price_above: Optional[Decimal] = None,
+    price_upto: Optional[Decimal] = None
+) -> List[Item]:
     """
     Возвращает список букетов для указанной категории.
 
     Args:
         category_id (int): ID категории.
+        price_above (Optional[Decimal]): Цена букета больше этой.
+        price_upto (Optional[Decimal]): Цена букета не больше этой.
 
     Returns:
         List[Item]: Список объектов букетов.
     """
-    return list(Item.objects.filter(category_id=category_id))
+    items = Item.objects.filter(category_id=category_id, shop_id=shop_id())
+    if price_above is not None:
+        items = items.filter(price__gt=price_above)
+    if price_upto is not None:
+        items = items.filter(price__lte=price_upto)
+    return list(items)
 
 
 @sync_to_async
-def get_item(item_id: int) -> Dict[str, Any]:
-    """
-    Возвращает детализированную информацию о букете.
-
-    Args:
-        item_id (int): ID букета.
-
-    Returns:
-        Dict[str, Any]: Словарь с данными букета.
-    """
-    item = Item.objects.get(id=item_id)
-    return {
-        'id': item.id,
-        'name': item.name,
-        'description': item.description,
-        'structure': item.structure,
-        'price': item.price,
-        'photo': item.photo.name if item.photo else None,
-        'category_id': item.category.id if item.category else None
-    }
-
-
-@sync_to_async
-def create_order(
+def commit_order(
     user_id: int,
     item_id: int,
     name: str,
     address: str,
     delivery_date: str,
-    delivery_time: str
-) -> Order:
+    delivery_time: str,
+    payment_charge_id: str,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    reservation_token: str = ""
+) -> Tuple[Order, Optional[CourierDelivery], bool]:
     """
-    Создает новый заказ.
+    Оформляет оплаченный заказ одной транзакцией.
+
+    Создает заказ сразу с активным курьером, назначение и доставку этого
+    курьера, подтверждает бронь букета, ставит в очередь уведомление
+    курьеру и удаляет сохраненное состояние FSM. Повторная доставка того же платежа не создает второй
+    заказ, а возвращает уже оформленный.
 
     Args:
         user_id (int): Telegram ID пользователя.
@@ -81,39 +108,202 @@ def create_order(
         address (str): Адрес доставки.
         delivery_date (str): Дата доставки.
         delivery_time (str): Время доставки.
+        payment_charge_id (str): ID платежа в Telegram.
+        latitude (Optional[float]): Широта адреса, если он найден в справочнике.
+        longitude (Optional[float]): Долгота адреса.
+        reservation_token (str): Токен брони букета из payload счета.
+
+    Returns:
+        Tuple[Order, Optional[CourierDelivery], bool]: Заказ, доставка (None,
+        если нет активных курьеров) и признак того, что заказ создан сейчас.
+    """
+    courier = None
+    committed = False
+    try:
+        with transaction.atomic():
+            user = User.objects.only("id").get(tg_id=user_id)
+            courier = couriers.pick(shop_id())
+            now = timezone.now()
+            order = Order(
+                user=user,
+                item_id=item_id,
+                name=name,
+                address=address,
+                delivery_date=delivery_date,
+                delivery_time=delivery_time,
+                latitude=latitude,
+                longitude=longitude,
+                courier=courier,
+                status="in_work" if courier else "new",
+                paid_at=now,
+                assigned_at=now if courier else None,
+                payment_charge_id=payment_charge_id
+            )
+            # Сигналы заказа не пишут журнал и не ищут курьера повторно
+            order.events_recorded = True
+            order.save(force_insert=True)
+            record_checkout(order)
+            delivery = None
+            if courier:
+                CourierAssignment.objects.create(courier=courier, order=order)
+                delivery = CourierDelivery.objects.create(courier=courier, order=order)
+                notify_courier(delivery)
+            confirm_reservation(reservation_token, item_id)
+            FSMData.objects.filter(user_id=user_id, shop_id=shop_id()).delete()
+        committed = True
+    except IntegrityError:
+        order = (
+            Order.objects.select_related("courier")
+            .filter(payment_charge_id=payment_charge_id)
+            .first()
+        )
+        if order is None:
+            raise
+        logger.info("Платеж %s уже обработан: заказ #%s", payment_charge_id, order.id)
+        return order, CourierDelivery.objects.filter(order=order).first(), False
+    finally:
+        # Транзакция откатилась, поэтому загрузка курьера в памяти тоже возвращается
+        if courier and not committed:
+            couriers.release(courier.id)
+    return order, delivery, True
+
+
+@sync_to_async
+def create_florist_callback(phone: str) -> Optional[FloristCallback]:
+    """
+    Создает заявку на звонок активному флористу и уведомление для него.
+
+    Заявка и уведомление сохраняются в одной транзакции.
+
+    Args:
+        phone (str): Номер телефона клиента.
+
+    Returns:
+        Optional[FloristCallback]: Заявка или None, если нет активных флористов.
+    """
+    with transaction.atomic():
+        florist = florists.pick(shop_id())
+        if not florist:
+            return None
+        florist_callback = FloristCallback.objects.create(
+            phone_number=phone,
+            needs_callback=True,
+            order=None,
+            florist=florist
+        )
+        notify_florist(florist_callback)
+    return florist_callback
+
+
+@sync_to_async
+def mark_picked(courier_delivery_id: int) -> bool:
+    """
+    Отмечает, что курьер забрал букет.
+
+    Args:
+        courier_delivery_id (int): ID доставки.
 
     Returns:
-        Order: Объект созданного заказа.
-    """
-    user = User.objects.get(tg_id=user_id)
-    item = Item.objects.get(id=item_id)
-    return Order.objects.create(
-        user=user,
-        item=item,
-        name=name,
-        address=address,
-        delivery_date=delivery_date,
-        delivery_time=delivery_time
+        bool: False, если отметка уже была.
+    """
+    delivery = CourierDelivery.objects.select_related("order", "courier").get(
+        id=courier_delivery_id
     )
+    return record_event(delivery.order, "picked", courier=delivery.courier) is not None
 
 
 @sync_to_async
-def get_courier() -> Courier:
+def mark_delivered(courier_delivery_id: int) -> bool:
     """
-    Возвращает курьера с ID=2.
+    Отмечает доставку заказа.
+
+    Args:
+        courier_delivery_id (int): ID доставки.
 
     Returns:
-        Courier: Объект курьера.
+        bool: False, если заказ уже отмечен доставленным.
     """
-    return Courier.objects.get(id=2)
+    with transaction.atomic():
+        delivery = CourierDelivery.objects.select_related("order", "courier").get(
+            id=courier_delivery_id
+        )
+        event = record_event(delivery.order, "delivered", courier=delivery.courier)
+        if event is None:
+            return False
+        delivery.delivered = True
+        delivery.delivered_at = event.at
+        delivery.save(update_fields=["delivered", "delivered_at"])
+    return True
+
+
+@sync_to_async
+def get_paid_order(payment_charge_id: str) -> Optional[Order]:
+    """
+    Возвращает заказ, оформленный по платежу.
+
+    Args:
+        payment_charge_id (str): ID платежа в Telegram.
+
+    Returns:
+        Optional[Order]: Объект заказа или None.
+    """
+    return Order.objects.filter(payment_charge_id=payment_charge_id).first()
 
 
 @sync_to_async
 def get_all_items() -> List[Item]:
     """
-    Возвращает список всех доступных букетов.
+    Возвращает список всех букетов текущего магазина.
 
     Returns:
         List[Item]: Список объектов букетов.
     """
-    return list(Item.objects.all())
\ No newline at end of file
+    return list(Item.objects.filter(shop_id=shop_id()))
+
+
+@sync_to_async
+def save_fsm_state(user_id: int, state: Optional[str], data: Dict[str, Any]) -> None:
+    """
+    Сохраняет состояние FSM пользователя в двоичном виде.
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+        state (Optional[str]): Текущее состояние.
+        data (Dict[str, Any]): Данные состояния.
+    """
+    FSMData.objects.update_or_create(
+        user_id=user_id,
+        shop_id=shop_id(),
+        defaults={'state': state, 'blob': encode_state(data), 'data': None}
+    )
+
+
+@sync_to_async
+def get_fsm_state(user_id: int) -> Optional[Tuple[Optional[str], Dict[str, Any]]]:
+    """
+    Загружает состояние FSM пользователя вместе с букетами одним запросом.
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+
+    Returns:
+        Optional[Tuple[Optional[str], Dict[str, Any]]]: Состояние и его данные
+            или None, если состояние не сохранялось.
+    """
+    fsm_data = FSMData.objects.filter(user_id=user_id, shop_id=shop_id()).first()
+    if not fsm_data:
+        return None
+
+    try:
+        if fsm_data.blob is not None:
+            data = decode_state(fsm_data.blob)
+        elif fsm_data.data:
+            data = decode_legacy_json(fsm_data.data)
+        else:
+            data = {}
+    except CodecError as e:
+        logger.error("Ошибка декодирования состояния %s: %s", user_id, e)
+        data = {}
+
+    ids = item_ids(data)
+    return fsm_data.state, attach_items(data, Item.objects.in_bulk(ids) if ids else {})
@@ -0,0 +1,137 @@
+import logging
+import time
+from datetime import date, datetime
+from typing import Iterable
+
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+
+from bot.models import ArchivedOrder, CourierDelivery, FSMData, Order
+
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("delivered", "canceled")
+
+ARCHIVE_FIELDS = {
+    "id": "id",
+    "status": "status",
+    "user_tg_id": "user__tg_id",
+    "item_id": "item_id",
+    "item_name": "item__name",
+    "item_price": "item__price",
+    "name": "name",
+    "address": "address",
+    "delivery_date": "delivery_date",
+    "delivery_time": "delivery_time",
+    "created_at": "created_at",
+    "completed_at": "completed_at",
+    "processing_time": "processing_time",
+    "paid_at": "paid_at",
+    "assigned_at": "assigned_at",
+    "picked_at": "picked_at",
+    "preparation_time": "preparation_time",
+    "delivery_duration": "delivery_duration",
+    "courier_id": "courier_id",
+    "courier_name": "courier__name",
+    "delivered_at": "delivered_at",
+}
+
+
+def expire_fsm_sessions(cutoff: datetime, batch_size: int, pause: float = 0) -> int:
+    """
+    Удаляет сохраненные состояния FSM, не обновлявшиеся с указанного момента.
+
+    Удаление идет короткими порциями, каждая в своей транзакции, чтобы
+    не блокировать работающего бота.
+
+    Args:
+        cutoff (datetime): Состояния старше этого момента удаляются.
+        batch_size (int): Количество записей в порции.
+        pause (float): Пауза между порциями в секундах.
+
+    Returns:
+        int: Количество удаленных записей.
+    """
+    total = 0
+    while True:
+        expired = FSMData.objects.filter(updated_at__lt=cutoff)
+        ids = list(expired.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return total
+        deleted, _ = expired.filter(id__in=ids).delete()
+        total += deleted
+        time.sleep(pause)
+
+
+def archive_orders(horizon: date, batch_size: int, pause: float = 0) -> int:
+    """
+    Переносит выполненные и отмененные заказы старше горизонта в архив.
+
+    Каждая порция копируется в ArchivedOrder и удаляется из Order в одной
+    транзакции, поэтому при сбое заказ не теряется и не дублируется.
+    Журнал событий заказа остается на месте и доступен по ID архивного
+    заказа.
+
+    Args:
+        horizon (date): Заказы с датой доставки раньше этой даты архивируются.
+        batch_size (int): Количество заказов в порции.
+        pause (float): Пауза между порциями в секундах.
+
+    Returns:
+        int: Количество перенесенных заказов.
+    """
+    delivered_at = CourierDelivery.objects.filter(
+        order=OuterRef("pk"), delivered=True
+    ).order_by("-delivered_at").values("delivered_at")[:1]
+    finished = Order.objects.filter(
+        status__in=FINISHED_STATUSES,
+        delivery_date__lt=horizon
+    )
+
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                finished.order_by("id")
+                .annotate(delivered_at=Subquery(delivered_at))
+                .values(*ARCHIVE_FIELDS.values())[:batch_size]
+            )
+            if not rows:
+                return total
+            ArchivedOrder.objects.bulk_create(
+                [
+                    ArchivedOrder(**{
+                        field: row[lookup]
+                        for field, lookup in ARCHIVE_FIELDS.items()
+                    })
+                    for row in rows
+                ],
+                ignore_conflicts=True
+            )
+            Order.objects.filter(id__in=[row["id"] for row in rows]).delete()
+        total += len(rows)
+        time.sleep(pause)
+
+
+def optimize_tables(tables: Iterable[str], vacuum: bool = False) -> None:
+    """
+    Обновляет статистику планировщика и при необходимости сжимает таблицы.
+
+    Args:
+        tables (Iterable[str]): Имена таблиц.
+        vacuum (bool): Выполнить VACUUM. В SQLite он блокирует всю базу.
+    """
+    tables = list(tables)
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            command = "VACUUM (ANALYZE)" if vacuum else "ANALYZE"
+            for table in tables:
+                cursor.execute(f"{command} {connection.ops.quote_name(table)}")
+        elif connection.vendor == "sqlite":
+            for table in tables:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(table)}")
+            if vacuum:
+                cursor.execute("VACUUM")
+        else:
+            logger.info("Оптимизация таблиц для %s не поддерживается", connection.vendor)
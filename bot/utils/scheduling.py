@@ -0,0 +1,52 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Dict
+
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+
+from bot.utils.metrics import incr
+
+
+class _KeyQueue:
+    """Очередь обновлений одного пользователя"""
+    __slots__ = ("lock", "waiting")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.waiting = 0
+
+
+class OrderedIsolation(BaseEventIsolation):
+    """
+    Обрабатывает обновления одного пользователя строго по очереди.
+
+    Обновления разных пользователей обрабатываются параллельно, но не более
+    max_in_flight одновременно. Ожидание своей очереди не занимает слот,
+    поэтому частые запросы одного пользователя не задерживают остальных.
+    Очередь пользователя удаляется, как только в ней не остается обновлений.
+    """
+
+    def __init__(self, max_in_flight: int):
+        self.queues: Dict[StorageKey, _KeyQueue] = {}
+        self.slots = asyncio.Semaphore(max_in_flight)
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = self.queues[key] = _KeyQueue()
+        elif queue.lock.locked():
+            incr("updates.queued")
+        queue.waiting += 1
+        try:
+            async with queue.lock:
+                async with self.slots:
+                    yield
+        finally:
+            queue.waiting -= 1
+            if not queue.waiting:
+                del self.queues[key]
+
+    async def close(self) -> None:
+        self.queues.clear()
+
@@ -0,0 +1,248 @@
+import asyncio
+import heapq
+import logging
+import re
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from asgiref.sync import sync_to_async
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bot.models import Item
+from bot.utils.composition import composition_index
+from bot.utils.facets import facet_index
+
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r"[0-9a-zа-я]+")
+
+
+class ItemDoc(NamedTuple):
+    """Данные букета, достаточные для ответа на inline-запрос"""
+    id: int
+    name: str
+    description: str
+    structure: str
+    price: str
+    photo: str
+    photo_file_id: str
+    thumbnail: str
+    shop_id: Optional[int] = None
+    category_id: Optional[int] = None
+
+
+def normalize(text: str) -> str:
+    """
+    Приводит текст к нижнему регистру и заменяет «ё» на «е».
+
+    Args:
+        text (str): Исходный текст.
+
+    Returns:
+        str: Нормализованный текст.
+    """
+    return text.lower().replace("ё", "е")
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Разбивает текст на триграммы слов с отступом в начале слова.
+
+    Отступ позволяет находить слова по началу: «роз» совпадает с «розы».
+
+    Args:
+        text (str): Исходный текст.
+
+    Returns:
+        Set[str]: Множество триграмм.
+    """
+    grams = set()
+    for word in WORD_RE.findall(normalize(text)):
+        padded = f"  {word}"
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def item_doc(item: Item) -> ItemDoc:
+    """
+    Собирает данные букета для индекса.
+
+    Args:
+        item (Item): Объект букета.
+
+    Returns:
+        ItemDoc: Данные букета.
+    """
+    photo = item.photo_optimized or item.photo
+    return ItemDoc(
+        id=item.id,
+        name=item.name,
+        description=item.description,
+        structure=item.structure,
+        price=f"{item.price:.2f}",
+        photo=photo.name if photo else "",
+        photo_file_id=item.photo_file_id,
+        thumbnail=item.photo_thumbnail.name if item.photo_thumbnail else "",
+        shop_id=item.shop_id,
+        category_id=item.category_id,
+    )
+
+
+class CatalogIndex:
+    """Инвертированный индекс триграмм по названию, описанию и составу букетов.
+
+    Вместе с ним обновляются индекс цветочного состава composition_index
+    и счетчики категорий и цен facet_index.
+    """
+
+    def __init__(self) -> None:
+        self.docs: Dict[int, ItemDoc] = {}
+        self.postings: Dict[str, Set[int]] = defaultdict(set)
+        self.doc_grams: Dict[int, Set[str]] = {}
+        self.names: Dict[int, str] = {}
+        self.shops: Dict[Optional[int], Set[int]] = defaultdict(set)
+        self.loaded_at: Optional[datetime] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def add(self, doc: ItemDoc) -> None:
+        """
+        Добавляет или заменяет букет в индексе.
+
+        Args:
+            doc (ItemDoc): Данные букета.
+        """
+        self.remove(doc.id)
+        grams = trigrams(f"{doc.name} {doc.description} {doc.structure}")
+        for gram in grams:
+            self.postings[gram].add(doc.id)
+        self.docs[doc.id] = doc
+        self.doc_grams[doc.id] = grams
+        self.names[doc.id] = normalize(doc.name)
+        self.shops[doc.shop_id].add(doc.id)
+        composition_index.add(doc.id, doc.structure)
+        facet_index.add(doc.id, doc.shop_id, doc.category_id, Decimal(doc.price))
+
+    def remove(self, item_id: int) -> None:
+        """
+        Удаляет букет из индекса.
+
+        Args:
+            item_id (int): ID букета.
+        """
+        for gram in self.doc_grams.pop(item_id, ()):
+            ids = self.postings[gram]
+            ids.discard(item_id)
+            if not ids:
+                del self.postings[gram]
+        doc = self.docs.pop(item_id, None)
+        if doc is not None:
+            self.shops[doc.shop_id].discard(item_id)
+        self.names.pop(item_id, None)
+        composition_index.remove(item_id)
+        facet_index.remove(item_id)
+
+    def search(
+        self, query: str, limit: int = 50, shop_id: Optional[int] = None
+    ) -> List[ItemDoc]:
+        """
+        Ищет букеты, все слова запроса в которых встречаются как начала слов.
+
+        Индекс общий для всех магазинов, поэтому результаты ограничиваются
+        букетами одного магазина.
+
+        Args:
+            query (str): Текст запроса.
+            limit (int): Максимальное количество результатов.
+            shop_id (Optional[int]): Магазин; None — магазин по умолчанию.
+
+        Returns:
+            List[ItemDoc]: Найденные букеты, совпадения по названию первыми.
+        """
+        shop_items = self.shops.get(shop_id, set())
+        grams = trigrams(query)
+        if not grams:
+            best = heapq.nsmallest(limit, shop_items, key=self.names.get)
+            return [self.docs[item_id] for item_id in best]
+
+        postings = sorted(
+            (self.postings.get(gram, set()) for gram in grams), key=len
+        )
+        found = shop_items & postings[0]
+        for ids in postings[1:]:
+            found &= ids
+            if not found:
+                return []
+
+        needle = normalize(query.strip())
+        names = self.names
+        best = heapq.nsmallest(
+            limit,
+            found,
+            key=lambda item_id: (needle not in names[item_id], names[item_id])
+        )
+        return [self.docs[item_id] for item_id in best]
+
+    def fetch(self, since: Optional[datetime]) -> Tuple[List[ItemDoc], Set[int]]:
+        """
+        Читает из базы букеты, измененные после указанного момента.
+
+        Args:
+            since (Optional[datetime]): Момент прошлой загрузки или None.
+
+        Returns:
+            Tuple[List[ItemDoc], Set[int]]: Измененные букеты и ID всех букетов.
+        """
+        items = Item.objects.all()
+        if since is not None:
+            items = items.filter(updated_at__gte=since)
+        docs = [item_doc(item) for item in items]
+        return docs, set(Item.objects.values_list("id", flat=True))
+
+    async def refresh(self) -> None:
+        """Применяет изменения каталога, сделанные после последней загрузки."""
+        started = datetime.now().astimezone()
+        docs, existing = await sync_to_async(self.fetch)(self.loaded_at)
+        for doc in docs:
+            self.add(doc)
+        for item_id in set(self.docs) - existing:
+            self.remove(item_id)
+        facet_index.rebalance()
+        self.loaded_at = started
+
+
+catalog_index = CatalogIndex()
+
+
+@receiver(post_save, sender=Item)
+def index_item(sender, instance, **kwargs):
+    """Обновляет букет в загруженном поисковом индексе"""
+    if catalog_index.is_loaded:
+        catalog_index.add(item_doc(instance))
+
+
+@receiver(post_delete, sender=Item)
+def unindex_item(sender, instance, **kwargs):
+    """Удаляет букет из загруженного поискового индекса"""
+    catalog_index.remove(instance.id)
+
+
+async def run_refresher(interval: float) -> None:
+    """
+    Периодически подтягивает в индекс изменения каталога из базы данных.
+
+    Args:
+        interval (float): Пауза между обновлениями в секундах.
+    """
+    while True:
+        try:
+            await catalog_index.refresh()
+        except Exception as e:
+            logger.error("Ошибка обновления поискового индекса: %s", e)
+        await asyncio.sleep(interval)
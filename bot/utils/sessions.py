@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import os
+import struct
+import time
+import zlib
+from dataclasses import asdict
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from asgiref.sync import sync_to_async
+
+from bot.models import Item
+from bot.utils.fsm_codec import (
+    CodecError,
+    attach_items,
+    decode_state,
+    encode_state,
+    item_ids
+)
+
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"FSNP"
+VERSION = 1
+_LENGTH = struct.Struct("<I")
+
+Session = Tuple[StorageKey, Optional[str], dict]
+
+
+def _frame(blob: bytes) -> bytes:
+    return _LENGTH.pack(len(blob)) + blob
+
+
+def encode_snapshot(sessions: Iterable[Session]) -> Tuple[bytes, int]:
+    """
+    Кодирует состояния пользователей в один сжатый снимок.
+
+    Каждая сессия хранится как ключ хранилища и данные состояния в формате
+    fsm_codec, поэтому списки букетов занимают по несколько байт на букет.
+
+    Args:
+        sessions (Iterable[Session]): Ключ, состояние и данные каждой сессии.
+
+    Returns:
+        Tuple[bytes, int]: Снимок и количество сохраненных сессий.
+    """
+    body = bytearray()
+    count = 0
+    for key, state, data in sessions:
+        if state is None and not data:
+            continue
+        try:
+            encoded = encode_state(data)
+        except CodecError as e:
+            logger.warning("Сессия %s не сохранена: %s", key.user_id, e)
+            continue
+        body += _frame(encode_state({**asdict(key), "state": state}))
+        body += _frame(encoded)
+        count += 1
+    return MAGIC + bytes((VERSION,)) + zlib.compress(body, 6), count
+
+
+def _frames(body: bytes) -> Iterator[bytes]:
+    position = 0
+    while position < len(body):
+        (length,) = _LENGTH.unpack_from(body, position)
+        position += _LENGTH.size
+        yield body[position:position + length]
+        position += length
+
+
+def decode_snapshot(raw: bytes) -> List[Session]:
+    """
+    Декодирует снимок состояний.
+
+    Поврежденная запись сессии пропускается, остальные восстанавливаются.
+
+    Args:
+        raw (bytes): Снимок.
+
+    Returns:
+        List[Session]: Ключ, состояние и данные каждой сессии; списки
+        букетов — как ItemIds.
+    """
+    if raw[:len(MAGIC)] != MAGIC or raw[len(MAGIC)] != VERSION:
+        raise CodecError("Неизвестный формат снимка сессий")
+    try:
+        body = zlib.decompress(raw[len(MAGIC) + 1:])
+    except zlib.error as e:
+        raise CodecError(f"Поврежденный снимок сессий: {e}") from e
+
+    sessions = []
+    frames = _frames(body)
+    for meta, data in zip(frames, frames):
+        try:
+            meta = decode_state(meta)
+            state = meta.pop("state")
+            sessions.append((StorageKey(**meta), state, decode_state(data)))
+        except (CodecError, KeyError, TypeError) as e:
+            logger.warning("Сессия из снимка пропущена: %r", e)
+    return sessions
+
+
+def write_snapshot(sessions: List[Session], path: Path) -> None:
+    """
+    Записывает снимок сессий в файл.
+
+    Файл заменяется атомарно, поэтому сбой во время записи не портит
+    предыдущий снимок.
+
+    Args:
+        sessions (List[Session]): Ключ, состояние и данные каждой сессии.
+        path (Path): Путь к файлу снимка.
+    """
+    started = time.perf_counter()
+    raw, count = encode_snapshot(sessions)
+    temporary = Path(f"{path}.tmp")
+    temporary.write_bytes(raw)
+    os.replace(temporary, path)
+    logger.info(
+        "Сохранено сессий: %s (%s байт) за %.1f мс",
+        count, len(raw), (time.perf_counter() - started) * 1000
+    )
+
+
+async def save_snapshot(storage: BaseStorage, path: Path) -> None:
+    """
+    Сохраняет сессии хранилища в файл, не блокируя обработку обновлений.
+
+    Ссылки на данные сессий собираются в цикле событий, а кодирование и
+    запись идут в отдельном потоке. Хранилище заменяет словарь данных при
+    каждом изменении, поэтому собранные данные не меняются во время записи.
+
+    Args:
+        storage (BaseStorage): Хранилище FSM диспетчера.
+        path (Path): Путь к файлу снимка.
+    """
+    if not isinstance(storage, MemoryStorage):
+        return
+    sessions = [
+        (key, record.state, record.data)
+        for key, record in storage.storage.items()
+    ]
+    await asyncio.to_thread(write_snapshot, sessions, path)
+
+
+async def restore_snapshot(storage: BaseStorage, path: Path, max_age: float) -> int:
+    """
+    Загружает сессии из снимка в хранилище перед запуском бота.
+
+    Букеты из всех сессий загружаются одним запросом. Снимок старше
+    max_age секунд не используется.
+
+    Args:
+        storage (BaseStorage): Хранилище FSM диспетчера.
+        path (Path): Путь к файлу снимка.
+        max_age (float): Максимальный возраст снимка в секундах.
+
+    Returns:
+        int: Количество восстановленных сессий.
+    """
+    if not isinstance(storage, MemoryStorage) or not path.exists():
+        return 0
+    if time.time() - path.stat().st_mtime > max_age:
+        logger.info("Снимок сессий %s устарел и не используется", path)
+        return 0
+
+    started = time.perf_counter()
+    try:
+        sessions = decode_snapshot(path.read_bytes())
+    except (CodecError, IndexError, TypeError, struct.error) as e:
+        logger.error("Снимок сессий не загружен: %s", e)
+        return 0
+
+    ids = {item_id for _, _, data in sessions for item_id in item_ids(data)}
+    items = await sync_to_async(Item.objects.in_bulk)(list(ids)) if ids else {}
+    for key, state, data in sessions:
+        record = storage.storage[key]
+        record.state = state
+        record.data = attach_items(data, items)
+
+    logger.info(
+        "Восстановлено сессий: %s за %.1f мс",
+        len(sessions), (time.perf_counter() - started) * 1000
+    )
+    return len(sessions)
+
+
+async def run_snapshotter(storage: BaseStorage, path: Path, interval: float) -> None:
+    """
+    Периодически сохраняет снимок сессий на случай аварийной остановки.
+
+    Args:
+        storage (BaseStorage): Хранилище FSM диспетчера.
+        path (Path): Путь к файлу снимка.
+        interval (float): Пауза между снимками в секундах.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await save_snapshot(storage, path)
+        except Exception as e:
+            logger.error("Ошибка сохранения снимка сессий: %s", e)
@@ -0,0 +1,210 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, Type
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Max, Model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bot.models import Courier, Florist, FloristCallback, Order
+
+
+logger = logging.getLogger(__name__)
+
+
+def courier_loads() -> Dict[int, int]:
+    """Возвращает количество заказов в работе у каждого курьера."""
+    rows = (
+        Order.objects.filter(status="in_work", courier__isnull=False)
+        .values_list("courier_id")
+        .annotate(total=Count("id"))
+    )
+    return dict(rows)
+
+
+def florist_loads() -> Dict[int, int]:
+    """Возвращает количество необработанных заявок на звонок у каждого флориста."""
+    rows = (
+        FloristCallback.objects.filter(
+            needs_callback=True, callback_made=False, florist__isnull=False
+        )
+        .values_list("florist_id")
+        .annotate(total=Count("id"))
+    )
+    return dict(rows)
+
+
+class StaffRoster:
+    """
+    Список активных сотрудников одной роли в памяти процесса.
+
+    Сотрудники и их загрузка читаются из базы один раз, а затем изменения
+    в этом процессе приходят через сигналы. Изменения из других процессов
+    (например, из админки) замечаются по версии таблицы — количеству строк
+    и времени последнего изменения, — которая проверяется не чаще чем раз
+    в STAFF_REFRESH_INTERVAL секунд.
+    """
+
+    def __init__(self, model: Type[Model], loads: Callable[[], Dict[int, int]]):
+        self.model = model
+        self.loads = loads
+        self.members: Dict[int, Model] = {}
+        self.by_tg_id: Dict[int, Model] = {}
+        self.load: Dict[int, int] = {}
+        self.version: Optional[Tuple] = None
+        self.checked = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.version is not None
+
+    def current_version(self) -> Tuple:
+        """Читает версию таблицы сотрудников одним запросом."""
+        stats = self.model.objects.aggregate(count=Count("id"), changed=Max("updated_at"))
+        return stats["count"], stats["changed"]
+
+    def reload(self) -> None:
+        """Загружает активных сотрудников и их загрузку из базы данных."""
+        version = self.current_version()
+        members = {
+            member.id: member
+            for member in self.model.objects.filter(status="active").order_by("id")
+        }
+        loads = self.loads()
+        with self.lock:
+            self.members = members
+            self.by_tg_id = {member.tg_id: member for member in members.values()}
+            self.load = {member_id: loads.get(member_id, 0) for member_id in members}
+            self.version = version
+            self.checked = time.monotonic()
+        logger.info("Загружено сотрудников (%s): %s", self.model.__name__, len(members))
+
+    def ensure(self) -> None:
+        """Загружает список или перечитывает его, если версия в базе изменилась."""
+        if self.is_loaded and time.monotonic() - self.checked < settings.STAFF_REFRESH_INTERVAL:
+            return
+        if not self.is_loaded or self.current_version() != self.version:
+            self.reload()
+        else:
+            self.checked = time.monotonic()
+
+    def get(self, member_id: int) -> Optional[Model]:
+        """
+        Возвращает активного сотрудника по ID.
+
+        Args:
+            member_id (int): ID сотрудника.
+
+        Returns:
+            Optional[Model]: Сотрудник или None, если он не активен.
+        """
+        self.ensure()
+        return self.members.get(member_id)
+
+    def get_by_tg_id(self, tg_id: int) -> Optional[Model]:
+        """
+        Возвращает активного сотрудника по Telegram ID.
+
+        Args:
+            tg_id (int): Telegram ID.
+
+        Returns:
+            Optional[Model]: Сотрудник или None.
+        """
+        self.ensure()
+        return self.by_tg_id.get(tg_id)
+
+    def pick(self, shop_id: Optional[int] = None) -> Optional[Model]:
+        """
+        Выбирает наименее загруженного активного сотрудника и увеличивает его загрузку.
+
+        Args:
+            shop_id (Optional[int]): Магазин; None — магазин по умолчанию.
+
+        Returns:
+            Optional[Model]: Сотрудник или None, если активных нет.
+        """
+        self.ensure()
+        with self.lock:
+            candidates = [
+                member_id for member_id, member in self.members.items()
+                if member.shop_id == shop_id
+            ]
+            if not candidates:
+                return None
+            member_id = min(candidates, key=lambda key: (self.load[key], key))
+            self.load[member_id] += 1
+            return self.members[member_id]
+
+    def release(self, member_id: Optional[int]) -> None:
+        """
+        Уменьшает загрузку сотрудника после завершения задачи.
+
+        Args:
+            member_id (Optional[int]): ID сотрудника.
+        """
+        with self.lock:
+            if self.load.get(member_id):
+                self.load[member_id] -= 1
+
+    def update(self, member: Model) -> None:
+        """
+        Применяет сохраненные изменения сотрудника к загруженному списку.
+
+        Args:
+            member (Model): Сотрудник.
+        """
+        with self.lock:
+            previous = self.members.pop(member.id, None)
+            if previous is not None:
+                self.by_tg_id.pop(previous.tg_id, None)
+            if member.status == "active":
+                self.members[member.id] = member
+                self.by_tg_id[member.tg_id] = member
+                self.load.setdefault(member.id, 0)
+            else:
+                self.load.pop(member.id, None)
+
+    def forget(self, member: Model) -> None:
+        """
+        Удаляет сотрудника из загруженного списка.
+
+        Args:
+            member (Model): Удаленный сотрудник.
+        """
+        with self.lock:
+            self.members.pop(member.id, None)
+            self.by_tg_id.pop(member.tg_id, None)
+            self.load.pop(member.id, None)
+
+
+couriers = StaffRoster(Courier, courier_loads)
+florists = StaffRoster(Florist, florist_loads)
+
+
+async def load_staff() -> None:
+    """Загружает списки курьеров и флористов при запуске бота."""
+    await sync_to_async(couriers.reload)()
+    await sync_to_async(florists.reload)()
+
+
+@receiver(post_save, sender=Courier)
+@receiver(post_save, sender=Florist)
+def staff_saved(sender, instance, **kwargs):
+    """Обновляет сотрудника в загруженном списке"""
+    roster = couriers if sender is Courier else florists
+    if roster.is_loaded:
+        roster.update(instance)
+
+
+@receiver(post_delete, sender=Courier)
+@receiver(post_delete, sender=Florist)
+def staff_deleted(sender, instance, **kwargs):
+    """Удаляет сотрудника из загруженного списка"""
+    roster = couriers if sender is Courier else florists
+    if roster.is_loaded:
+        roster.forget(instance)
@@ -0,0 +1,120 @@
+import logging
+import time
+from typing import Dict, Iterable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# manage.py импортирует модуль первым, поэтому это время запуска процесса
+PROCESS_STARTED = time.perf_counter()
+
+SERVICE_METHODS = {"getUpdates", "getMe", "deleteWebhook", "close", "logOut"}
+
+
+class StartupTimer:
+    """Замеряет длительность этапов запуска бота"""
+
+    def __init__(self, started: float = PROCESS_STARTED):
+        self.started = started
+        self.last = started
+        self.phases: Dict[str, float] = {}
+
+    def mark(self, name: str) -> float:
+        """
+        Завершает этап запуска и запоминает его длительность.
+
+        Args:
+            name (str): Название этапа.
+
+        Returns:
+            float: Длительность этапа в секундах.
+        """
+        now = time.perf_counter()
+        self.phases[name] = now - self.last
+        self.last = now
+        return self.phases[name]
+
+    @property
+    def total(self) -> float:
+        """Время от запуска процесса до последнего этапа в секундах."""
+        return self.last - self.started
+
+    def log(self, title: str) -> None:
+        """
+        Записывает длительность этапов в лог.
+
+        Args:
+            title (str): Заголовок записи.
+        """
+        logger.info(
+            "%s за %.0f мс: %s",
+            title,
+            self.total * 1000,
+            ", ".join(f"{name} {value * 1000:.0f} мс" for name, value in self.phases.items())
+        )
+
+
+def first_calls_middleware(timer: StartupTimer):
+    """
+    Создает middleware сессии, отмечающее первый getUpdates и первый ответ.
+
+    aiogram импортируется здесь, чтобы manage.py мог импортировать модуль
+    до настройки Django без лишних затрат.
+
+    Args:
+        timer (StartupTimer): Таймер запуска.
+
+    Returns:
+        BaseRequestMiddleware: Middleware для bot.session.
+    """
+    from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+
+    class FirstCalls(BaseRequestMiddleware):
+        """Отмечает первый опрос обновлений и первый ответ пользователю"""
+
+        def __init__(self):
+            self.polled = False
+            self.replied = False
+
+        async def __call__(self, make_request, bot, method):
+            response = await make_request(bot, method)
+            name = method.__api_method__
+            if not self.polled and name == "getUpdates":
+                self.polled = True
+                timer.mark("first_get_updates")
+            elif not self.replied and name not in SERVICE_METHODS:
+                self.replied = True
+                timer.mark("first_reply")
+                timer.log("Первый ответ после запуска")
+            return response
+
+    return FirstCalls()
+
+
+async def preload(timer: Optional[StartupTimer] = None, shops: Iterable = (None,)) -> None:
+    """
+    Параллельно прогревает поисковый индекс, клавиатуры категорий и file_id фото.
+
+    Args:
+        timer (Optional[StartupTimer]): Таймер запуска.
+        shops (Iterable): Магазины, клавиатуры которых нужно построить;
+            None — магазин по умолчанию.
+    """
+    import asyncio
+
+    import bot.keyboards.keyboards as kb
+    from bot.utils.media import load_file_ids
+    from bot.utils.search import catalog_index
+    from bot.utils.tenancy import using
+
+    async def categories(shop) -> None:
+        with using(shop):
+            await kb.categories()
+
+    await asyncio.gather(
+        catalog_index.refresh(),
+        load_file_ids(),
+        *(categories(shop) for shop in shops)
+    )
+    if timer:
+        timer.mark("preload")
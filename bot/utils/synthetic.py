@@ -0,0 +1,335 @@
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from bot.models import (
+    Category,
+    Courier,
+    CourierAssignment,
+    CourierDelivery,
+    Florist,
+    FloristCallback,
+    Item,
+    Order,
+    OrderEvent,
+    User
+)
+from bot.utils.composition import FLOWERS
+
+
+# Telegram ID синтетических пользователей и сотрудников начинаются отсюда
+SYNTHETIC_TG_ID = 10 ** 12
+SYNTHETIC_PREFIX = "synthetic-"
+
+CATEGORIES = ["День рождения", "Свадьба", "Юбилей", "8 Марта", "Без повода"]
+TITLES = [
+    "Нежность", "Весна", "Рассвет", "Облако", "Улыбка", "Праздник",
+    "Мечта", "Лето", "Шарм", "Признание", "Вдохновение", "Комплимент",
+]
+NAMES = [
+    "Анна", "Мария", "Елена", "Ольга", "Наталья", "Ирина", "Татьяна",
+    "Светлана", "Дмитрий", "Алексей", "Сергей", "Андрей", "Михаил",
+]
+STREETS = [
+    "Ленина", "Мира", "Гагарина", "Садовая", "Пушкина", "Советская",
+    "Лесная", "Школьная", "Новая", "Цветочная",
+]
+FLOWER_TITLES = [title for title, _ in FLOWERS.values()]
+# Доли заказов по статусам: большая часть заказов уже доставлена
+STATUSES = {"delivered": 0.8, "in_work": 0.1, "new": 0.05, "canceled": 0.05}
+
+
+@contextmanager
+def keep_dates(*fields) -> Iterator[None]:
+    """Отключает auto_now_add, чтобы записать заданные даты создания."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def random_price(rng: random.Random) -> Decimal:
+    """Возвращает цену букета, кратную 50 рублям, с длинным хвостом дорогих букетов."""
+    price = min(max(rng.lognormvariate(7.5, 0.6), 300), 15000)
+    return Decimal(round(price / 50) * 50)
+
+
+def random_structure(rng: random.Random) -> str:
+    """Возвращает цветочный состав букета из одного-четырех цветов справочника."""
+    flowers = rng.sample(FLOWER_TITLES, rng.randint(1, 4))
+    return ", ".join(f"{title} {rng.choice((3, 5, 7, 9, 11, 15))} шт" for title in flowers)
+
+
+def seed_catalog(size: int, rng: random.Random, batch_size: int) -> List[int]:
+    """
+    Создает категории и букеты синтетического каталога.
+
+    Args:
+        size (int): Количество букетов.
+        rng (random.Random): Генератор случайных чисел.
+        batch_size (int): Количество строк в одной вставке.
+
+    Returns:
+        List[int]: ID созданных букетов.
+    """
+    categories = [
+        Category.objects.get_or_create(name=name)[0].id for name in CATEGORIES
+    ]
+    item_ids = []
+    for start in range(0, size, batch_size):
+        batch = []
+        for number in range(start, min(start + batch_size, size)):
+            structure = random_structure(rng)
+            batch.append(Item(
+                external_id=f"{SYNTHETIC_PREFIX}{number}",
+                name=f"{rng.choice(TITLES)} №{number + 1}",
+                description=f"Букет: {structure.lower()}"[:120],
+                price=random_price(rng),
+                category_id=rng.choice(categories),
+                structure=structure[:100],
+                photo="bouquets/synthetic.jpg"
+            ))
+        item_ids += [item.id for item in Item.objects.bulk_create(batch)]
+    return item_ids
+
+
+def seed_people(users: int, couriers: int, florists: int) -> Dict[str, List[int]]:
+    """
+    Создает синтетических пользователей, курьеров и флористов.
+
+    Args:
+        users (int): Количество пользователей.
+        couriers (int): Количество курьеров.
+        florists (int): Количество флористов.
+
+    Returns:
+        Dict[str, List[int]]: ID созданных пользователей, курьеров и флористов.
+    """
+    return {
+        "users": [
+            user.id for user in User.objects.bulk_create(
+                User(tg_id=SYNTHETIC_TG_ID + number) for number in range(users)
+            )
+        ],
+        "couriers": [
+            courier.id for courier in Courier.objects.bulk_create(
+                Courier(name=f"Курьер {number + 1}", tg_id=SYNTHETIC_TG_ID + number)
+                for number in range(couriers)
+            )
+        ],
+        "florists": [
+            florist.id for florist in Florist.objects.bulk_create(
+                Florist(name=f"Флорист {number + 1}", tg_id=SYNTHETIC_TG_ID + number)
+                for number in range(florists)
+            )
+        ],
+    }
+
+
+def random_order(
+    rng: random.Random,
+    now: datetime,
+    user_id: int,
+    item_id: int,
+    courier_id: Optional[int]
+) -> Order:
+    """Возвращает заказ с правдоподобными временем и длительностями этапов."""
+    status = rng.choices(list(STATUSES), weights=list(STATUSES.values()))[0]
+    created_at = now - timedelta(seconds=rng.uniform(0, 365 * 86400))
+    paid_at = created_at + timedelta(seconds=rng.uniform(30, 300))
+    order = Order(
+        status=status,
+        user_id=user_id,
+        item_id=item_id,
+        name=rng.choice(NAMES),
+        address=f"ул. {rng.choice(STREETS)}, д. {rng.randint(1, 120)}",
+        delivery_date=(created_at + timedelta(days=rng.randint(0, 3))).date(),
+        delivery_time=time(rng.randint(9, 21), rng.choice((0, 30))),
+        created_at=created_at,
+        paid_at=paid_at,
+        payment_charge_id=f"{SYNTHETIC_PREFIX}{uuid.UUID(int=rng.getrandbits(128)).hex}"
+    )
+    if status == "new" or courier_id is None:
+        order.status = "new"
+        return order
+
+    order.courier_id = courier_id
+    order.assigned_at = paid_at
+    if status == "canceled":
+        order.completed_at = paid_at + timedelta(minutes=rng.uniform(5, 600))
+        order.processing_time = order.completed_at - created_at
+        return order
+    if status == "in_work" and rng.random() < 0.5:
+        return order
+
+    order.picked_at = paid_at + timedelta(minutes=rng.uniform(15, 90))
+    order.preparation_time = order.picked_at - paid_at
+    if status == "delivered":
+        order.completed_at = order.picked_at + timedelta(minutes=rng.uniform(20, 120))
+        order.delivery_duration = order.completed_at - order.picked_at
+        order.processing_time = order.completed_at - created_at
+    return order
+
+
+def seed_orders(
+    count: int,
+    rng: random.Random,
+    batch_size: int,
+    item_ids: List[int],
+    people: Dict[str, List[int]],
+    callback_share: float = 0.1
+) -> Dict[str, int]:
+    """
+    Создает заказы вместе с назначениями, доставками и звонками флористов.
+
+    Заказы вставляются порциями без сигналов моделей, поэтому журнал
+    событий не заполняется; вычисляемые поля заказа заполняются сразу.
+
+    Args:
+        count (int): Количество заказов.
+        rng (random.Random): Генератор случайных чисел.
+        batch_size (int): Количество заказов в одной транзакции.
+        item_ids (List[int]): ID букетов.
+        people (Dict[str, List[int]]): Результат seed_people.
+        callback_share (float): Доля заказов с заявкой на звонок флориста.
+
+    Returns:
+        Dict[str, int]: Количество созданных строк по таблицам.
+    """
+    now = timezone.now()
+    couriers = people["couriers"] or [None]
+    florists = people["florists"]
+    created = {"orders": 0, "assignments": 0, "deliveries": 0, "callbacks": 0}
+    with keep_dates(
+        Order._meta.get_field("created_at"),
+        CourierAssignment._meta.get_field("assigned_at"),
+        FloristCallback._meta.get_field("created_at")
+    ):
+        for start in range(0, count, batch_size):
+            orders = [
+                random_order(
+                    rng, now, rng.choice(people["users"]), rng.choice(item_ids), rng.choice(couriers)
+                )
+                for _ in range(min(batch_size, count - start))
+            ]
+            with transaction.atomic():
+                orders = Order.objects.bulk_create(orders)
+                assigned = [order for order in orders if order.courier_id]
+                CourierAssignment.objects.bulk_create(
+                    CourierAssignment(
+                        courier_id=order.courier_id,
+                        order=order,
+                        assigned_at=order.assigned_at,
+                        delivered_at=order.completed_at if order.status == "delivered" else None,
+                        delivery_time=order.delivery_duration
+                    )
+                    for order in assigned
+                )
+                CourierDelivery.objects.bulk_create(
+                    CourierDelivery(
+                        courier_id=order.courier_id,
+                        order=order,
+                        delivered=order.status == "delivered",
+                        delivered_at=order.completed_at
+                    )
+                    for order in assigned
+                )
+                callbacks = [
+                    FloristCallback(
+                        florist_id=rng.choice(florists),
+                        order=order,
+                        callback_made=order.status != "new",
+                        created_at=order.created_at,
+                        phone_number=f"+79{rng.randint(0, 10 ** 9 - 1):09d}"
+                    )
+                    for order in orders
+                    if florists and rng.random() < callback_share
+                ]
+                FloristCallback.objects.bulk_create(callbacks)
+            created["orders"] += len(orders)
+            created["assignments"] += len(assigned)
+            created["deliveries"] += len(assigned)
+            created["callbacks"] += len(callbacks)
+    return created
+
+
+def seed(
+    items: int,
+    orders: int,
+    users: int,
+    couriers: int,
+    florists: int,
+    batch_size: int = 5000,
+    random_seed: int = 1
+) -> Dict[str, int]:
+    """
+    Заполняет базу синтетическим каталогом, сотрудниками и заказами.
+
+    Args:
+        items (int): Количество букетов.
+        orders (int): Количество заказов.
+        users (int): Количество пользователей.
+        couriers (int): Количество курьеров.
+        florists (int): Количество флористов.
+        batch_size (int): Количество строк в одной вставке.
+        random_seed (int): Зерно генератора; одно зерно дает одни данные.
+
+    Returns:
+        Dict[str, int]: Количество созданных строк по таблицам.
+    """
+    rng = random.Random(random_seed)
+    item_ids = seed_catalog(items, rng, batch_size)
+    people = seed_people(users, couriers, florists)
+    created = seed_orders(orders, rng, batch_size, item_ids, people)
+    created.update(
+        items=len(item_ids),
+        users=len(people["users"]),
+        couriers=len(people["couriers"]),
+        florists=len(people["florists"])
+    )
+    return created
+
+
+def has_synthetic() -> bool:
+    """Проверяет, есть ли в базе синтетические данные."""
+    return User.objects.filter(tg_id__gte=SYNTHETIC_TG_ID).exists() or Item.objects.filter(
+        external_id__startswith=SYNTHETIC_PREFIX
+    ).exists()
+
+
+def clear(batch_size: int = 5000) -> int:
+    """
+    Удаляет синтетические данные порциями.
+
+    Args:
+        batch_size (int): Количество заказов в одной транзакции.
+
+    Returns:
+        int: Количество удаленных заказов.
+    """
+    orders = Order.objects.filter(payment_charge_id__startswith=SYNTHETIC_PREFIX)
+    deleted = 0
+    while True:
+        ids = list(orders.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            # Журнал не удаляется вместе с заказом, см. OrderEvent.order
+            OrderEvent.objects.filter(order_id__in=ids).delete()
+            Order.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+
+    Item.objects.filter(external_id__startswith=SYNTHETIC_PREFIX).delete()
+    User.objects.filter(tg_id__gte=SYNTHETIC_TG_ID).delete()
+    Courier.objects.filter(tg_id__gte=SYNTHETIC_TG_ID).delete()
+    Florist.objects.filter(tg_id__gte=SYNTHETIC_TG_ID).delete()
+    return deleted
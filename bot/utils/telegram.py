@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, Optional
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType
+)
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import (
+    ClientDecodeError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError
+)
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from django.conf import settings
+
+from bot.utils.metrics import ApiCallCounter, incr
+
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE = 0.2
+UPLOAD_METHODS = {
+    "sendPhoto",
+    "sendDocument",
+    "sendMediaGroup",
+    "editMessageMedia",
+}
+# Повтор этих запросов не создает дублей в чате
+IDEMPOTENT_PREFIXES = ("get", "answer", "edit", "delete", "set")
+# Ошибки соединения, при которых запрос точно не дошел до Telegram
+CONNECT_ERRORS = ("ClientConnectorError", "ClientConnectorDNSError")
+TRANSIENT_ERRORS = (
+    TelegramRetryAfter,
+    TelegramServerError,
+    TelegramNetworkError,
+    ClientDecodeError
+)
+
+
+class TunedSession(AiohttpSession):
+    """
+    HTTP-сессия Bot API с настраиваемым пулом соединений и таймаутами.
+
+    Таймаут запроса выбирается по методу, если вызывающий код не указал
+    его явно: загрузка файлов получает больше времени, остальные запросы
+    укладываются в короткий общий таймаут.
+    """
+
+    def __init__(
+        self,
+        pool_size: int,
+        keepalive: float,
+        dns_ttl: int,
+        timeout: float,
+        timeouts: Dict[str, float],
+        **kwargs
+    ):
+        super().__init__(limit=pool_size, timeout=timeout, **kwargs)
+        self._connector_init.update(ttl_dns_cache=dns_ttl, keepalive_timeout=keepalive)
+        self.timeouts = timeouts
+
+    async def make_request(
+        self,
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+        timeout: Optional[int] = None
+    ) -> TelegramType:
+        if timeout is None:
+            timeout = self.timeouts.get(method.__api_method__, self.timeout)
+        return await super().make_request(bot, method, timeout)
+
+
+def backoff(attempt: int, cap: float) -> float:
+    """
+    Возвращает случайную паузу перед повтором запроса.
+
+    Пауза выбирается равномерно от нуля до экспоненциально растущей
+    границы, чтобы повторы одновременно упавших запросов не совпадали.
+
+    Args:
+        attempt (int): Номер повтора, начиная с нуля.
+        cap (float): Максимальная пауза в секундах.
+
+    Returns:
+        float: Пауза в секундах.
+    """
+    return random.uniform(0, min(cap, BACKOFF_BASE * 2 ** attempt))
+
+
+class RetryPolicy(BaseRequestMiddleware):
+    """
+    Повторяет запросы к Bot API после временных ошибок.
+
+    Ограничение частоты повторяется для всех методов: запрос не выполнен.
+    Ответы 5xx, нечитаемые ответы, сетевые ошибки и таймауты повторяются
+    только для методов без побочных эффектов в чате: Telegram мог успеть
+    выполнить запрос, и повторная отправка дала бы дубль сообщения или
+    счета. Отправка повторяется, только если соединение не было
+    установлено. Опрос обновлений не повторяется: диспетчер делает это сам.
+    """
+
+    def __init__(self, retries: int, backoff_max: float):
+        self.retries = retries
+        self.backoff_max = backoff_max
+
+    def is_retryable(self, method: TelegramMethod, error: Exception) -> bool:
+        """
+        Проверяет, можно ли повторить запрос после ошибки.
+
+        Args:
+            method (TelegramMethod): Запрос к Bot API.
+            error (Exception): Ошибка запроса.
+
+        Returns:
+            bool: True, если повтор безопасен.
+        """
+        name = method.__api_method__
+        if name == "getUpdates":
+            return False
+        if isinstance(error, TelegramRetryAfter):
+            return error.retry_after <= self.backoff_max
+        if name.startswith(IDEMPOTENT_PREFIXES):
+            return True
+        return isinstance(error, TelegramNetworkError) and error.message.startswith(CONNECT_ERRORS)
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        started = time.perf_counter()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    return await make_request(bot, method)
+                except TRANSIENT_ERRORS as e:
+                    if attempt >= self.retries or not self.is_retryable(method, e):
+                        incr("api.failed")
+                        raise
+                    if isinstance(e, TelegramRetryAfter):
+                        delay = e.retry_after
+                    else:
+                        delay = backoff(attempt, self.backoff_max)
+                    attempt += 1
+                    incr("api.retries")
+                    incr(f"api.retries.{method.__api_method__}")
+                    logger.warning(
+                        "Повтор %s через %.2f с (попытка %s): %s",
+                        method.__api_method__, delay, attempt, e
+                    )
+                    await asyncio.sleep(delay)
+        finally:
+            incr("api.time_ms", round((time.perf_counter() - started) * 1000))
+
+
+def create_session(base_url: Optional[str] = None) -> TunedSession:
+    """
+    Создает HTTP-сессию бота с настройками из settings.
+
+    Args:
+        base_url (Optional[str]): Адрес сервера Bot API вместо
+            api.telegram.org, например локального тестового сервера.
+
+    Returns:
+        TunedSession: Сессия с подсчетом вызовов и повтором запросов.
+    """
+    kwargs = {"api": TelegramAPIServer.from_base(base_url)} if base_url else {}
+    session = TunedSession(
+        pool_size=settings.TELEGRAM_POOL_SIZE,
+        keepalive=settings.TELEGRAM_KEEPALIVE,
+        dns_ttl=settings.TELEGRAM_DNS_TTL,
+        timeout=settings.TELEGRAM_TIMEOUT,
+        timeouts=dict.fromkeys(UPLOAD_METHODS, settings.TELEGRAM_UPLOAD_TIMEOUT),
+        **kwargs
+    )
+    session.middleware(ApiCallCounter())
+    session.middleware(RetryPolicy(settings.TELEGRAM_RETRIES, settings.TELEGRAM_BACKOFF_MAX))
+    return session
@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.types import TelegramObject
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from bot.models import Shop
+
+
+# Магазин обрабатываемого обновления; None — магазин по умолчанию с
+# токеном TG_BOT_TOKEN, которому принадлежат записи без магазина
+current_shop: ContextVar[Optional[Shop]] = ContextVar("current_shop", default=None)
+
+
+def shop_id() -> Optional[int]:
+    """
+    Возвращает ID магазина обрабатываемого обновления.
+
+    Returns:
+        Optional[int]: ID магазина или None для магазина по умолчанию.
+    """
+    shop = current_shop.get()
+    return shop.id if shop else None
+
+
+def payment_token() -> str:
+    """
+    Возвращает токен платежей текущего магазина.
+
+    Returns:
+        str: Токен магазина или общий PAY_TG_TOKEN.
+    """
+    shop = current_shop.get()
+    return (shop.payment_token if shop else "") or settings.PAY_TG_TOKEN
+
+
+@contextmanager
+def using(shop: Optional[Shop]) -> Iterator[None]:
+    """Делает магазин текущим внутри блока, например для прогрева кэшей."""
+    token = current_shop.set(shop)
+    try:
+        yield
+    finally:
+        current_shop.reset(token)
+
+
+@sync_to_async
+def active_shops() -> List[Shop]:
+    """
+    Возвращает работающие магазины.
+
+    Returns:
+        List[Shop]: Магазины в порядке создания.
+    """
+    return list(Shop.objects.filter(is_active=True).order_by("id"))
+
+
+class TenantMiddleware(BaseMiddleware):
+    """
+    Определяет магазин обновления по боту, получившему его.
+
+    Магазин доступен обработчикам через current_shop, в том числе в
+    функциях, вызванных через sync_to_async, которые копируют контекст.
+    """
+
+    def __init__(self, shops: Dict[int, Optional[Shop]]):
+        self.shops = shops
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        bot: Bot = data["bot"]
+        with using(self.shops.get(bot.id)):
+            return await handler(event, data)
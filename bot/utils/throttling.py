@@ -0,0 +1,145 @@
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Set, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from bot.utils.metrics import incr
+
+
+logger = logging.getLogger(__name__)
+
+PRUNE_EVERY = 1000
+
+
+class TokenBucket:
+    """Запас запросов пользователя, пополняемый с постоянной скоростью"""
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class FloodControl(BaseMiddleware):
+    """
+    Ограничивает частоту запросов пользователя и отбрасывает повторные нажатия.
+
+    Повторное нажатие той же кнопки в течение dedup_window секунд или пока
+    обработка первого нажатия не закончилась получает пустой ответ на
+    callback без запуска обработчика. Сверх запаса запросов обновления
+    отбрасываются. Сообщения об оплате не ограничиваются.
+    """
+
+    def __init__(self, rate: float, burst: int, dedup_window: float):
+        self.rate = rate
+        self.burst = burst
+        self.dedup_window = dedup_window
+        self.buckets: Dict[int, TokenBucket] = {}
+        self.recent: Dict[int, Tuple[str, float]] = {}
+        self.in_flight: Set[Tuple[int, str]] = set()
+        self.calls = 0
+
+    def allow(self, user_id: int, now: float) -> bool:
+        """
+        Списывает запрос из запаса пользователя.
+
+        Args:
+            user_id (int): Telegram ID пользователя.
+            now (float): Текущее монотонное время.
+
+        Returns:
+            bool: True, если запас не исчерпан.
+        """
+        bucket = self.buckets.get(user_id)
+        if bucket is None:
+            bucket = self.buckets[user_id] = TokenBucket(self.burst, now)
+        else:
+            bucket.tokens = min(
+                self.burst, bucket.tokens + (now - bucket.updated) * self.rate
+            )
+            bucket.updated = now
+        if bucket.tokens < 1:
+            return False
+        bucket.tokens -= 1
+        return True
+
+    def is_duplicate(self, user_id: int, callback_data: str, now: float) -> bool:
+        """
+        Проверяет, что пользователь только что нажал ту же кнопку.
+
+        Args:
+            user_id (int): Telegram ID пользователя.
+            callback_data (str): Данные нажатой кнопки.
+            now (float): Текущее монотонное время.
+
+        Returns:
+            bool: True, если нажатие повторное.
+        """
+        if (user_id, callback_data) in self.in_flight:
+            return True
+        last = self.recent.get(user_id)
+        self.recent[user_id] = (callback_data, now)
+        return (
+            last is not None
+            and last[0] == callback_data
+            and now - last[1] < self.dedup_window
+        )
+
+    def prune(self, now: float) -> None:
+        """
+        Удаляет состояние пользователей, давно не присылавших запросов.
+
+        Args:
+            now (float): Текущее монотонное время.
+        """
+        idle = self.burst / self.rate
+        self.buckets = {
+            user_id: bucket for user_id, bucket in self.buckets.items()
+            if now - bucket.updated < idle
+        }
+        self.recent = {
+            user_id: last for user_id, last in self.recent.items()
+            if now - last[1] < self.dedup_window
+        }
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None or (isinstance(event, Message) and event.successful_payment):
+            return await handler(event, data)
+
+        now = time.monotonic()
+        self.calls += 1
+        if self.calls % PRUNE_EVERY == 0:
+            self.prune(now)
+
+        if isinstance(event, CallbackQuery) and event.data:
+            if self.is_duplicate(user.id, event.data, now):
+                incr("flood.duplicate")
+                await event.answer()
+                return None
+
+        if not self.allow(user.id, now):
+            incr("flood.throttled")
+            if isinstance(event, CallbackQuery):
+                await event.answer("⏳ Слишком часто, подождите немного.")
+            return None
+
+        incr("flood.passed")
+        if not isinstance(event, CallbackQuery) or not event.data:
+            return await handler(event, data)
+
+        key = (user.id, event.data)
+        self.in_flight.add(key)
+        try:
+            return await handler(event, data)
+        finally:
+            self.in_flight.discard(key)
+            # Нажатия, ждавшие своей очереди, сравниваются с окончанием обработки
+            self.recent[user.id] = (event.data, time.monotonic())
@@ -6,6 +6,8 @@ import sys
 
 def main():
     """Run administrative tasks."""
+    # Отметка времени запуска процесса для замеров runbot и benchstartup
+    import bot.utils.startup  # noqa: F401
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'FlowerShopProject.settings')
     try:
         from django.core.management import execute_from_command_line